@@ -0,0 +1,173 @@
+"""
+Persistent download archive keyed by YouTube video id.
+
+Each output folder gets a small SQLite database that records which video ids
+have already been downloaded and where the file went. All ids are loaded
+into memory when the archive is opened, so checking a video costs a dict
+lookup instead of a metadata request to YouTube.
+
+Usage (rebuild the archive of existing folders):
+    python archive.py "C:\\PythonProjects\\Videos\\tennistv" [more folders...]
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import logging
+from integrity import is_intact
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILENAME = ".download_archive.sqlite"
+METADATA_FILENAME = "viral_videos_metadata.json"
+MEDIA_EXTENSIONS = {'.mp4', '.webm', '.mkv', '.mov', '.m4a', '.mp3'}
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+class DownloadArchive:
+    """In-process archive of downloaded video ids backed by SQLite."""
+
+    def __init__(self, path):
+        """
+        Open (or create) an archive database.
+
+        Args:
+            path (str): Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            "video_id TEXT PRIMARY KEY, filepath TEXT, added_at REAL)"
+        )
+        self._conn.commit()
+        self._entries = dict(self._conn.execute("SELECT video_id, filepath FROM videos"))
+
+    def __contains__(self, video_id):
+        return video_id in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def items(self):
+        """Return (video_id, filepath) pairs of all archived videos."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def get(self, video_id):
+        """Return the recorded file path for a video id, or None if unknown."""
+        return self._entries.get(video_id)
+
+    def lookup_existing(self, video_id):
+        """
+        Return the recorded file path if the video is archived and the file is still on disk.
+
+        A file that fails its integrity check is removed, so the video is downloaded again.
+
+        Args:
+            video_id (str): YouTube video id (may be None)
+
+        Returns:
+            str: File path, or None if the video has to be downloaded
+        """
+        if not video_id:
+            return None
+        filepath = self._entries.get(video_id)
+        if filepath and is_intact(filepath):
+            return filepath
+        return None
+
+    def add(self, video_id, filepath):
+        """Record a downloaded video."""
+        if not video_id:
+            return
+        with self._lock:
+            self._entries[video_id] = filepath
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos (video_id, filepath, added_at) VALUES (?, ?, ?)",
+                (video_id, filepath, time.time())
+            )
+            self._conn.commit()
+
+    def rebuild(self, folder):
+        """
+        Rebuild the archive from the media files already present in a folder.
+
+        Files named with a ``[video_id]`` suffix are matched directly. Files
+        named by title only are matched against the titles in the folder's
+        viral_videos_metadata.json, using yt-dlp's filename sanitization.
+
+        Args:
+            folder (str): Folder containing downloaded videos
+
+        Returns:
+            int: Number of files recorded in the archive
+        """
+        from yt_dlp.utils import sanitize_filename
+
+        titles = {}
+        metadata_path = os.path.join(folder, METADATA_FILENAME)
+        if os.path.exists(metadata_path):
+            try:
+                with open(metadata_path, "r", encoding="utf-8") as f:
+                    for video in json.load(f):
+                        if video.get('title') and video.get('video_id'):
+                            titles[sanitize_filename(video['title'])] = video['video_id']
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read {metadata_path}: {e}")
+
+        recorded = 0
+        for name in os.listdir(folder):
+            stem, ext = os.path.splitext(name)
+            if ext.lower() not in MEDIA_EXTENSIONS:
+                continue
+            match = re.search(r"\[([A-Za-z0-9_-]{11})\]$", stem)
+            video_id = match.group(1) if match else titles.get(stem)
+            if video_id:
+                self.add(video_id, os.path.join(folder, name))
+                recorded += 1
+            else:
+                logger.info(f"Archive rebuild: no video id found for {name}")
+        logger.info(f"Archive rebuild: recorded {recorded} files from {folder}")
+        return recorded
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_archive(output_path):
+    """
+    Return the shared archive for an output folder, opening it on first use.
+
+    Args:
+        output_path (str): Folder the videos are downloaded to
+
+    Returns:
+        DownloadArchive: The folder's archive
+    """
+    key = os.path.abspath(output_path)
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            os.makedirs(key, exist_ok=True)
+            archive = DownloadArchive(os.path.join(key, ARCHIVE_FILENAME))
+            _archives[key] = archive
+        return archive
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if len(sys.argv) < 2:
+        print("Usage: python archive.py <folder> [more folders...]")
+        sys.exit(1)
+    for folder in sys.argv[1:]:
+        count = get_archive(folder).rebuild(folder)
+        print(f"{folder}: {count} videos archived")
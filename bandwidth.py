@@ -0,0 +1,204 @@
+"""
+Process-wide bandwidth shaper with weighted fair sharing.
+
+All downloads draw from one shaper, so a whole-host budget such as "20 MB/s
+in total" holds no matter how many downloads run at once. The budget is
+split hierarchically, like a two-level HTB (hierarchical token bucket):
+
+    total rate
+      -> channels, in proportion to their channel weight
+           -> transfers of a channel, in proportion to their priority
+
+Only transfers that are currently running take part in the split, so bandwidth
+left unused by idle channels is shared out among the busy ones. Each
+transfer owns a token bucket refilled at its current share. Transfers are
+throttled from their yt-dlp progress hook: when a block has consumed more
+tokens than are available, the hook sleeps until the bucket is refilled.
+Rates and weights can be changed at runtime; shares are recomputed
+immediately.
+"""
+import time
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Total download rate of the process in bytes/s (None for unlimited)
+DEFAULT_RATE = 3 * 1024 * 1024
+# Seconds of traffic a transfer may send in one burst
+BURST_SECONDS = 0.25
+MIN_BURST = 64 * 1024
+
+
+class Flow:
+    """
+    One transfer drawing from the shaper; use it as a yt-dlp progress hook.
+
+    The flow joins the split when the first bytes arrive (so extraction and
+    queueing do not hold a share) and leaves it when the transfer ends.
+    """
+
+    def __init__(self, shaper, channel, priority):
+        self.shaper = shaper
+        self.channel = channel
+        self.priority = priority
+        self.rate = None
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.bytes = 0
+        self.waited = 0.0
+        self._last_downloaded = None
+        self.active = False
+        self.closed = False
+
+    def __call__(self, d):
+        if d.get('status') == 'downloading':
+            downloaded = d.get('downloaded_bytes') or 0
+            if self._last_downloaded is None:
+                # The first report may include bytes resumed from a .part file
+                self._last_downloaded = downloaded
+                if not self.closed:
+                    self.active = True
+                    self.shaper._add(self)
+                return
+            delta = downloaded - self._last_downloaded
+            self._last_downloaded = downloaded
+            if delta > 0:
+                self.shaper.consume(self, delta)
+        elif d.get('status') in ('finished', 'error'):
+            self.close()
+
+    def limited_below(self, speed):
+        """Return True if the shaper currently holds this transfer below ``speed`` bytes/s."""
+        rate = self.rate
+        return rate is not None and rate < speed
+
+    def close(self):
+        """Stop drawing from the shaper; the share is given back to the other transfers."""
+        if not self.closed:
+            self.closed = True
+            if self.active:
+                self.shaper._remove(self)
+
+
+class BandwidthShaper:
+    """Splits a total download rate fairly between channels and the transfers within them."""
+
+    def __init__(self, rate=DEFAULT_RATE):
+        """
+        Args:
+            rate (float): Total rate in bytes/s shared by all transfers (None for unlimited)
+        """
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._channel_weights = {}
+        self._flows = {}
+        self._bytes = {}
+        self._waited = 0.0
+
+    def flow(self, channel, priority=1.0):
+        """
+        Create the flow of a transfer.
+
+        Args:
+            channel (str): Channel (or folder) the transfer belongs to
+            priority (float): Weight of the transfer within its channel
+
+        Returns:
+            Flow: Progress hook throttling the transfer; close() it when the transfer ends
+        """
+        return Flow(self, channel, priority)
+
+    def _add(self, flow):
+        with self._lock:
+            self._flows.setdefault(flow.channel, []).append(flow)
+            self._rebalance()
+
+    def _remove(self, flow):
+        with self._lock:
+            flows = self._flows.get(flow.channel, [])
+            if flow in flows:
+                flows.remove(flow)
+                if not flows:
+                    del self._flows[flow.channel]
+                self._rebalance()
+
+    def set_rate(self, rate):
+        """Change the total rate at runtime (bytes/s, None for unlimited)."""
+        with self._lock:
+            self.rate = rate
+            self._rebalance()
+        logger.info(f"Bandwidth limit set to {'unlimited' if rate is None else f'{rate / 1024 / 1024:.2f} MiB/s'}")
+
+    def set_channel_weight(self, channel, weight):
+        """Change the share weight of a channel at runtime (default 1.0)."""
+        with self._lock:
+            self._channel_weights[channel] = weight
+            self._rebalance()
+
+    def _rebalance(self):
+        now = time.monotonic()
+        total_weight = sum(self._channel_weights.get(channel, 1.0) for channel in self._flows)
+        for channel, flows in self._flows.items():
+            channel_rate = None
+            if self.rate is not None and total_weight > 0:
+                channel_rate = self.rate * self._channel_weights.get(channel, 1.0) / total_weight
+            priorities = sum(flow.priority for flow in flows)
+            for flow in flows:
+                self._refill(flow, now)
+                flow.rate = channel_rate * flow.priority / priorities if channel_rate is not None else None
+
+    @staticmethod
+    def _refill(flow, now):
+        if flow.rate is not None:
+            burst = max(MIN_BURST, flow.rate * BURST_SECONDS)
+            flow.tokens = min(burst, flow.tokens + (now - flow.updated) * flow.rate)
+        flow.updated = now
+
+    def consume(self, flow, nbytes):
+        """Charge ``nbytes`` to a transfer, sleeping until its bucket allows them."""
+        with self._lock:
+            self._bytes[flow.channel] = self._bytes.get(flow.channel, 0) + nbytes
+            flow.bytes += nbytes
+            if flow.rate is None or flow.rate <= 0:
+                return
+            self._refill(flow, time.monotonic())
+            flow.tokens -= nbytes
+            wait = -flow.tokens / flow.rate if flow.tokens < 0 else 0.0
+            self._waited += wait
+            flow.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+
+    def stats(self):
+        """
+        Return the limit, the current share of every active transfer and bytes per channel.
+
+        Returns:
+            dict: rate, active_transfers, channels ({channel: {'share', 'transfers', 'bytes'}}), wait_seconds
+        """
+        with self._lock:
+            channels = {
+                channel: {
+                    'share': None if self.rate is None else sum(flow.rate or 0 for flow in flows),
+                    'transfers': len(flows),
+                    'bytes': self._bytes.get(channel, 0),
+                }
+                for channel, flows in self._flows.items()
+            }
+            for channel, nbytes in self._bytes.items():
+                channels.setdefault(channel, {'share': 0, 'transfers': 0, 'bytes': nbytes})
+            return {
+                'rate': self.rate,
+                'active_transfers': sum(len(flows) for flows in self._flows.values()),
+                'channels': channels,
+                'wait_seconds': round(self._waited, 3),
+            }
+
+
+_shaper = BandwidthShaper()
+
+
+def get_shaper():
+    """Return the process-wide bandwidth shaper."""
+    return _shaper
@@ -0,0 +1,347 @@
+"""
+Offline benchmark suite.
+
+Starts the local YouTube stand-in (standin.py), injects its extractor into
+the yt-dlp session pool and drives the real hot paths against it with all
+rate-limiting sleeps disabled.
+
+Usage:
+    python benchmark.py --suite --channels 4 --videos 20 [--json results.json]
+    python benchmark.py --videos 40 --workers 1 2 4 8
+    python benchmark.py --overhead --videos 40 --latency 0
+    python benchmark.py --ranking 100000
+"""
+import argparse
+import json
+import math
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from standin import make_standin_extractor, server_base_url, standin_video_id, start_stand_in_server
+
+# Options that disable yt-dlp's own request sleeps for benchmark runs
+NO_LIMIT_OPTS = {'quiet': True, 'sleep_interval_requests': 0}
+
+
+class _Var:
+    """Minimal stand-in for a tkinter variable."""
+
+    def __init__(self):
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def folder_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def bench_download_engine(server, num_videos, workers):
+    from downloader import download_videos_from_links
+    from pacing import no_pacing
+
+    links = [f"https://www.youtube.com/shorts/{standin_video_id(99, i)}" for i in range(num_videos)]
+    output_path = tempfile.mkdtemp(prefix="bench_dl_")
+    downloaded = []
+    try:
+        start = time.perf_counter()
+        download_videos_from_links(
+            links, output_path, _Var(), _Var(),
+            progress_callback=downloaded.append,
+            max_workers=workers,
+            pacer=no_pacing(),
+            extra_opts=NO_LIMIT_OPTS,
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(output_path, ignore_errors=True)
+    return {
+        'workers': workers,
+        'videos': len(downloaded),
+        'seconds': elapsed,
+        'videos_per_hour': len(downloaded) / elapsed * 3600 if elapsed else 0.0,
+    }
+
+
+def bench_session_overhead(server, num_videos):
+    """Compare per-video metadata overhead of a fresh YoutubeDL per call against the session pool."""
+    import yt_dlp
+    from ydl_pool import YoutubeDLPool
+
+    links = [f"{server_base_url(server)}/video/overhead{i:05d}.mp4" for i in range(num_videos)]
+    opts = {'quiet': True, 'no_warnings': True}
+
+    start = time.perf_counter()
+    for link in links:
+        with yt_dlp.YoutubeDL(dict(opts)) as ydl:
+            ydl.extract_info(link, download=False)
+    fresh = (time.perf_counter() - start) / num_videos
+
+    pool = YoutubeDLPool()
+    start = time.perf_counter()
+    for link in links:
+        with pool.session('bench', opts) as ydl:
+            ydl.extract_info(link, download=False)
+    pooled = (time.perf_counter() - start) / num_videos
+    pool.close()
+    return {'fresh_ms': fresh * 1000, 'pooled_ms': pooled * 1000}
+
+
+def synthetic_channel_videos(num_videos, seed=0):
+    """Yield synthetic video dicts shaped like ViralAnalyzer.fetch_channel_metadata output."""
+    import random
+    rng = random.Random(seed)
+    for i in range(num_videos):
+        yield {
+            'title': f"Synthetic short #{i} / rally",
+            'url': f"https://www.youtube.com/shorts/syn{i:08d}",
+            'video_id': f"syn{i:08d}",
+            'views': rng.randint(0, 5_000_000),
+            'comments': rng.randint(0, 200),
+            'upload_date': None if rng.random() < 0.05 else f"2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        }
+
+
+def bench_ranking(num_videos, top_n):
+    """Compare the streaming top-N ranking against the former pandas sort_values path."""
+    import pandas as pd
+    from ranking import rank_videos, to_json
+    from engagement import EngagementStore, score_growth
+
+    videos = list(synthetic_channel_videos(num_videos))
+    tmp_dir = tempfile.mkdtemp(prefix="bench_rank_")
+    try:
+        start = time.perf_counter()
+        df = pd.DataFrame(videos)
+        df = df.sort_values(by=['comments', 'views', 'upload_date'], ascending=[False, False, False]).head(top_n)
+        pandas_seconds = time.perf_counter() - start
+        df.to_json(os.path.join(tmp_dir, "pandas.json"), orient="records", indent=4)
+
+        start = time.perf_counter()
+        top = rank_videos(iter(videos), top_n)
+        heap_seconds = time.perf_counter() - start
+        to_json(top, os.path.join(tmp_dir, "heap.json"))
+
+        with open(os.path.join(tmp_dir, "pandas.json"), "rb") as a, open(os.path.join(tmp_dir, "heap.json"), "rb") as b:
+            identical = a.read() == b.read()
+
+        # Growth scoring over a day of hourly snapshots
+        store = EngagementStore(os.path.join(tmp_dir, "history.sqlite"))
+        now = time.time()
+        for hour in range(24, 0, -1):
+            store.record([{**video, 'views': video['views'] // (hour + 1)} for video in videos],
+                         timestamp=now - hour * 3600)
+        store.record(videos, timestamp=now)
+        video_ids = [video['video_id'] for video in videos]
+        start = time.perf_counter()
+        groups, timestamps, views, _ = store.history(video_ids)
+        read_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        score_growth(groups, timestamps, views, len(video_ids), now=now)
+        score_seconds = time.perf_counter() - start
+        store.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {'pandas_ms': pandas_seconds * 1000, 'heap_ms': heap_seconds * 1000, 'identical_json': identical,
+            'history_read_ms': read_seconds * 1000, 'growth_score_ms': score_seconds * 1000,
+            'snapshots': len(groups)}
+
+
+@contextmanager
+def _resolver_in(work_dir):
+    """Resolve channels through a resolver whose cache lives in work_dir, not the real channel_cache.json."""
+    import channel_resolver
+
+    with channel_resolver._resolver_lock:
+        saved = channel_resolver._resolver
+        channel_resolver._resolver = channel_resolver.ChannelResolver(
+            os.path.join(work_dir, channel_resolver.CHANNEL_CACHE_FILE))
+    try:
+        yield
+    finally:
+        with channel_resolver._resolver_lock:
+            channel_resolver._resolver = saved
+
+
+def bench_suite(server, num_channels, videos_per_channel, workers):
+    """
+    Drive the four hot paths end to end against the stand-in server.
+
+    Returns:
+        list: One result dict per phase (seconds, items, items/s, bytes/s, latency, peak RSS)
+    """
+    from downloader import get_short_links, download_videos_from_links
+    from pacing import no_pacing
+    from viral_analyzer import ViralAnalyzer
+    from enrichment import QuotaTracker, StatisticsEnricher
+    from engagement import EngagementStore
+
+    channels = [f"https://www.youtube.com/@bench{i}/shorts" for i in range(num_channels)]
+    work_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    phases = []
+
+    def record(name, seconds, items, latencies, nbytes=0):
+        latencies = sorted(latencies)
+        phases.append({
+            'phase': name,
+            'seconds': seconds,
+            'items': items,
+            'items_per_s': items / seconds if seconds else 0.0,
+            'bytes_per_s': nbytes / seconds if seconds else 0.0,
+            'latency_mean_ms': sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+            'latency_p95_ms': latencies[math.ceil(0.95 * len(latencies)) - 1] * 1000 if latencies else 0.0,
+            'peak_rss_mb': peak_rss_bytes() / (1024 * 1024),
+        })
+
+    try:
+        with _resolver_in(work_dir):
+            # 1. Channel listing
+            links_by_channel, latencies = {}, []
+            start = time.perf_counter()
+            for channel_url in channels:
+                call_start = time.perf_counter()
+                links_by_channel[channel_url] = get_short_links(channel_url, _Var(), _Var(), max_videos=videos_per_channel)
+                latencies.append(time.perf_counter() - call_start)
+            record('get_short_links', time.perf_counter() - start,
+                   sum(len(links) for links in links_by_channel.values()), latencies)
+
+            # 2. Concurrent downloads of the listed shorts
+            latencies = []
+            start = time.perf_counter()
+            for i, (channel_url, links) in enumerate(links_by_channel.items()):
+                call_start = time.perf_counter()
+                download_videos_from_links(links, os.path.join(work_dir, "links", str(i)), _Var(), _Var(),
+                                           max_workers=workers, pacer=no_pacing(), extra_opts=NO_LIMIT_OPTS)
+                latencies.append((time.perf_counter() - call_start) / max(1, len(links)))
+            seconds = time.perf_counter() - start
+            links_dir = os.path.join(work_dir, "links")
+            record('download_videos_from_links', seconds,
+                   sum(len(links) for links in links_by_channel.values()), latencies, folder_bytes(links_dir))
+
+            # 3. Viral analysis (statistics come from the stand-in's videos.list)
+            enricher = StatisticsEnricher("standin", quota=QuotaTracker(os.path.join(work_dir, "quota.sqlite")),
+                                          api_endpoint=server_base_url(server))
+            analyzer = ViralAnalyzer(progress_var=_Var(), progress_label_var=_Var(), use_cache=False,
+                                     download_delay=(0, 0), enricher=enricher,
+                                     history=EngagementStore(os.path.join(work_dir, "history.sqlite")))
+            viral_by_channel, latencies = {}, []
+            start = time.perf_counter()
+            for i, channel_url in enumerate(channels):
+                folder = os.path.join(work_dir, "viral", str(i))
+                os.makedirs(folder, exist_ok=True)
+                call_start = time.perf_counter()
+                viral_by_channel[folder] = analyzer.analyze_channel(channel_url, folder, max_videos=videos_per_channel)
+                latencies.append(time.perf_counter() - call_start)
+            record('analyze_channel', time.perf_counter() - start,
+                   sum(len(videos) for videos in viral_by_channel.values()), latencies)
+
+            # 4. Sequential viral downloads
+            latencies, downloaded = [], 0
+            start = time.perf_counter()
+            for folder, videos in viral_by_channel.items():
+                call_start = time.perf_counter()
+                paths = analyzer.download_viral_videos(videos, folder, limit=videos_per_channel)
+                downloaded += len(paths)
+                latencies.append((time.perf_counter() - call_start) / max(1, len(paths)))
+            seconds = time.perf_counter() - start
+            record('download_viral_videos', seconds, downloaded, latencies,
+                   folder_bytes(os.path.join(work_dir, "viral")))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return phases
+
+
+def print_suite(phases):
+    print(f"{'phase':<28} {'items':>6} {'seconds':>8} {'items/s':>8} {'MB/s':>7} "
+          f"{'mean ms':>8} {'p95 ms':>8} {'peak RSS MB':>12}")
+    for p in phases:
+        print(f"{p['phase']:<28} {p['items']:>6} {p['seconds']:>8.2f} {p['items_per_s']:>8.2f} "
+              f"{p['bytes_per_s'] / (1024 * 1024):>7.2f} {p['latency_mean_ms']:>8.1f} {p['latency_p95_ms']:>8.1f} "
+              f"{p['peak_rss_mb']:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--suite", action="store_true",
+                        help="Run the end-to-end suite (listing, downloads, analysis, viral downloads)")
+    parser.add_argument("--channels", type=int, default=4, help="Synthetic channels used by the suite")
+    parser.add_argument("--json", help="Also write suite results to this JSON file")
+    parser.add_argument("--videos", type=int, default=40,
+                        help="Number of synthetic videos per run (per channel for --suite)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="Worker counts to compare (the first one is used by --suite)")
+    parser.add_argument("--video-size", type=int, default=256 * 1024, help="Synthetic video size in bytes")
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated per-request latency in seconds")
+    parser.add_argument("--bandwidth", type=int, default=1024 * 1024,
+                        help="Simulated per-connection bandwidth in bytes/s (0 for unlimited)")
+    parser.add_argument("--overhead", action="store_true",
+                        help="Measure per-video yt-dlp session overhead instead of download throughput")
+    parser.add_argument("--ranking", type=int, metavar="N",
+                        help="Benchmark top-N ranking on a synthetic channel with N entries")
+    parser.add_argument("--top-n", type=int, default=100, help="Top N kept by the ranking benchmark")
+    parser.add_argument("--bandwidth-limit", type=int,
+                        help="Total download rate of the bandwidth shaper in bytes/s (default: unlimited)")
+    args = parser.parse_args()
+
+    if args.ranking:
+        result = bench_ranking(args.ranking, args.top_n)
+        print(f"pandas sort_values + head: {result['pandas_ms']:.1f} ms")
+        print(f"streaming top-N heap:      {result['heap_ms']:.1f} ms")
+        print(f"identical JSON output:     {result['identical_json']}")
+        print(f"history read ({result['snapshots']} rows): {result['history_read_ms']:.1f} ms")
+        print(f"vectorized growth scoring: {result['growth_score_ms']:.1f} ms")
+        return
+
+    import logging
+    from utils import configure_logging
+    from ydl_pool import get_pool
+    from bandwidth import get_shaper
+    configure_logging()
+    logging.getLogger().setLevel(logging.WARNING)
+    get_shaper().set_rate(args.bandwidth_limit)
+
+    server = start_stand_in_server(args.video_size, args.latency, args.bandwidth,
+                                   channel_size=max(200, args.videos))
+    get_pool().register_extractor(make_standin_extractor(server_base_url(server)))
+    try:
+        if args.suite:
+            phases = bench_suite(server, args.channels, args.videos, args.workers[0])
+            print_suite(phases)
+            if args.json:
+                with open(args.json, "w", encoding="utf-8") as f:
+                    json.dump(phases, f, indent=2)
+            return
+        if args.overhead:
+            result = bench_session_overhead(server, args.videos)
+            print(f"fresh YoutubeDL per video: {result['fresh_ms']:.1f} ms/video")
+            print(f"pooled session:            {result['pooled_ms']:.1f} ms/video")
+            return
+        print(f"{'workers':>8} {'videos':>8} {'seconds':>10} {'videos/hour':>12}")
+        for workers in args.workers:
+            result = bench_download_engine(server, args.videos, workers)
+            print(f"{result['workers']:>8} {result['videos']:>8} {result['seconds']:>10.2f} "
+                  f"{result['videos_per_hour']:>12.0f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
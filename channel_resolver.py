@@ -0,0 +1,233 @@
+"""
+Canonical channel identities with a cached handle -> channel-ID mapping.
+
+A channel can be written many ways: ``@TennisTV``, ``@tennistv/shorts``,
+``youtube.com/c/TennisTV``, ``m.youtube.com/channel/UC...``. The resolver
+parses every form without network access, then maps handles, custom and
+user URLs to the channel's ``UC...`` id. Each alias is looked up on YouTube
+once; the mapping is kept in a small JSON file, so later runs (and the
+headless worker processes) resolve it from disk.
+
+The resolved identity is shared by everything keyed on a channel: the work
+list is deduplicated by channel id, the downloader lists the canonical
+shorts tab, the analyzer's metadata cache is keyed by channel id and every
+alias of a channel maps to the same output folder.
+"""
+import os
+import re
+import json
+import time
+import threading
+import logging
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_CACHE_FILE = "channel_cache.json"
+
+RESOLVER_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': True,
+    'playlistend': 1,
+}
+
+_CHANNEL_URL = re.compile(
+    r"^(?:https?://)?(?:www\.|m\.)?youtube\.com/(@|c/|channel/|user/)([\w.-]+)"
+)
+_CHANNEL_ID = re.compile(r"^UC[\w-]{22}$")
+_KINDS = {'@': 'handle', 'c/': 'custom', 'channel/': 'id', 'user/': 'user'}
+_URL_PREFIXES = {'handle': '@', 'custom': 'c/', 'id': 'channel/', 'user': 'user/'}
+
+
+def parse_channel_url(channel_url):
+    """
+    Parse a channel reference without network access.
+
+    Accepts channel URLs (``@handle``, ``/c/name``, ``/channel/UC...``, ``/user/name``,
+    with or without scheme, ``www.``/``m.`` and a trailing tab such as ``/shorts``),
+    bare ``@handle``s and bare ``UC...`` channel ids.
+
+    Args:
+        channel_url (str): Channel reference
+
+    Returns:
+        tuple: (kind, value) with kind 'handle', 'custom', 'user' or 'id', or None if invalid
+    """
+    channel_url = (channel_url or "").strip()
+    if _CHANNEL_ID.match(channel_url):
+        return 'id', channel_url
+    if channel_url.startswith('@'):
+        channel_url = f"youtube.com/{channel_url}"
+    match = _CHANNEL_URL.match(channel_url)
+    if not match:
+        return None
+    return _KINDS[match.group(1)], match.group(2)
+
+
+def alias_key(kind, value):
+    """Return the cache key of a parsed reference; handles and names are case-insensitive."""
+    return f"{kind}:{value if kind == 'id' else value.lower()}"
+
+
+def channel_url_for(kind, value):
+    return f"https://www.youtube.com/{_URL_PREFIXES[kind]}{value}"
+
+
+class ChannelResolver:
+    """Resolves channel references to canonical identities, caching the mapping in a JSON file."""
+
+    def __init__(self, path=CHANNEL_CACHE_FILE):
+        """
+        Args:
+            path (str): JSON file persisting the alias -> channel id mapping
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._aliases = {}
+        self._channels = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._aliases = data.get('aliases', {})
+            self._channels = data.get('channels', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read channel cache {path}: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({'aliases': self._aliases, 'channels': self._channels}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save channel cache {self.path}: {e}")
+
+    def _lookup(self, channel_url):
+        """Look a channel URL up on YouTube; returns (channel id, @handle), either may be None."""
+        from ydl_pool import get_pool
+
+        with get_pool().session('resolver', RESOLVER_OPTS) as ydl, get_metrics().span('channel_resolve'):
+            result = ydl.extract_info(channel_url, download=False, process=False)
+            # Follow redirects (e.g. /c/ and /user/ URLs) to the channel itself
+            for _ in range(3):
+                if not result or result.get('_type') not in ('url', 'url_transparent'):
+                    break
+                result = ydl.extract_info(result['url'], download=False, process=False,
+                                          ie_key=result.get('ie_key'))
+        if not result:
+            return None, None
+        handle = result.get('uploader_id')
+        return result.get('channel_id'), handle if handle and handle.startswith('@') else None
+
+    def resolve(self, channel_url, network=True):
+        """
+        Resolve a channel reference to its canonical identity.
+
+        Args:
+            channel_url (str): Channel reference (see parse_channel_url)
+            network (bool): Look up aliases missing from the cache on YouTube
+
+        Returns:
+            dict: key (channel id, or the alias key if the id is unknown), channel_id (or None),
+                name (folder name, shared by all aliases), url and shorts_url (canonical URLs);
+                None if the reference is not a valid channel
+        """
+        parsed = parse_channel_url(channel_url)
+        if not parsed:
+            return None
+        kind, value = parsed
+        key = alias_key(kind, value)
+        with self._lock:
+            channel_id = value if kind == 'id' else self._aliases.get(key)
+        changed = False
+        if channel_id is None and network:
+            try:
+                channel_id, handle = self._lookup(channel_url_for(kind, value))
+            except Exception as e:
+                logger.warning(f"Could not resolve channel {channel_url}: {e}")
+                channel_id = handle = None
+            if channel_id:
+                with self._lock:
+                    self._aliases[key] = channel_id
+                    if handle:
+                        self._aliases.setdefault(alias_key('handle', handle[1:]), channel_id)
+                    self._channels.setdefault(channel_id, {})['resolved_at'] = time.time()
+                changed = True
+                logger.info(f"Resolved {channel_url} to channel {channel_id}")
+
+        if channel_id is None:
+            url = channel_url_for(kind, value)
+            return {'key': key, 'channel_id': None, 'name': value, 'url': url, 'shorts_url': f"{url}/shorts"}
+
+        with self._lock:
+            info = self._channels.setdefault(channel_id, {})
+            if 'name' not in info:
+                # The first alias seen names the folder, as before channels were resolved
+                info['name'] = value
+                changed = True
+            if changed:
+                self._save()
+            name = info['name']
+        url = channel_url_for('id', channel_id)
+        return {'key': channel_id, 'channel_id': channel_id, 'name': name, 'url': url, 'shorts_url': f"{url}/shorts"}
+
+    def dedupe(self, channel_urls, network=True):
+        """
+        Drop references to a channel that is already in the list.
+
+        References that are spelled differently but normalize to the same alias are
+        dropped first, without network access; the rest are compared by channel id
+        where it is known (or can be resolved), otherwise by their normalized form.
+        Invalid references are kept, so callers still report them.
+
+        Args:
+            channel_urls (list): Channel references, in priority order
+            network (bool): Resolve aliases missing from the cache on YouTube
+
+        Returns:
+            tuple: (unique references in input order, {dropped reference: kept reference})
+        """
+        duplicates = {}
+
+        def drop_duplicates(references, key_of):
+            kept, seen = [], {}
+            for reference in references:
+                key = key_of(reference)
+                if key in seen:
+                    duplicates[reference] = seen[key]
+                    logger.info(f"Skipping {reference}: same channel as {seen[key]}")
+                else:
+                    seen[key] = reference
+                    kept.append(reference)
+            return kept
+
+        def offline_key(reference):
+            parsed = parse_channel_url(reference)
+            return alias_key(*parsed) if parsed else reference
+
+        def resolved_key(reference):
+            channel = self.resolve(reference, network=network)
+            return channel['key'] if channel else reference
+
+        unique = drop_duplicates(drop_duplicates(channel_urls, offline_key), resolved_key)
+        for reference, kept in duplicates.items():
+            while kept in duplicates:
+                kept = duplicates[kept]
+            duplicates[reference] = kept
+        return unique, duplicates
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """Return the shared channel resolver, opening its cache on first use."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ChannelResolver()
+        return _resolver
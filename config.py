@@ -1,25 +1,47 @@
 import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# YouTube API Configuration
-# Get API key from environment variable
-YOUTUBE_API_KEY = os.environ.get("YOUTUBE_API_KEY", "")
-
-# If not in environment variables, try to load from local_config.py
-if not YOUTUBE_API_KEY:
-    try:
-        from local_config import YOUTUBE_API_KEY
-    except ImportError:
-        print("WARNING: YouTube API key not found.")
-        print("Please either:")
-        print("1. Set the YOUTUBE_API_KEY environment variable, or")
-        print("2. Create a local_config.py file with YOUTUBE_API_KEY defined")
 
 # Maximum number of videos to analyze per channel
 MAX_VIDEOS_TO_ANALYZE = 100
 
 # Maximum number of viral videos to download
 MAX_VIDEOS_TO_DOWNLOAD = 31
+
+# The GUI's output folder is shared with other machines: claim channels with lease files
+SHARED_OUTPUT_FOLDER = False
+
+_environment_loaded = False
+
+
+def load_environment():
+    """Load environment variables from the .env file (once, on first use)."""
+    global _environment_loaded
+    if not _environment_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _environment_loaded = True
+
+
+def _load_api_key():
+    # YouTube API Configuration
+    # Get API key from environment variable
+    load_environment()
+    api_key = os.environ.get("YOUTUBE_API_KEY", "")
+
+    # If not in environment variables, try to load from local_config.py
+    if not api_key:
+        try:
+            from local_config import YOUTUBE_API_KEY as api_key
+        except ImportError:
+            print("WARNING: YouTube API key not found.")
+            print("Please either:")
+            print("1. Set the YOUTUBE_API_KEY environment variable, or")
+            print("2. Create a local_config.py file with YOUTUBE_API_KEY defined")
+    return api_key
+
+
+def __getattr__(name):
+    # YOUTUBE_API_KEY is looked up when first accessed, so importing config has no side effects
+    if name == "YOUTUBE_API_KEY":
+        globals()[name] = _load_api_key()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
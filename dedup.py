@@ -0,0 +1,281 @@
+"""
+Cross-channel content deduplication with hardlinked storage.
+
+The same short often appears under several channels (reposts, compilation
+channels, a channel listed twice). A dedup index shared by all channel
+folders of an output root records every stored file by video id and by a
+content fingerprint (file size plus hashes of a few sampled chunks):
+
+- before downloading, a video id already stored under another channel is
+  hardlinked into the new channel folder instead of downloaded again;
+- after downloading, a file whose fingerprint matches a stored file (the
+  same clip re-uploaded under another id) is replaced by a hardlink to it.
+
+Hardlinks share the data on disk, so every channel folder still holds a
+normal, complete file. Where hardlinks are not possible (different drives,
+filesystems without link support) the file is copied instead.
+
+Usage (index existing folders and hardlink the duplicates found):
+    python dedup.py "C:\\PythonProjects\\Videos"
+"""
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+import logging
+from archive import MEDIA_EXTENSIONS, get_archive
+from integrity import get_integrity_manifest, record_copy
+
+logger = logging.getLogger(__name__)
+
+DEDUP_FILENAME = ".dedup_index.sqlite"
+
+# Number of chunks hashed per file and their size
+SAMPLE_CHUNKS = 8
+CHUNK_SIZE = 64 * 1024
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def fingerprint(path, chunks=SAMPLE_CHUNKS, chunk_size=CHUNK_SIZE):
+    """
+    Compute a content fingerprint from the file size and evenly spaced sampled chunks.
+
+    Args:
+        path (str): File to fingerprint
+        chunks (int): Number of chunks to hash (the first and last are always included)
+        chunk_size (int): Bytes per chunk
+
+    Returns:
+        str: "<size>:<sha256 of the sampled chunks>"
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        if size <= chunks * chunk_size:
+            digest.update(f.read())
+        else:
+            step = (size - chunk_size) / (chunks - 1)
+            for i in range(chunks):
+                f.seek(int(i * step))
+                digest.update(f.read(chunk_size))
+    return f"{size}:{digest.hexdigest()}"
+
+
+def link_or_copy(source, destination):
+    """
+    Place a file at destination as a hardlink to source, copying if linking is not possible.
+
+    Returns:
+        bool: True if a hardlink was created, False if the file was copied
+    """
+    tmp_path = f"{destination}.dedup-tmp"
+    try:
+        os.link(source, tmp_path)
+        linked = True
+    except OSError:
+        shutil.copy2(source, tmp_path)
+        linked = False
+    os.replace(tmp_path, destination)
+    return linked
+
+
+def _passes_check(path):
+    """Return True if a stored file exists and matches its folder's integrity manifest, without removing it."""
+    if not os.path.exists(path):
+        return False
+    return get_integrity_manifest(os.path.dirname(path)).check(path) is not False
+
+
+class DedupIndex:
+    """Index of stored files by video id and content fingerprint, backed by SQLite."""
+
+    def __init__(self, path):
+        """
+        Open (or create) a dedup index.
+
+        Args:
+            path (str): Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, video_id TEXT, size INTEGER, fingerprint TEXT, added_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_video_id ON files (video_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS files_fingerprint ON files (fingerprint)")
+        self._conn.commit()
+        self.linked = 0
+        self.bytes_saved = 0
+
+    def _existing(self, column, value, exclude=None):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT path FROM files WHERE {column} = ? ORDER BY added_at", (value,)
+            ).fetchall()
+        for (path,) in rows:
+            # A stored copy that fails its integrity check is skipped (the download path discards it)
+            if path != exclude and _passes_check(path):
+                return path
+        return None
+
+    def _fingerprint_of(self, path):
+        with self._lock:
+            row = self._conn.execute("SELECT fingerprint FROM files WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def lookup(self, video_id):
+        """Return the path of a stored copy of a video id, or None."""
+        if not video_id:
+            return None
+        return self._existing('video_id', video_id)
+
+    def _record(self, video_id, path, content_fingerprint):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, video_id, size, fingerprint, added_at) VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), video_id, os.path.getsize(path), content_fingerprint, time.time())
+            )
+            self._conn.commit()
+
+    def link_existing(self, video_id, output_folder):
+        """
+        Hardlink an already stored copy of a video into another folder.
+
+        A different file already using the copy's name is never replaced; the
+        link is named "<name> [<video id>]" instead.
+
+        Args:
+            video_id (str): YouTube video id
+            output_folder (str): Folder the video should appear in
+
+        Returns:
+            str: Path of the linked file, or None if the video is not stored anywhere
+                (or both names are taken by other files)
+        """
+        source = self.lookup(video_id)
+        if not source:
+            return None
+        content_fingerprint = self._fingerprint_of(source)
+        name, extension = os.path.splitext(os.path.basename(source))
+        # Names come from titles, so another video may already own the plain name
+        for candidate in (f"{name}{extension}", f"{name} [{video_id}]{extension}"):
+            destination = os.path.abspath(os.path.join(output_folder, candidate))
+            if destination == source:
+                break
+            if not os.path.exists(destination):
+                os.makedirs(output_folder, exist_ok=True)
+                if link_or_copy(source, destination):
+                    self._count_saved(source)
+                record_copy(source, destination)
+                logger.info(f"Dedup: linked {video_id} from {source}")
+                break
+            if os.path.samefile(source, destination) or fingerprint(destination) == content_fingerprint:
+                record_copy(source, destination)
+                break
+        else:
+            logger.warning(f"Dedup: {output_folder} already has different files named like {video_id}, not linking")
+            return None
+        self._record(video_id, destination, content_fingerprint)
+        return destination
+
+    def register(self, video_id, path):
+        """
+        Record a downloaded file, replacing it with a hardlink if identical content is already stored.
+
+        Args:
+            video_id (str): YouTube video id (may be None)
+            path (str): Downloaded file
+
+        Returns:
+            bool: True if the file was a duplicate and now shares storage with the stored copy
+        """
+        path = os.path.abspath(path)
+        content_fingerprint = fingerprint(path)
+        source = self._existing('fingerprint', content_fingerprint, exclude=path)
+        duplicate = False
+        if source and not os.path.samefile(source, path):
+            if link_or_copy(source, path):
+                self._count_saved(source)
+                duplicate = True
+                logger.info(f"Dedup: {path} has the same content as {source}, hardlinked")
+        elif source:
+            duplicate = True
+        self._record(video_id, path, content_fingerprint)
+        return duplicate
+
+    def _count_saved(self, source):
+        with self._lock:
+            self.linked += 1
+            self.bytes_saved += os.path.getsize(source)
+
+    def scan(self, root):
+        """
+        Index the media files below a folder and hardlink the duplicates among them.
+
+        Video ids are taken from each folder's download archive where known.
+
+        Args:
+            root (str): Output root containing the channel folders
+
+        Returns:
+            int: Number of files replaced by hardlinks
+        """
+        before = self.linked
+        for folder, _, names in os.walk(root):
+            media = [name for name in names if os.path.splitext(name)[1].lower() in MEDIA_EXTENSIONS]
+            if not media:
+                continue
+            ids = {os.path.abspath(path): video_id for video_id, path in get_archive(folder).items()}
+            for name in media:
+                path = os.path.abspath(os.path.join(folder, name))
+                self.register(ids.get(path), path)
+        logger.info(f"Dedup scan of {root}: {self.linked - before} duplicates hardlinked")
+        return self.linked - before
+
+    def stats(self):
+        """Return how many files were hardlinked and how many bytes that saved in this process."""
+        with self._lock:
+            return {'linked': self.linked, 'bytes_saved': self.bytes_saved}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_dedup_index(output_root):
+    """
+    Return the shared dedup index of an output root, opening it on first use.
+
+    Args:
+        output_root (str): Folder containing the channel folders
+
+    Returns:
+        DedupIndex: The root's index
+    """
+    key = os.path.abspath(output_root)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            os.makedirs(key, exist_ok=True)
+            index = DedupIndex(os.path.join(key, DEDUP_FILENAME))
+            _indexes[key] = index
+        return index
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if len(sys.argv) < 2:
+        print("Usage: python dedup.py <output folder> [more folders...]")
+        sys.exit(1)
+    for root in sys.argv[1:]:
+        index = get_dedup_index(root)
+        count = index.scan(root)
+        print(f"{root}: {count} duplicates hardlinked, {index.stats()['bytes_saved'] / 1024 / 1024:.1f} MiB saved")
@@ -1,64 +1,150 @@
 import os
-import yt_dlp
 import time
-import random
+import heapq
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
 import logging
+from pacing import AdaptiveRequestPacer
+from ydl_pool import get_pool, iter_playlist_entries
+from listing_state import get_listing_state
+from archive import get_archive
+from integrity import StreamingHasher, discard, get_integrity_manifest, is_intact
+from metrics import get_metrics
+from bandwidth import get_shaper
+from channel_resolver import get_resolver
+from utils import extract_video_id
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("downloader.log"),
-        logging.StreamHandler()
-    ]
-)
+# Logging is set up by the entry point (see utils.configure_logging)
 logger = logging.getLogger(__name__)
 
+# Number of videos downloaded in parallel by download_videos_from_links
+DEFAULT_MAX_WORKERS = 3
+
+# Outcomes of a single download attempt
+DOWNLOAD_OK = 'ok'
+DOWNLOAD_THROTTLED = 'throttled'
+DOWNLOAD_FAILED = 'failed'
+DOWNLOAD_CORRUPT = 'corrupt'
+
+# Throttled videos are retried after THROTTLE_RETRY_DELAY seconds, doubling per attempt
+MAX_THROTTLE_RETRIES = 3
+THROTTLE_RETRY_DELAY = 60
+# Downloads that fail their integrity check are retried MAX_CORRUPT_RETRIES times, after CORRUPT_RETRY_DELAY
+# seconds (a truncated transfer is not a rate limit, so there is no backoff)
+MAX_CORRUPT_RETRIES = 1
+CORRUPT_RETRY_DELAY = 5
+
+# A transfer slower than THROTTLED_SPEED bytes/s after THROTTLE_DETECT_AFTER seconds counts as throttled
+THROTTLED_SPEED = 100 * 1024
+THROTTLE_DETECT_AFTER = 5
+
+# Base yt-dlp options of the pooled sessions; per-call options are passed as overrides
+LISTING_OPTS = {
+    'quiet': True,
+    'extract_flat': True,
+    'no_warnings': True,
+    'ignore_no_formats_error': True,
+    'age_limit': 99
+}
+
+DOWNLOAD_OPTS = {
+    'format': 'mp4',
+    'no_warnings': True,
+    'age_limit': 99,
+    'overwrites': False,  # Prevent overwriting existing files
+    'continuedl': True,  # Resume interrupted downloads from their .part file
+    # Request spacing is handled by the shared request pacer and bandwidth by the shared shaper
+    'sleep_interval_requests': 2
+}
+
 def extract_shorts_playlist(channel_url):
-    if '@' in channel_url:
-        username = channel_url.split('@')[1].split('/')[0]
-        return f"https://www.youtube.com/@{username}/shorts"
-    elif '/c/' in channel_url:
-        channel_name = channel_url.split('/c/')[1].split('/')[0]
-        return f"https://www.youtube.com/c/{channel_name}/shorts"
-    elif '/channel/' in channel_url:
-        channel_id = channel_url.split('/channel/')[1].split('/')[0]
-        return f"https://www.youtube.com/channel/{channel_id}/shorts"
+    # Every alias of a channel lists the same canonical tab (and shares its listing state)
+    channel = get_resolver().resolve(channel_url)
+    if channel:
+        return channel['shorts_url']
     return f"{channel_url.rstrip('/')}/shorts"
 
-def get_short_links(channel_url, progress_var, progress_label_var, max_videos=None):
+def _get_new_short_links(ydl, playlist_url, max_videos):
+    seen = get_listing_state().seen_ids(playlist_url)
+    new_ids = []
+    for entry in iter_playlist_entries(ydl, playlist_url):
+        if not entry or 'id' not in entry:
+            continue
+        if entry['id'] in seen:
+            break
+        new_ids.append(entry['id'])
+        if max_videos and len(new_ids) >= max_videos:
+            break
+    return [f'https://www.youtube.com/shorts/{video_id}' for video_id in new_ids]
+
+def mark_short_links_seen(channel_url, links):
+    """
+    Advance a channel's high-water mark past links returned by an incremental listing.
+
+    Call it once the channel's new shorts were handled, so a failed or cancelled
+    run lists them as new again.
+
+    Args:
+        channel_url (str): Channel URL (any alias)
+        links (list): Links from get_short_links(incremental=True), newest first
+    """
+    new_ids = [video_id for video_id in (extract_video_id(link) for link in links) if video_id]
+    get_listing_state().update(extract_shorts_playlist(channel_url), new_ids)
+
+def iter_short_links(channel_url, max_videos=None):
+    """
+    Yield the shorts links of a channel while paging through its listing.
+
+    Pages are requested as the caller consumes links, so memory stays
+    constant however many shorts the channel has; feed the generator
+    straight into download_videos_from_links to start downloading while
+    the channel is still being listed.
+
+    Args:
+        channel_url (str): Channel URL (any alias)
+        max_videos (int): Stop after this many links (newest first)
+    """
     playlist_url = extract_shorts_playlist(channel_url)
-    logger.info(f"Fetching shorts from playlist: {playlist_url}")
-    
-    ydl_opts = {
-        'quiet': True,
-        'extract_flat': True,
-        'no_warnings': True,
-        'ignore_no_formats_error': True,
-        'age_limit': 99
-    }
+    logger.info(f"Streaming shorts from playlist: {playlist_url}")
+    count = 0
+    with get_pool().session('listing', LISTING_OPTS) as ydl:
+        for entry in iter_playlist_entries(ydl, playlist_url, span='channel_listing'):
+            if not entry or 'id' not in entry:
+                continue
+            yield f'https://www.youtube.com/shorts/{entry["id"]}'
+            count += 1
+            if max_videos and count >= max_videos:
+                break
+    logger.info(f"Listed {count} shorts from {playlist_url}")
 
-    if max_videos:
-        ydl_opts['playlist_end'] = max_videos
+def get_short_links(channel_url, progress_var, progress_label_var, max_videos=None, incremental=False):
+    """
+    List the shorts of a channel.
 
+    With incremental=True only shorts newer than the channel's stored
+    high-water mark are returned, and paging stops at the first short that
+    was already seen by a previous listing. The mark is not moved: call
+    mark_short_links_seen once the shorts were handled. Use iter_short_links to stream
+    the links of very large channels instead of building the list.
+    """
+    update_label(progress_label_var, "Fetching videos from channel...")
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            update_label(progress_label_var, "Fetching videos from channel...")
-            result = ydl.extract_info(playlist_url, download=False)
-            
-            if result and 'entries' in result:
-                links = [f'https://www.youtube.com/shorts/{entry["id"]}' 
-                       for entry in result['entries'] 
-                       if entry and 'id' in entry]
-                logger.info(f"Found {len(links)} shorts in channel")
-                return links
-            else:
-                update_label(progress_label_var, "No videos found in channel")
-                logger.warning(f"No videos found in channel: {channel_url}")
-                return []
-                
+        if incremental:
+            playlist_url = extract_shorts_playlist(channel_url)
+            logger.info(f"Fetching new shorts from playlist: {playlist_url}")
+            with get_pool().session('listing', LISTING_OPTS) as ydl, get_metrics().span('channel_listing'):
+                links = _get_new_short_links(ydl, playlist_url, max_videos)
+            logger.info(f"Found {len(links)} new shorts in channel")
+            if not links:
+                update_label(progress_label_var, "No new videos in channel")
+            return links
+
+        links = list(iter_short_links(channel_url, max_videos))
+        if not links:
+            update_label(progress_label_var, "No videos found in channel")
+            logger.warning(f"No videos found in channel: {channel_url}")
+        return links
+
     except Exception as e:
         update_label(progress_label_var, f"Error: Failed to fetch videos - {str(e)}")
         logger.error(f"Failed to fetch videos from {channel_url}: {str(e)}")
@@ -81,9 +167,8 @@ def update_progress(progress_var, value):
 
 class DownloadLogger:
     def debug(self, msg):
-        if msg.startswith('[download] Destination:'):
-            self.filename = msg.split('Destination: ')[1]
-            logger.debug(f"Download destination: {self.filename}")
+        # Progress and the output filename are tracked through progress hooks (see metrics.TransferTracker)
+        pass
     
     def warning(self, msg):
         logger.warning(f"yt-dlp warning: {msg}")
@@ -91,110 +176,302 @@ class DownloadLogger:
     def error(self, msg):
         logger.error(f"yt-dlp error: {msg}")
 
-def download_single_video(link, output_path):
+def _throttle_hook(pacer, flow=None):
+    """
+    Progress hook that reports a transfer running below THROTTLED_SPEED to the pacer once.
+
+    Transfers that our own bandwidth shaper holds below THROTTLED_SPEED are not reported.
+    """
+    state = {'reported': False}
+
+    def hook(d):
+        if state['reported'] or d.get('status') != 'downloading':
+            return
+        if flow is not None and flow.limited_below(THROTTLED_SPEED):
+            return
+        speed, elapsed = d.get('speed'), d.get('elapsed') or 0
+        if speed is not None and elapsed >= THROTTLE_DETECT_AFTER and speed < THROTTLED_SPEED:
+            state['reported'] = True
+            pacer.on_throttle(f"transfer at {int(speed / 1024)} KiB/s")
+
+    hook.state = state
+    return hook
+
+def _download_video(link, output_path, extra_opts=None, pacer=None, journal=None, dedup=None, priority=1.0):
+    """
+    Download one video and classify the outcome.
+
+    If a journal is given, the video's task is marked in flight together with
+    its target path, so an interrupted download can be resumed (or its partial
+    file cleaned up) by a later run. If a dedup index is given, a video already
+    stored under another folder is hardlinked instead of downloaded, and a
+    downloaded file with known content is replaced by a hardlink. The transfer
+    draws from the process-wide bandwidth shaper, sharing it with the other
+    downloads of output_path according to priority. The file is hashed while
+    it downloads and recorded in the folder's integrity manifest; an existing
+    file that fails its check is removed and downloaded again.
+
+    Returns:
+        tuple: (status, filepath) where status is DOWNLOAD_OK, DOWNLOAD_THROTTLED
+            (429 or rate-limit error, worth retrying later), DOWNLOAD_CORRUPT (the
+            file did not have the size announced for its format and was removed)
+            or DOWNLOAD_FAILED
+    """
+    from yt_dlp.utils import DownloadError
+
+    metrics = get_metrics()
+    archive = get_archive(output_path)
+    video_id = extract_video_id(link)
+    archived_path = archive.lookup_existing(video_id)
+    if archived_path:
+        logger.info(f"Already in archive, skipping: {archived_path}")
+        metrics.incr('downloads_skipped')
+        return DOWNLOAD_OK, archived_path
+    linked_path = dedup.link_existing(video_id, output_path) if dedup else None
+    if linked_path:
+        logger.info(f"Linked existing copy from another folder: {linked_path}")
+        archive.add(video_id, linked_path)
+        metrics.incr('downloads_deduplicated')
+        return DOWNLOAD_OK, linked_path
+
     logger.info(f"Attempting to download: {link}")
-    download_logger = DownloadLogger()
-    ydl_opts = {
-        'format': 'mp4',
+    transfer = metrics.transfer()
+    flow = get_shaper().flow(output_path, priority)
+    hasher = StreamingHasher()
+    throttle_hook = _throttle_hook(pacer, flow) if pacer else None
+    overrides = {
         'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
-        'no_warnings': True,
-        'logger': download_logger,
-        'progress_hooks': [],
-        'age_limit': 99,
-        'overwrites': False,  # Prevent overwriting existing files
-        # Rate limiting options
-        'limit_rate': '1M',
-        'sleep_interval': 5,
-        'max_sleep_interval': 30,
-        'sleep_interval_requests': 2,
-        'throttled_rate': '100K'
+        'logger': DownloadLogger(),
+        'progress_hooks': [transfer, flow, hasher, throttle_hook] if throttle_hook else [transfer, flow, hasher],
     }
+    if extra_opts:
+        overrides.update(extra_opts)
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with get_pool().session('download', DOWNLOAD_OPTS, overrides) as ydl:
             # Check if the file already exists before downloading
-            info = ydl.extract_info(link, download=False)
+            with metrics.span('extract_info'):
+                info = ydl.extract_info(link, download=False)
             if info:
                 filename = ydl.prepare_filename(info)
-                if os.path.exists(filename):
+                # A truncated or corrupt file is removed here and downloaded again
+                if is_intact(filename):
                     logger.info(f"File already exists: {filename}")
                     print(f"File already exists: {filename}")
-                    return True, filename
+                    archive.add(info.get('id') or video_id, filename)
+                    metrics.incr('downloads_skipped')
+                    return DOWNLOAD_OK, filename
+                if journal:
+                    journal.start('video', video_id or link, {'path': filename})
+                transfer.begin(filename)
             
-            # If file doesn't exist, proceed with download
-            ydl.download([link])
-            if hasattr(download_logger, 'filename') and os.path.exists(download_logger.filename):
-                logger.info(f"Successfully downloaded: {download_logger.filename}")
-                return True, download_logger.filename
+                # If file doesn't exist, download using the info we already have (continuing any .part file)
+                ydl.process_ie_result(info, download=True)
+                transfer.close()
+            if transfer.filename and os.path.exists(transfer.filename):
+                if not get_integrity_manifest(output_path).record_download(hasher):
+                    discard(transfer.filename)
+                    return DOWNLOAD_CORRUPT, None
+                logger.info(f"Successfully downloaded: {transfer.filename}")
+                archive.add(info.get('id') or video_id, transfer.filename)
+                metrics.incr('downloads_succeeded')
+                if dedup and dedup.register(info.get('id') or video_id, transfer.filename):
+                    metrics.incr('content_duplicates_linked')
+                if pacer and not throttle_hook.state['reported']:
+                    pacer.on_success()
+                return DOWNLOAD_OK, transfer.filename
         logger.warning(f"Download completed but file not found for: {link}")
-        return False, None
-    except yt_dlp.utils.DownloadError as e:
+        metrics.incr('downloads_failed')
+        return DOWNLOAD_FAILED, None
+    except DownloadError as e:
         error_message = str(e).lower()
         if "already been downloaded" in error_message:
             # Extract the filename from the error message if possible
             logger.info(f"File already downloaded: {error_message}")
             print(f"File already downloaded: {error_message}")
-            return True, None  # Consider this a success
+            metrics.incr('downloads_skipped')
+            return DOWNLOAD_OK, None  # Consider this a success
         elif "rate limit" in error_message or "429" in error_message:
             logger.warning(f"Rate limit error: {error_message}")
             print(f"Rate limit error: {error_message}")
+            metrics.incr('downloads_throttled')
+            if pacer:
+                pacer.on_throttle("rate limit error")
+            return DOWNLOAD_THROTTLED, None
         else:
             logger.error(f"Download error: {error_message}")
             print(f"Download error: {error_message}")
-        return False, None
+        metrics.incr('downloads_failed')
+        return DOWNLOAD_FAILED, None
     except Exception as e:
         logger.error(f"Error downloading video: {str(e)}")
         print(f"Error downloading video: {str(e)}")
-        return False, None
+        metrics.incr('downloads_failed')
+        return DOWNLOAD_FAILED, None
+    finally:
+        flow.close()
+
+def download_single_video(link, output_path, extra_opts=None, pacer=None):
+    status, filepath = _download_video(link, output_path, extra_opts, pacer)
+    # A download that fails its integrity check is not counted as done; try it again right away
+    for _ in range(MAX_CORRUPT_RETRIES):
+        if status != DOWNLOAD_CORRUPT:
+            break
+        status, filepath = _download_video(link, output_path, extra_opts, pacer)
+    return status == DOWNLOAD_OK, filepath
+
+def _download_worker(link, output_path, pacer, progress_label_var, extra_opts, journal, dedup):
+    pacer.wait(lambda text: update_label(progress_label_var, text))
+    return _download_video(link, output_path, extra_opts, pacer, journal, dedup)
+
+def download_videos_from_links(links, output_path, progress_var, progress_label_var, progress_callback=None,
+                               max_workers=DEFAULT_MAX_WORKERS, pacer=None, extra_opts=None,
+                               max_retries=MAX_THROTTLE_RETRIES, retry_delay=THROTTLE_RETRY_DELAY, journal=None,
+                               dedup=None):
+    """
+    Download video links through a bounded worker pool.
+
+    Workers share a single pacer (by default an AdaptiveRequestPacer), which
+    spaces out request starts for the whole pool and adapts the request rate
+    to 429/throttling signals. Throttled videos go into a delayed retry queue
+    (retry_delay, doubling per attempt, up to max_retries) instead of being
+    dropped; downloads that fail their integrity check are retried up to
+    MAX_CORRUPT_RETRIES times after a short fixed delay. Progress updates
+    and progress_callback are issued from the calling thread as downloads
+    complete.
+
+    links may be a list or any iterable, e.g. the iter_short_links generator:
+    links are only pulled when a worker is about to free up, so a channel's
+    listing is paged in step with its downloads and memory stays bounded.
+    The progress bar moves once the number of links is known.
 
-def download_videos_from_links(links, output_path, progress_var, progress_label_var, progress_callback=None):
-    total_links = len(links)
+    If a JobJournal is given, every video is recorded in it (pending, in
+    flight, done or failed). Finished videos are skipped through the download
+    archive, interrupted ones resume from their partial file and the partial
+    files of failed ones are removed. With a DedupIndex, videos already stored
+    elsewhere under the same output root are hardlinked instead of downloaded.
+    """
+    total_links = len(links) if hasattr(links, '__len__') else None
+    if journal and total_links:
+        # A known list is recorded up front, so an interrupted run knows every video it still owes
+        for link in links:
+            journal.add('video', extract_video_id(link) or link, parent=output_path)
+    streamed = total_links is None
+    links = iter(links)
     successful_downloads = 0
-    
-    logger.info(f"Starting download of {total_links} videos to {output_path}")
+    completed = 0
+    submitted = 0
+    pacer = pacer or AdaptiveRequestPacer()
+    # Links pulled ahead of the workers, so a worker never waits for the listing
+    max_pending = max(1, max_workers) * 2
+
+    def of_total():
+        return f"{completed}/{total_links if total_links is not None else '?'}"
+
+    logger.info(f"Starting download of {total_links if total_links is not None else 'streamed'} videos "
+                f"to {output_path} with {max_workers} workers")
     os.makedirs(output_path, exist_ok=True)
+    if total_links == 0:
+        update_label(progress_label_var, "Download completed! Successfully downloaded 0/0 videos")
+        return
     
-    for index, link in enumerate(links, start=1):
-        try:
-            update_label(progress_label_var, f"Downloading video {index}/{total_links}")
-            
-            # Initial small delay before each download attempt
-            time.sleep(random.uniform(2, 5))
-            
-            success, filepath = download_single_video(link, output_path)
-            
-            if success and filepath:
-                successful_downloads += 1
-                update_label(progress_label_var, 
-                    f"Downloaded video {index}/{total_links} (Success: {successful_downloads})")
-                logger.info(f"Download success ({index}/{total_links}): {filepath}")
-                if progress_callback:
-                    progress_callback(filepath)
-            else:
-                update_label(progress_label_var, f"Skipped video {index}/{total_links} (unavailable)")
-                logger.warning(f"Skipped video {index}/{total_links}: {link}")
-                
-        except Exception as e:
-            logger.error(f"Error processing video {index}/{total_links}: {e}")
-            print(f"Error processing video {index}/{total_links}: {e}")
-            update_label(progress_label_var, f"Failed to download video {index}/{total_links}")
-            
-        finally:
-            update_progress(progress_var, int((index / total_links) * 100))
-            
-            # Sleep 21-31 seconds after every video download (changed from 11-21)
-            sleep_time = random.uniform(21, 31)
-            logger.info(f"Rate limiting pause for {int(sleep_time)} seconds...")
-            update_label(progress_label_var, f"Rate limiting pause for {int(sleep_time)} seconds...")
-            time.sleep(sleep_time)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="download") as executor:
+        def submit(link, key, throttled, corrupt):
+            future = executor.submit(_download_worker, link, output_path, pacer, progress_label_var, extra_opts,
+                                     journal, dedup)
+            pending[future] = (link, key, throttled, corrupt)
+
+        def pull():
+            nonlocal submitted, total_links, links
+            while links is not None and len(pending) < max_pending:
+                try:
+                    link = next(links, None)
+                except Exception as e:
+                    # The listing broke off; download what was listed so far
+                    logger.error(f"Listing failed after {submitted} videos: {e}")
+                    link = None
+                if link is None:
+                    links = None
+                    total_links = submitted
+                    return
+                key = extract_video_id(link) or link
+                if journal and streamed:
+                    journal.add('video', key, parent=output_path)
+                submitted += 1
+                submit(link, key, 0, 0)
+
+        pending = {}
+        # Heap of (due time, link, key, throttled retries, corrupt retries); each kind has its own limit
+        retry_queue = []
+        pull()
+        update_label(progress_label_var, f"Downloading {total_links if total_links is not None else 'channel'} "
+                                         f"videos ({max_workers} at a time)")
+        
+        while pending or retry_queue:
+            now = time.monotonic()
+            while retry_queue and retry_queue[0][0] <= now:
+                _, link, key, throttled, corrupt = heapq.heappop(retry_queue)
+                submit(link, key, throttled, corrupt)
+            timeout = max(0.0, retry_queue[0][0] - now) if retry_queue else None
+            if not pending:
+                time.sleep(timeout)
+                continue
             
-            # Additional longer pause every 10 videos
-            if index % 10 == 0:
-                delay = random.uniform(15, 30)
-                logger.info(f"Extended rate limiting pause for {int(delay)} seconds...")
-                update_label(progress_label_var, f"Extended rate limiting pause for {int(delay)} seconds...")
-                time.sleep(delay)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                link, key, throttled, corrupt = pending.pop(future)
+                try:
+                    status, filepath = future.result()
+                    
+                    if status == DOWNLOAD_THROTTLED and throttled < max_retries:
+                        if journal:
+                            journal.release('video', key)
+                        delay = retry_delay * (2 ** throttled)
+                        heapq.heappush(retry_queue, (time.monotonic() + delay, link, key, throttled + 1, corrupt))
+                        logger.info(f"Throttled, retrying in {int(delay)}s (attempt {throttled + 1}): {link}")
+                        update_label(progress_label_var, f"Throttled, video queued for retry in {int(delay)} seconds")
+                        continue
+                    if status == DOWNLOAD_CORRUPT and corrupt < MAX_CORRUPT_RETRIES:
+                        if journal:
+                            journal.release('video', key)
+                        heapq.heappush(retry_queue, (time.monotonic() + CORRUPT_RETRY_DELAY, link, key, throttled,
+                                                     corrupt + 1))
+                        logger.info(f"Incomplete download, retrying (attempt {corrupt + 1}): {link}")
+                        update_label(progress_label_var, "Incomplete download, video queued for retry")
+                        continue
+                    
+                    completed += 1
+                    if journal:
+                        if status == DOWNLOAD_OK:
+                            journal.finish('video', key, {'path': filepath})
+                        else:
+                            journal.fail('video', key, status)
+                    if status == DOWNLOAD_OK and filepath:
+                        successful_downloads += 1
+                        update_label(progress_label_var, 
+                            f"Downloaded video {of_total()} (Success: {successful_downloads})")
+                        logger.info(f"Download success ({of_total()}): {filepath}")
+                        if progress_callback:
+                            progress_callback(filepath)
+                    else:
+                        update_label(progress_label_var, f"Skipped video {of_total()} (unavailable)")
+                        logger.warning(f"Skipped video {of_total()}: {link}")
+                        
+                except Exception as e:
+                    completed += 1
+                    if journal:
+                        journal.fail('video', key, str(e))
+                    logger.error(f"Error processing video {of_total()}: {e}")
+                    print(f"Error processing video {of_total()}: {e}")
+                    update_label(progress_label_var, f"Failed to download video {of_total()}")
+                    
+                if total_links:
+                    update_progress(progress_var, int((completed / total_links) * 100))
+            pull()
     
+    if hasattr(pacer, 'stats'):
+        logger.info(f"Pacer: {pacer.stats()}")
+    logger.info(f"Bandwidth: {get_shaper().stats()}")
     logger.info(f"Download completed! Successfully downloaded {successful_downloads}/{total_links} videos")
     update_label(progress_label_var, 
         f"Download completed! Successfully downloaded {successful_downloads}/{total_links} videos")
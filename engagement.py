@@ -0,0 +1,254 @@
+"""
+Time-series store of video engagement and growth-based scoring.
+
+Every time a channel listing is fetched, the view and comment counts of its
+videos are appended to an SQLite table as (video_id, timestamp, views,
+comments) snapshots. Rows are never updated; the table is clustered on
+(video_id, timestamp), so reading the recent history of a channel's videos
+is a set of short sequential range scans no matter how large the history
+grows.
+
+``score_growth`` turns the snapshots of all videos into view velocity
+(views/hour) and acceleration (views/hour per hour) with a handful of NumPy
+operations over the whole history at once, so scoring thousands of videos
+takes milliseconds:
+
+- velocity is measured between the latest snapshot and the latest one at
+  least ``window`` seconds older;
+- acceleration compares that velocity with the velocity over the window
+  before it;
+- videos seen only once get their lifetime average (views since upload) as
+  velocity and no acceleration.
+
+NumPy is imported when scoring first runs; recording snapshots does not need it.
+"""
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENGAGEMENT_HISTORY_FILE = "engagement_history.sqlite"
+
+# Minimum time between the two snapshots a velocity is measured over
+VELOCITY_WINDOW = 60 * 60            # 1 hour
+# History older than this is not read when scoring
+LOOKBACK = 7 * 24 * 60 * 60          # 1 week
+# Ids per query (stays below SQLite's bound-variable limit)
+QUERY_CHUNK = 500
+
+
+def upload_timestamps(upload_dates):
+    """
+    Convert YYYYMMDD upload dates to epoch seconds (NaN where unknown).
+
+    Args:
+        upload_dates (list): Upload date strings or None
+
+    Returns:
+        numpy.ndarray: float64 epoch seconds
+    """
+    import numpy as np
+
+    iso = [f"{d[:4]}-{d[4:6]}-{d[6:8]}" if d and len(d) == 8 else "NaT" for d in upload_dates]
+    days = np.array(iso, dtype='datetime64[D]')
+    seconds = days.astype('datetime64[s]').astype(np.float64)
+    seconds[np.isnat(days)] = np.nan
+    return seconds
+
+
+def score_growth(groups, timestamps, views, num_videos, upload_times=None, now=None, window=VELOCITY_WINDOW):
+    """
+    Compute view velocity and acceleration of many videos at once.
+
+    Args:
+        groups (numpy.ndarray): Video index (0..num_videos-1) of every snapshot; snapshots of a
+            video must be contiguous and sorted by timestamp, with indices ascending
+        timestamps (numpy.ndarray): Epoch seconds of every snapshot
+        views (numpy.ndarray): View count of every snapshot
+        num_videos (int): Number of videos
+        upload_times (numpy.ndarray): Upload time (epoch seconds, NaN if unknown) of every video,
+            used for videos with a single snapshot
+        now (float): Reference time for the lifetime average (defaults to now)
+        window (float): Minimum seconds between the snapshots a velocity is measured over
+
+    Returns:
+        tuple: (velocity, acceleration) float64 arrays of length num_videos, in views/hour and
+            views/hour per hour; 0 where there is not enough history
+    """
+    import numpy as np
+
+    velocity = np.zeros(num_videos)
+    acceleration = np.zeros(num_videos)
+    if len(groups) == 0:
+        return velocity, acceleration
+    groups = np.asarray(groups, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    views = np.asarray(views, dtype=np.float64)
+
+    # Latest snapshot of every video that has one
+    last = np.flatnonzero(np.r_[groups[1:] != groups[:-1], True])
+    videos = groups[last]
+
+    # A single sort key (video, time) lets searchsorted find "latest snapshot at least
+    # `window` older" for every video in one call
+    span = timestamps.max() - timestamps.min() + 2 * window + 1
+    keys = groups * span + (timestamps - timestamps.min())
+
+    def earlier(rows):
+        found = np.searchsorted(keys, keys[rows] - window, side='right') - 1
+        valid = (found >= 0) & (groups[np.maximum(found, 0)] == groups[rows])
+        return np.maximum(found, 0), valid
+
+    def rate(newer, older):
+        return (views[newer] - views[older]) / (timestamps[newer] - timestamps[older]) * 3600
+
+    prev, has_prev = earlier(last)
+    prev2, has_prev2 = earlier(prev)
+    has_prev2 &= has_prev
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        recent = rate(last, prev)
+        before = rate(prev, prev2)
+        # Acceleration over the time between the midpoints of the two intervals
+        midpoints = ((timestamps[last] + timestamps[prev]) - (timestamps[prev] + timestamps[prev2])) / 2 / 3600
+        change = (recent - before) / midpoints
+
+        if upload_times is not None:
+            now = time.time() if now is None else now
+            age = (now - np.asarray(upload_times, dtype=np.float64)[videos]) / 3600
+            lifetime = views[last] / np.maximum(age, 1.0)
+        else:
+            lifetime = np.zeros(len(last))
+
+    velocity[videos] = np.where(has_prev, recent, lifetime)
+    acceleration[videos] = np.where(has_prev2, change, 0.0)
+    np.nan_to_num(velocity, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    np.nan_to_num(acceleration, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    return velocity, acceleration
+
+
+class EngagementStore:
+    """Append-only SQLite store of (video_id, timestamp, views, comments) snapshots."""
+
+    def __init__(self, path=ENGAGEMENT_HISTORY_FILE):
+        """
+        Args:
+            path (str): Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshots ("
+            "video_id TEXT, ts REAL, views INTEGER, comments INTEGER, "
+            "PRIMARY KEY (video_id, ts)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def record(self, videos, timestamp=None):
+        """
+        Append one snapshot per video.
+
+        Args:
+            videos (list): Video dicts with 'video_id', 'views' and 'comments'
+            timestamp (float): Time of the snapshot (defaults to now)
+
+        Returns:
+            int: Number of snapshots written
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        rows = [(video['video_id'], timestamp, video.get('views') or 0, video.get('comments') or 0)
+                for video in videos if video.get('video_id')]
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def history(self, video_ids, since=None):
+        """
+        Read the snapshots of videos as arrays ready for ``score_growth``.
+
+        Args:
+            video_ids (list): Video ids; index i of the list is video index i in the result
+            since (float): Ignore snapshots older than this (epoch seconds)
+
+        Returns:
+            tuple: (groups, timestamps, views, comments) numpy arrays
+        """
+        import numpy as np
+
+        since = since or 0
+        index = {}
+        for i, video_id in enumerate(video_ids):
+            index.setdefault(video_id, i)
+        ordered = sorted(index)
+        rows = []
+        with self._lock:
+            for start in range(0, len(ordered), QUERY_CHUNK):
+                chunk = ordered[start:start + QUERY_CHUNK]
+                rows.extend(self._conn.execute(
+                    f"SELECT video_id, ts, views, comments FROM snapshots "
+                    f"WHERE video_id IN ({','.join('?' * len(chunk))}) AND ts >= ? ORDER BY video_id, ts",
+                    (*chunk, since)
+                ).fetchall())
+        if not rows:
+            empty = np.zeros(0)
+            return empty.astype(np.int64), empty, empty, empty
+        ids, timestamps, views, comments = zip(*rows)
+        groups = np.fromiter((index[video_id] for video_id in ids), dtype=np.int64, count=len(rows))
+        # Rows are grouped by video; order the groups by video index as score_growth expects
+        order = np.argsort(groups, kind='stable')
+        return (groups[order], np.array(timestamps)[order],
+                np.array(views, dtype=np.float64)[order], np.array(comments, dtype=np.float64)[order])
+
+    def score(self, videos, now=None, window=VELOCITY_WINDOW, lookback=LOOKBACK):
+        """
+        Add 'views_per_hour' and 'acceleration' to video dicts from their recorded history.
+
+        Args:
+            videos (list): Video dicts with 'video_id' and 'upload_date'
+            now (float): Reference time (defaults to now)
+            window (float): Minimum seconds between the snapshots a velocity is measured over
+            lookback (float): Seconds of history taken into account
+
+        Returns:
+            list: The same list
+        """
+        if not videos:
+            return videos
+        now = time.time() if now is None else now
+        video_ids = [video['video_id'] for video in videos]
+        groups, timestamps, views, _ = self.history(video_ids, since=now - lookback)
+        velocity, acceleration = score_growth(
+            groups, timestamps, views, len(video_ids),
+            upload_times=upload_timestamps([video.get('upload_date') for video in videos]),
+            now=now, window=window
+        )
+        # Duplicate ids share the scores of their first occurrence
+        first = {}
+        for i, video_id in enumerate(video_ids):
+            first.setdefault(video_id, i)
+        for video in videos:
+            i = first[video['video_id']]
+            video['views_per_hour'] = round(float(velocity[i]), 3)
+            video['acceleration'] = round(float(acceleration[i]), 3)
+        return videos
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_engagement_store():
+    """Return the shared engagement history store, opening it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EngagementStore()
+        return _store
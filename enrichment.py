@@ -0,0 +1,262 @@
+"""
+Batched video statistics from the YouTube Data API.
+
+Flat channel listings (``extract_flat``) often lack view and comment counts,
+and asking yt-dlp for the full info of every video costs one heavy request
+per video. ``videos.list`` instead returns the statistics of up to 50 videos
+for a single quota unit, so a channel of 500 shorts is enriched with 10 small
+calls. Batches are requested concurrently.
+
+API usage is tracked against the daily quota in a small SQLite file shared by
+all processes; once the daily budget is spent, enrichment is skipped (the
+listing values are kept) until the quota resets at midnight Pacific time.
+
+Set ``YOUTUBE_API_ENDPOINT`` (or pass ``api_endpoint``) to send the requests
+to another server, e.g. the local stand-in in standin.py.
+"""
+import os
+import time
+import sqlite3
+import datetime
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+QUOTA_FILENAME = "api_quota.sqlite"
+
+# videos.list accepts at most 50 ids and costs 1 quota unit per call
+BATCH_SIZE = 50
+VIDEOS_LIST_COST = 1
+# Default daily quota of a YouTube Data API project
+DAILY_QUOTA = 10000
+MAX_WORKERS = 4
+
+try:
+    from zoneinfo import ZoneInfo
+    _QUOTA_TZ = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database (e.g. Windows without tzdata): Pacific standard time is close enough
+    _QUOTA_TZ = datetime.timezone(datetime.timedelta(hours=-8))
+
+
+def quota_day():
+    """Return the current quota day; the API quota resets at midnight Pacific time."""
+    return datetime.datetime.now(_QUOTA_TZ).strftime("%Y-%m-%d")
+
+
+class QuotaTracker:
+    """Counts the API quota units spent per day, backed by SQLite so processes share the count."""
+
+    def __init__(self, path=QUOTA_FILENAME, daily_budget=DAILY_QUOTA):
+        """
+        Args:
+            path (str): Path of the SQLite file
+            daily_budget (int): Units that may be spent per quota day
+        """
+        self.path = path
+        self.daily_budget = daily_budget
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS usage (day TEXT PRIMARY KEY, units INTEGER)")
+
+    def reserve(self, units):
+        """
+        Spend quota units if today's budget allows it.
+
+        Returns:
+            bool: True if the units were reserved, False if the budget is spent
+        """
+        day = quota_day()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT units FROM usage WHERE day = ?", (day,)).fetchone()
+                used = row[0] if row else 0
+                if used + units > self.daily_budget:
+                    return False
+                self._conn.execute("INSERT OR REPLACE INTO usage (day, units) VALUES (?, ?)", (day, used + units))
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def exhaust(self):
+        """Mark today's budget as spent (the API reported quotaExceeded)."""
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO usage (day, units) VALUES (?, ?)",
+                               (quota_day(), self.daily_budget))
+
+    def used(self):
+        """Return the units spent today."""
+        with self._lock:
+            row = self._conn.execute("SELECT units FROM usage WHERE day = ?", (quota_day(),)).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self):
+        """Return the units left today."""
+        return max(0, self.daily_budget - self.used())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StatisticsEnricher:
+    """Fills in view, like and comment counts of listed videos with batched videos.list calls."""
+
+    def __init__(self, api_key, quota=None, max_workers=MAX_WORKERS, api_endpoint=None):
+        """
+        Args:
+            api_key (str): YouTube Data API key
+            quota (QuotaTracker): Daily quota tracker (defaults to the shared one)
+            max_workers (int): Number of batches requested concurrently
+            api_endpoint (str): Root URL of the API (defaults to $YOUTUBE_API_ENDPOINT or Google's)
+        """
+        self.api_key = api_key
+        self.quota = quota or get_quota_tracker()
+        self.max_workers = max_workers
+        self.api_endpoint = api_endpoint or os.environ.get("YOUTUBE_API_ENDPOINT")
+        self._local = threading.local()
+
+    def _service(self):
+        # googleapiclient services are not thread-safe; every worker thread builds its own
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+            service = build('youtube', 'v3', developerKey=self.api_key, client_options=client_options,
+                            static_discovery=True, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def _fetch_batch(self, video_ids):
+        from googleapiclient.errors import HttpError
+
+        if not self.quota.reserve(VIDEOS_LIST_COST):
+            return None
+        metrics = get_metrics()
+        metrics.incr('api_calls')
+        metrics.incr('api_quota_units', VIDEOS_LIST_COST)
+        try:
+            response = self._service().videos().list(
+                part='statistics', id=','.join(video_ids), maxResults=BATCH_SIZE
+            ).execute()
+        except HttpError as e:
+            if e.resp.status == 403 and 'quotaExceeded' in str(e):
+                self.quota.exhaust()
+                logger.warning("YouTube API quota exceeded, enrichment paused until the quota resets")
+            else:
+                logger.error(f"videos.list failed: {e}")
+            metrics.incr('api_errors')
+            return {}
+        except Exception as e:
+            logger.error(f"videos.list failed: {e}")
+            metrics.incr('api_errors')
+            return {}
+        statistics = {}
+        for item in response.get('items', []):
+            stats = item.get('statistics', {})
+            # The API returns counts as strings and omits hidden ones
+            statistics[item['id']] = {
+                name: int(stats[key]) for name, key in
+                (('views', 'viewCount'), ('likes', 'likeCount'), ('comments', 'commentCount')) if key in stats
+            }
+        return statistics
+
+    def fetch(self, video_ids):
+        """
+        Fetch the statistics of videos, 50 per call, with batches running concurrently.
+
+        Args:
+            video_ids (list): YouTube video ids
+
+        Returns:
+            dict: {video_id: {'views', 'likes', 'comments'}} for the videos the API returned
+                (counts hidden by the uploader are left out)
+        """
+        video_ids = list(dict.fromkeys(video_id for video_id in video_ids if video_id))
+        batches = [video_ids[i:i + BATCH_SIZE] for i in range(0, len(video_ids), BATCH_SIZE)]
+        if not batches:
+            return {}
+        statistics = {}
+        calls = skipped = 0
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches)),
+                                thread_name_prefix="enrichment") as executor:
+            for batch, result in zip(batches, executor.map(self._fetch_batch, batches)):
+                if result is None:
+                    skipped += len(batch)
+                else:
+                    calls += 1
+                    statistics.update(result)
+        get_metrics().observe('metadata_enrichment', time.monotonic() - start)
+        if skipped:
+            logger.warning(f"YouTube API daily quota spent, {skipped} videos not enriched")
+        logger.info(f"Enriched {len(statistics)}/{len(video_ids)} videos in {calls} API calls "
+                    f"({self.quota.remaining()} quota units left today)")
+        return statistics
+
+    def enrich(self, videos):
+        """
+        Update video dicts (as built by ViralAnalyzer) in place with API statistics.
+
+        Videos the API did not return keep their listing values; every video
+        gets a 'likes' key (None if the count is unknown).
+
+        Args:
+            videos (list): Dicts with 'video_id', 'views' and 'comments'
+
+        Returns:
+            list: The same list
+        """
+        statistics = self.fetch([video.get('video_id') for video in videos])
+        for video in videos:
+            video.update(statistics.get(video.get('video_id'), {}))
+            video.setdefault('likes', None)
+        return videos
+
+
+_quota_trackers = {}
+_quota_lock = threading.Lock()
+# Key found by secure_config, looked up once per process
+_configured_key = None
+
+
+def get_quota_tracker(path=QUOTA_FILENAME):
+    """Return the shared quota tracker stored at ``path``, opening it on first use."""
+    key = os.path.abspath(path)
+    with _quota_lock:
+        tracker = _quota_trackers.get(key)
+        if tracker is None:
+            tracker = QuotaTracker(key)
+            _quota_trackers[key] = tracker
+        return tracker
+
+
+def get_enricher(api_key=None):
+    """
+    Return a statistics enricher using the configured API key.
+
+    Args:
+        api_key (str): API key; defaults to the key found by secure_config
+
+    Returns:
+        StatisticsEnricher: The enricher, or None if no API key is configured
+    """
+    global _configured_key
+    if not api_key:
+        if _configured_key is None:
+            from config import load_environment
+            load_environment()
+            try:
+                from secure_config import get_api_key
+            except ImportError:
+                _configured_key = os.environ.get("YOUTUBE_API_KEY", "")
+            else:
+                _configured_key = get_api_key()
+        api_key = _configured_key
+    if not api_key:
+        return None
+    return StatisticsEnricher(api_key)
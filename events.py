@@ -0,0 +1,113 @@
+"""
+Thread-safe, coalescing progress event bus for the Tk GUI.
+
+Tk widgets and variables may only be touched from the thread running the
+main loop. Worker threads (the channel pipeline, download workers, the
+analyzer) instead get ``BusVar`` proxies: calling ``set()`` on a proxy only
+records the new value on the bus. The main loop drains the bus every
+``interval_ms`` and applies the latest value of each variable once, so the
+UI does a constant amount of work per refresh no matter how many downloads
+report progress in parallel. Only variable updates are coalesced; queued
+calls (``call``) are never dropped.
+"""
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 100
+# Pending calls above which a stalled main loop is reported
+CALL_BACKLOG_WARNING = 1000
+
+
+class BusVar:
+    """Drop-in stand-in for a tkinter variable that is safe to set from any thread."""
+
+    def __init__(self, bus, var):
+        self._bus = bus
+        self._var = var
+        self._value = var.get()
+
+    def set(self, value):
+        self._value = value
+        self._bus.publish(self._var, value)
+
+    def get(self):
+        """Return the last value set through the proxy (without touching Tk)."""
+        return self._value
+
+
+class ProgressBus:
+    """Collects progress events from worker threads and applies them on the Tk main loop."""
+
+    def __init__(self, root, interval_ms=DEFAULT_INTERVAL_MS):
+        """
+        Args:
+            root: Tk root (or any widget) whose ``after`` schedules the refresh
+            interval_ms (int): Refresh interval in milliseconds
+        """
+        self.root = root
+        self.interval_ms = interval_ms
+        self._lock = threading.Lock()
+        self._values = {}
+        self._calls = deque()
+        self._backlog_reported = False
+        self._after_id = None
+        self.published = 0
+        self.applied = 0
+
+    def var(self, tk_var):
+        """Wrap a tkinter variable in a thread-safe proxy."""
+        return BusVar(self, tk_var)
+
+    def publish(self, tk_var, value):
+        """Record the latest value of a variable; earlier unapplied values are dropped."""
+        with self._lock:
+            # tkinter variables are unhashable; key them by their Tcl name
+            self._values[str(tk_var)] = (tk_var, value)
+            self.published += 1
+
+    def call(self, func, *args):
+        """Queue a callback to run on the main loop (e.g. appending to the download history)."""
+        with self._lock:
+            self._calls.append((func, args))
+            backlog = len(self._calls)
+            report = backlog >= CALL_BACKLOG_WARNING and not self._backlog_reported
+            if report:
+                self._backlog_reported = True
+        if report:
+            logger.warning(f"{backlog} GUI callbacks are waiting for the main loop")
+
+    def start(self):
+        """Start draining the bus on the main loop."""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _drain(self):
+        self.flush()
+        self._after_id = self.root.after(self.interval_ms, self._drain)
+
+    def flush(self):
+        """Apply everything published so far; must run on the main loop thread."""
+        with self._lock:
+            values, self._values = self._values, {}
+            calls = list(self._calls)
+            self._calls.clear()
+            self._backlog_reported = False
+        for tk_var, value in values.values():
+            try:
+                tk_var.set(value)
+                self.applied += 1
+            except Exception as e:
+                logger.error(f"GUI update error: {value} - {e}")
+        for func, args in calls:
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"GUI callback error: {e}")
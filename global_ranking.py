@@ -0,0 +1,187 @@
+"""
+Cross-channel virality ranking and a priority download queue.
+
+Ranking channel by channel gives a weak channel as many downloads as a
+strong one. In global mode every channel is analyzed first; each candidate
+video then gets a score relative to its own channel, and all candidates go
+into one priority queue that is downloaded best first under a total budget,
+so the most valuable shorts land first even if the run is cut short.
+
+A video's engagement is its projected view velocity (see ranking.growth_key)
+when engagement history is used, otherwise its view count. Its
+``channel_score`` is the z-score of log(1 + engagement) against every video
+listed for the channel (accumulated by ``ChannelStats`` while the listing
+streams), shrunk towards 0 for channels with few videos, whose statistics
+say little.
+"""
+import math
+import heapq
+import threading
+import logging
+from ranking import GROWTH_HORIZON
+
+logger = logging.getLogger(__name__)
+
+# A channel with this many videos has its z-scores halved
+SHRINKAGE_VIDEOS = 10
+# Lower bound of a channel's standard deviation, so a uniform channel does not produce huge scores
+MIN_STD = 0.25
+
+
+def engagement(video):
+    """Return the engagement of a ranked video dict: projected views/hour, or views without history."""
+    if 'views_per_hour' in video:
+        return max(0.0, video['views_per_hour'] + GROWTH_HORIZON * video.get('acceleration', 0))
+    return float(video.get('views') or 0)
+
+
+class ChannelStats:
+    """Running mean and deviation of a channel's log engagement, in constant memory (Welford)."""
+
+    def __init__(self):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def push(self, video):
+        """Add a video to the statistics."""
+        value = math.log1p(engagement(video))
+        self.count += 1
+        delta = value - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (value - self._mean)
+
+    def extend(self, videos):
+        """Add every video of an iterable to the statistics."""
+        for video in videos:
+            self.push(video)
+
+    @property
+    def mean(self):
+        return self._mean
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return 1.0
+        return max(MIN_STD, math.sqrt(self._m2 / self.count))
+
+    def score(self, video):
+        """Return the shrunk z-score of a video within the channel."""
+        if not self.count:
+            return 0.0
+        z = (math.log1p(engagement(video)) - self._mean) / self.std
+        return z * self.count / (self.count + SHRINKAGE_VIDEOS)
+
+
+def normalize(videos, stats=None):
+    """
+    Add 'channel_score' to a channel's ranked video dicts.
+
+    Args:
+        videos (list): The channel's top videos
+        stats (ChannelStats): Statistics of the whole channel listing (defaults to
+            statistics of the given videos only)
+
+    Returns:
+        list: The same list
+    """
+    if stats is None:
+        stats = ChannelStats()
+        stats.extend(videos)
+    for video in videos:
+        video['channel_score'] = round(stats.score(video), 4)
+    return videos
+
+
+class GlobalQueue:
+    """Thread-safe priority queue of candidate videos from every channel, best channel_score first."""
+
+    def __init__(self):
+        self._heap = []
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, channel_url, videos):
+        """Queue a channel's normalized videos (see normalize)."""
+        with self._lock:
+            for video in videos:
+                # Equal scores: higher raw engagement first, then insertion order
+                heapq.heappush(self._heap, (-video.get('channel_score', 0.0), -engagement(video), self._count,
+                                            channel_url, video))
+                self._count += 1
+
+    def pop(self):
+        """
+        Take the best queued video.
+
+        Returns:
+            tuple: (channel_url, video dict), or None if the queue is empty
+        """
+        with self._lock:
+            if not self._heap:
+                return None
+            item = heapq.heappop(self._heap)
+        return item[3], item[4]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._heap)
+
+
+def download_in_order(queue, download, budget=None, workers=1, should_skip=None):
+    """
+    Download queued videos best first with a pool of threads until the budget is spent.
+
+    Each worker takes the best remaining video when it becomes free, so
+    downloads start in global score order.
+
+    Args:
+        queue (GlobalQueue): Candidate videos
+        download: Callable (channel_url, video) returning the stored path or None
+        budget (int): Download attempts allowed (None: the whole queue)
+        workers (int): Videos downloaded at a time
+        should_skip: Optional callable (channel_url, video) returning the path of a video
+            that is already stored; such videos are reported without spending budget
+
+    Returns:
+        list: One dict per video taken (channel, video, path or None, already_stored), in the
+            order the videos were taken
+    """
+    lock = threading.Lock()
+    taken = []
+    spent = 0
+
+    def take():
+        nonlocal spent
+        with lock:
+            while budget is None or spent < budget:
+                item = queue.pop()
+                if item is None:
+                    return None
+                channel_url, video = item
+                existing = should_skip(channel_url, video) if should_skip else None
+                entry = {'channel': channel_url, 'video': video, 'path': existing, 'already_stored': bool(existing)}
+                taken.append(entry)
+                if not existing:
+                    spent += 1
+                    return entry
+        return None
+
+    def worker():
+        while True:
+            entry = take()
+            if entry is None:
+                return
+            try:
+                entry['path'] = download(entry['channel'], entry['video'])
+            except Exception as e:
+                logger.error(f"Downloading {entry['video'].get('video_id')} from {entry['channel']} failed: {e}")
+
+    threads = [threading.Thread(target=worker, name=f"global-download-{i}", daemon=True)
+               for i in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return taken
@@ -1,13 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
-from datetime import datetime, timedelta
+from datetime import datetime
 import threading
-import time
 import os
 import traceback
-import random
-from downloader import download_videos_from_links, get_short_links
-from utils import extract_channel_name
+from journal import get_journal
+from dedup import get_dedup_index
+from events import ProgressBus
+from poll_scheduler import PollScheduler
+from channel_resolver import get_resolver
+from utils import configure_logging, extract_channel_name, read_channels
 
 DEFAULT_DOWNLOAD_PATH = "C:\\PythonProjects\\Videos"
 CHANNELS_FILE = "channels.txt"
@@ -46,11 +48,15 @@ def run_gui():
             progress_label_var.set("Error: Invalid channel URL.")
             return
 
-        if channel_name in channel_listbox.get(0, tk.END):
-            progress_label_var.set("Error: Channel already in the list.")
+        # Catches aliases too (@Name vs @name/shorts, or a handle already resolved to a listed /channel/ URL);
+        # no network lookup on the UI thread
+        _, duplicates = get_resolver().dedupe(list(channel_listbox.get(0, tk.END)) + [channel_name], network=False)
+        if channel_name in duplicates:
+            progress_label_var.set(f"Error: Channel already in the list ({duplicates[channel_name]}).")
             return
 
         channel_listbox.insert(tk.END, channel_name)
+        scheduler.set_channels(channel_listbox.get(0, tk.END))
         channel_entry.delete(0, tk.END)
         progress_label_var.set(f"Added channel: {channel_name}")
 
@@ -61,97 +67,94 @@ def run_gui():
             return
 
         channel_listbox.delete(selected[0])
+        scheduler.set_channels(channel_listbox.get(0, tk.END))
         progress_label_var.set("Channel removed.")
 
     def update_download_history(history_widget, filepath):
         history_widget.add_entry(f"Downloaded: {filepath}")
 
-    def on_start_button_click(folder_var, channel_listbox, progress_var, progress_label_var, history_widget, current_channel_var, max_videos=None):
-        from viral_analyzer import ViralAnalyzer
-        from config import MAX_VIDEOS_TO_ANALYZE, MAX_VIDEOS_TO_DOWNLOAD
+    active_pipelines = []
+
+    def on_start_button_click(folder_var, channel_listbox, progress_var, progress_label_var, history_widget, current_channel_var, max_videos=None,
+                              channels=None, on_finished=None):
+        # The pipeline (and the yt-dlp/asyncio machinery behind it) is loaded by the first run, not at startup
+        from config import MAX_VIDEOS_TO_ANALYZE, MAX_VIDEOS_TO_DOWNLOAD, SHARED_OUTPUT_FOLDER
+        from pipeline import ChannelPipeline
+        from postprocess import PostProcessor
+        from leases import LeaseManager
         
         output_directory = folder_var.get()
         if not output_directory:
             progress_label_var.set("Error: Please select a folder.")
-            return
+            return False
 
         try:
             os.makedirs(output_directory, exist_ok=True)
         except OSError as e:
             progress_label_var.set(f"Error: Failed to create folder - {e}")
-            return
+            return False
 
-        channels = channel_listbox.get(0, tk.END)
+        channels = channels or channel_listbox.get(0, tk.END)
         if not channels:
             progress_label_var.set("Error: No channels in the list.")
-            return
+            return False
+
+        # One run at a time, so no channel is ever processed by two runs at once
+        if active_pipelines:
+            progress_label_var.set("A download run is already in progress.")
+            return False
 
         def custom_progress_callback(filepath):
-            history_widget.after(0, lambda: update_download_history(history_widget, filepath))
+            bus.call(update_download_history, history_widget, filepath)
+
+        # Worker threads only publish to the bus; the main loop applies the updates
+        worker_label_var = bus.var(progress_label_var)
+        pipeline = ChannelPipeline(
+            channels,
+            output_directory,
+            progress_var=bus.var(progress_var),
+            progress_label_var=worker_label_var,
+            current_channel_var=bus.var(current_channel_var),
+            on_downloaded=custom_progress_callback,
+            max_analyze=MAX_VIDEOS_TO_ANALYZE,
+            max_download=MAX_VIDEOS_TO_DOWNLOAD,
+            # Scheduled runs only re-analyze channels that uploaded new shorts
+            incremental_limit=max_videos,
+            # Closing the window mid-run is resumed by the next run
+            journal=get_journal(output_directory),
+            # A short already stored under another channel is hardlinked, not downloaded again
+            dedup=get_dedup_index(output_directory),
+            # Downloaded files are probed, thumbnailed and cataloged while the next ones download
+            postprocessor=PostProcessor(),
+            # With a shared folder, channels another machine is processing are skipped
+            leases=LeaseManager(output_directory) if SHARED_OUTPUT_FOLDER else None
+        )
 
         def download_channels():
-            total_channels = len(channels)
-            for index, channel_url in enumerate(channels, start=1):
-                channel_name = extract_channel_name(channel_url)
-                current_channel_var.set(f"Current Channel: {channel_name}")
-                progress_label_var.set(f"Processing channel {index}/{total_channels}...")
-
-                if not channel_name:
-                    progress_label_var.set(f"Error: Invalid channel URL - {channel_url}")
-                    continue
-
-                channel_folder = os.path.join(output_directory, channel_name)
-                try:
-                    os.makedirs(channel_folder, exist_ok=True)
-                except OSError as e:
-                    progress_label_var.set(f"Error: Failed to create folder for {channel_name} - {e}")
-                    continue
-
-                # Use ViralAnalyzer with yt-dlp approach
-                try:
-                    # Initialize the viral analyzer with progress tracking
-                    analyzer = ViralAnalyzer(progress_var=progress_var, progress_label_var=progress_label_var)
-                    
-                    # Analyze the channel to find viral videos
-                    progress_label_var.set(f"Analyzing viral potential for {channel_name}...")
-                    viral_videos = analyzer.analyze_channel(
-                        channel_url, 
-                        channel_folder, 
-                        max_videos=MAX_VIDEOS_TO_ANALYZE
-                    )
-                    
-                    if viral_videos.empty:
-                        progress_label_var.set(f"No viral videos found for {channel_name}")
-                        continue
-                    
-                    # Download the top viral videos
-                    progress_label_var.set(f"Downloading top {MAX_VIDEOS_TO_DOWNLOAD} viral videos for {channel_name}...")
-                    downloaded_paths = analyzer.download_viral_videos(
-                        viral_videos, 
-                        channel_folder, 
-                        limit=MAX_VIDEOS_TO_DOWNLOAD
-                    )
-                    
-                    # Update download history
-                    for path in downloaded_paths:
-                        custom_progress_callback(path)
-                    
-                    progress_label_var.set(f"Channel {index}: Downloaded {len(downloaded_paths)} viral videos.")
-                    
-                except Exception as e:
-                    progress_label_var.set(f"Error analyzing channel {channel_name}: {str(e)}")
-                    traceback.print_exc()  # Print the full error for debugging
-                    continue
-
-                if index < total_channels:
-                    pause_time = random.randint(60, 300)
-                    progress_label_var.set(f"Channel {index} completed. Pausing for {pause_time} seconds...")
-                    time.sleep(pause_time)
-
-            progress_label_var.set("All channels processed.")
-            current_channel_var.set("Current Channel: None")
-
+            import asyncio
+
+            results = {}
+            try:
+                results = asyncio.run(pipeline.run())
+            except Exception as e:
+                worker_label_var.set(f"Error processing channels: {str(e)}")
+                traceback.print_exc()  # Print the full error for debugging
+            finally:
+                active_pipelines.remove(pipeline)
+                if on_finished:
+                    on_finished(results)
+
+        active_pipelines.append(pipeline)
         threading.Thread(target=download_channels).start()
+        return True
+
+    def stop_downloads(progress_label_var):
+        if not active_pipelines:
+            progress_label_var.set("Nothing to stop.")
+            return
+        progress_label_var.set("Stopping after the current downloads...")
+        for pipeline in list(active_pipelines):
+            pipeline.cancel()
 
     def save_channels(channel_listbox):
         channels = channel_listbox.get(0, tk.END)
@@ -160,38 +163,47 @@ def run_gui():
                 file.write(f"{channel}\n")
 
     def load_channels(channel_listbox):
-        try:
-            with open(CHANNELS_FILE, "r") as file:
-                for line in file:
-                    channel = line.strip()
-                    if channel:
-                        channel_listbox.insert(tk.END, channel)
-        except FileNotFoundError:
-            pass
+        channels, _ = get_resolver().dedupe(read_channels(CHANNELS_FILE), network=False)
+        for channel in channels:
+            channel_listbox.insert(tk.END, channel)
 
     def schedule_download(folder_var, channel_listbox, progress_var, progress_label_var, history_widget, current_channel_var, next_run_label):
-        def run_schedule():
-            # Remove the immediate download call
-            # on_start_button_click(folder_var, channel_listbox, progress_var, progress_label_var, 
-            #                     history_widget, current_channel_var, max_videos=11)
-            
-            next_run_time = datetime.now() + timedelta(hours=1)
-            next_run_label.set(f"Next Run At: {next_run_time.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            while True:
-                current_time = datetime.now()
-                if current_time >= next_run_time:
-                    on_start_button_click(folder_var, channel_listbox, progress_var, progress_label_var, 
-                                        history_widget, current_channel_var, max_videos=11)
-                    next_run_time += timedelta(hours=1)
-                    next_run_label.set(f"Next Run At: {next_run_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                time.sleep(10)
-
-        threading.Thread(target=run_schedule, daemon=True).start()
-
+        next_run_label = bus.var(next_run_label)
+
+        def show_next_run(due):
+            if due is None:
+                next_run_label.set("Next Run: Not Scheduled")
+            else:
+                next_run_label.set(f"Next Run At: {datetime.fromtimestamp(due).strftime('%Y-%m-%d %H:%M:%S')}")
+
+        def start_scheduled(channels):
+            # Runs on the main loop, which owns the widgets
+            def finished(results):
+                for channel_url in channels:
+                    result = results.get(channel_url)
+                    if result and result['status'] != 'failed':
+                        scheduler.complete(channel_url, result['new_shorts'] or 0)
+                    else:
+                        scheduler.fail(channel_url)
+
+            started = on_start_button_click(folder_var, channel_listbox, progress_var, progress_label_var,
+                                            history_widget, current_channel_var, max_videos=11,
+                                            channels=channels, on_finished=finished)
+            if not started:
+                for channel_url in channels:
+                    scheduler.fail(channel_url)
+
+        scheduler = PollScheduler(lambda channels: bus.call(start_scheduled, channels), on_change=show_next_run)
+        scheduler.set_channels(channel_listbox.get(0, tk.END))
+        scheduler.start()
+        return scheduler
+
+    configure_logging()
     try:
         root = tk.Tk()
         root.title("YouTube Shorts Bulk Downloader")
+        bus = ProgressBus(root)
+        bus.start()
 
         style = ttk.Style()
         style.theme_use("clam")
@@ -232,6 +244,9 @@ def run_gui():
                 command=lambda: on_start_button_click(folder_var, channel_listbox, progress_var, 
                                                     progress_label_var, history_widget, current_channel_var)
                 ).grid(column=1, row=5, pady=10)
+        ttk.Button(main_frame, text="Stop",
+                command=lambda: stop_downloads(progress_label_var)
+                ).grid(column=2, row=5, sticky=tk.W, pady=10)
 
         ttk.Progressbar(main_frame, orient="horizontal", mode="determinate", 
                     variable=progress_var).grid(column=1, row=6, pady=10, sticky=(tk.W, tk.E))
@@ -240,9 +255,10 @@ def run_gui():
         ttk.Label(main_frame, textvariable=next_run_label).grid(column=1, row=8, pady=5)
 
         load_channels(channel_listbox)
-        schedule_download(folder_var, channel_listbox, progress_var, progress_label_var, 
-                         history_widget, current_channel_var, next_run_label)
-        root.protocol("WM_DELETE_WINDOW", lambda: [save_channels(channel_listbox), root.destroy()])
+        scheduler = schedule_download(folder_var, channel_listbox, progress_var, progress_label_var,
+                                      history_widget, current_channel_var, next_run_label)
+        root.protocol("WM_DELETE_WINDOW", lambda: [save_channels(channel_listbox), scheduler.stop(),
+                                                   stop_downloads(progress_label_var), root.destroy()])
 
         root.mainloop()
         
@@ -0,0 +1,607 @@
+"""
+Headless command-line / daemon entry point.
+
+Reads channels.txt and processes the channels across a process pool: each
+channel is analyzed with ViralAnalyzer and its top viral videos are
+downloaded, in its own worker process. As channels finish, their files are
+probed, thumbnailed and cataloged by a post-download stage (postprocess.py)
+while other channels are still downloading. A machine-readable run summary
+is written as JSON when the run finishes.
+
+With --shared, several machines can work through the same channel list in
+a shared output folder: each channel is claimed with a lease file
+(leases.py) before it is processed, so every channel is handled by one
+node, and channels of a node that stops are taken over by the others.
+
+With --global-budget N, channels are not handled one by one: every channel
+is analyzed first, each candidate is scored relative to its own channel
+(global_ranking.py), and the N best candidates across all channels are
+downloaded in score order, so the most valuable shorts land first.
+
+Usage:
+    python main.py --headless --output /srv/shorts --workers 4
+    python headless.py --output /srv/shorts --daemon --interval 3600
+    python headless.py --output /mnt/nfs/shorts --shared --daemon   # on every node
+    python headless.py --output /srv/shorts --global-budget 200
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+import traceback
+from datetime import datetime
+from journal import JOURNAL_FILENAME, get_journal
+from leases import DONE, LEASE_TTL, LeaseManager, default_node_id, watch_lease_file
+from dedup import get_dedup_index
+from archive import get_archive
+from metrics import get_metrics, start_file_exporter, start_http_exporter
+from bandwidth import get_shaper
+from postprocess import PostProcessor
+from channel_resolver import get_resolver
+from utils import channel_folder_name, configure_logging, read_channels
+
+CHANNELS_FILE = "channels.txt"
+SUMMARY_FILENAME = "run_summary.json"
+DEFAULT_WORKERS = 2
+# Seconds between attempts to claim channels held by other nodes
+LEASE_POLL_INTERVAL = 10
+
+logger = logging.getLogger("headless")
+
+
+def _init_worker():
+    # Spawned workers start without the parent's handlers
+    configure_logging()
+
+
+def _parse_rate(value):
+    """Parse a rate such as 500K, 20M or 1.5G (bytes/s, binary units) for argparse."""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = value.strip().upper().rstrip('B')
+    try:
+        if value and value[-1] in units:
+            return float(value[:-1]) * units[value[-1]]
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid rate: {value}")
+
+
+def _channel_executor(workers):
+    """
+    Return the process pool channels run in: a fresh interpreter per channel where supported.
+
+    max_tasks_per_child exists from Python 3.11; on older versions worker processes are reused.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    options = {}
+    if sys.version_info >= (3, 11):
+        options['max_tasks_per_child'] = 1
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"),
+                               initializer=_init_worker, **options)
+
+
+class _LogVar:
+    """Stand-in for a tkinter variable that forwards label updates to the log."""
+
+    def __init__(self, channel_name=None):
+        self.channel_name = channel_name
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+        if self.channel_name:
+            logger.info(f"[{self.channel_name}] {value}")
+
+    def get(self):
+        return self.value
+
+
+def process_channel(channel_url, output_directory, max_analyze=None, max_download=None, bandwidth_limit=None,
+                    journal_name=JOURNAL_FILENAME, lease_file=None):
+    """
+    Analyze one channel and download its top viral videos.
+
+    Runs inside a worker process; every error is caught and reported in the
+    returned summary so one failing channel cannot affect the others.
+
+    Args:
+        channel_url (str): YouTube channel URL
+        output_directory (str): Root folder; videos go to a per-channel subfolder
+        max_analyze (int): Number of videos to rank (defaults to config.MAX_VIDEOS_TO_ANALYZE)
+        max_download (int): Number of videos to download (defaults to config.MAX_VIDEOS_TO_DOWNLOAD)
+        bandwidth_limit (float): Download rate of this worker in bytes/s (defaults to bandwidth.DEFAULT_RATE)
+        journal_name (str): File name of the node's job journal in the output folder
+        lease_file (tuple): (path, token) of the lease the parent holds for the channel; if
+            another node takes it over, the downloads stop and the channel fails
+
+    Returns:
+        dict: Channel summary (status, counts, downloaded paths, error, duration)
+    """
+    started = time.time()
+    channel_name = channel_folder_name(channel_url)
+    summary = {
+        'channel': channel_url,
+        'channel_name': channel_name,
+        'status': 'ok',
+        'videos_ranked': 0,
+        'downloaded': [],
+        'error': None,
+    }
+    lost = threading.Event()
+    stop_watching = watch_lease_file(*lease_file, lost, LEASE_POLL_INTERVAL) if lease_file else None
+    try:
+        if not channel_name:
+            raise ValueError(f"Invalid channel URL - {channel_url}")
+
+        from config import MAX_VIDEOS_TO_ANALYZE, MAX_VIDEOS_TO_DOWNLOAD
+        from viral_analyzer import ViralAnalyzer
+
+        if bandwidth_limit:
+            get_shaper().set_rate(bandwidth_limit)
+
+        channel_folder = os.path.join(output_directory, channel_name)
+        os.makedirs(channel_folder, exist_ok=True)
+
+        journal = get_journal(output_directory, journal_name)
+        task = journal.get('channel', channel_url)
+        journal.start('channel', channel_url)
+
+        analyzer = ViralAnalyzer(progress_var=_LogVar(), progress_label_var=_LogVar(channel_name), journal=journal,
+                                 dedup=get_dedup_index(output_directory))
+        if task and 'viral_videos' in task['data']:
+            # Interrupted run: reuse the ranking instead of listing the channel again
+            viral_videos = task['data']['viral_videos']
+        else:
+            viral_videos = analyzer.analyze_channel(
+                channel_url,
+                channel_folder,
+                max_videos=max_analyze or MAX_VIDEOS_TO_ANALYZE
+            )
+            journal.update('channel', channel_url, {'viral_videos': viral_videos})
+        summary['videos_ranked'] = len(viral_videos)
+        if viral_videos:
+            summary['downloaded'] = analyzer.download_viral_videos(
+                viral_videos,
+                channel_folder,
+                limit=max_download or MAX_VIDEOS_TO_DOWNLOAD,
+                channel_url=channel_url,
+                stop=lost
+            )
+        if lost.is_set():
+            raise RuntimeError("Lease lost to another node")
+        journal.finish('channel', channel_url)
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+        get_journal(output_directory, journal_name).fail('channel', channel_url, summary['error'])
+    finally:
+        if stop_watching:
+            stop_watching.set()
+    summary['seconds'] = round(time.time() - started, 3)
+    # Worker processes have their own registry; the parent merges it into the run's metrics
+    summary['metrics'] = get_metrics().snapshot()
+    return summary
+
+
+def run(channels, output_directory, workers=DEFAULT_WORKERS, max_analyze=None, max_download=None,
+        summary_path=None, bandwidth_limit=None, postprocess_workers=DEFAULT_WORKERS, node_id=None,
+        lease_ttl=LEASE_TTL, done_ttl=None):
+    """
+    Process channels across a pool of worker processes and write a run summary.
+
+    Args:
+        channels (list): Channel URLs
+        output_directory (str): Root folder for downloads
+        workers (int): Number of channels processed concurrently
+        max_analyze (int): Videos to rank per channel
+        max_download (int): Videos to download per channel
+        summary_path (str): Where to write the JSON summary
+            (defaults to run_summary.json in the output folder)
+        bandwidth_limit (float): Total download rate in bytes/s, split evenly between the workers
+        postprocess_workers (int): Processes probing and cataloging the downloaded files while
+            other channels download (0 disables post-processing)
+        node_id (str): Share the channel list with other nodes using the same output folder:
+            channels are claimed with leases under this node name (None processes every channel)
+        lease_ttl (float): Seconds a lease of a node that stopped renewing it stays valid
+        done_ttl (float): Skip channels another node finished less than this many seconds ago
+
+    Returns:
+        dict: The run summary
+    """
+    os.makedirs(output_directory, exist_ok=True)
+    started = datetime.now()
+    results = []
+
+    # Aliases are resolved once in the parent; the workers read the mapping from the channel cache
+    resolver = get_resolver()
+    channels, duplicates = resolver.dedupe(channels)
+    for channel_url, kept in duplicates.items():
+        print(f"Skipping {channel_url}: same channel as {kept}")
+
+    # Nodes sharing the output folder each keep their own journal
+    journal_name = f".job_journal.{node_id}.sqlite" if node_id else JOURNAL_FILENAME
+    # Channels finished by an interrupted previous run are not processed again
+    remaining = get_journal(output_directory, journal_name).begin_run(channels)
+    if len(remaining) < len(channels):
+        print(f"Resuming interrupted run: {len(remaining)} of {len(channels)} channels left")
+
+    # Each worker process has its own shaper, so every one gets an equal part of the total
+    worker_limit = bandwidth_limit / max(1, min(workers, len(remaining))) if bandwidth_limit else None
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    postprocessor = PostProcessor(max_workers=postprocess_workers) if postprocess_workers else None
+    leases = LeaseManager(output_directory, node_id, ttl=lease_ttl) if node_id else None
+    held = {}           # channel URL -> lease of a channel this node is processing
+    elsewhere = {}      # channel URL -> node that finished it
+    pending = list(remaining)
+    waiting = []        # channels held by other nodes: claimed if their lease expires
+
+    def lease_key(channel_url):
+        # Every node must name a channel the same way: the resolved channel id where known
+        channel = resolver.resolve(channel_url, network=False)
+        return channel['key'] if channel else channel_url
+
+    # Fresh interpreter per channel: no state (sessions, caches, crashes) leaks between channels
+    with _channel_executor(workers) as executor:
+        futures = {}
+        while pending or waiting or futures:
+            # Claim channels as workers free up, so faster nodes take a larger share
+            while pending and len(futures) < max(1, workers):
+                channel_url = pending.pop(0)
+                if leases:
+                    key = lease_key(channel_url)
+                    lease = leases.claim(key, done_ttl)
+                    if lease is None:
+                        if leases.status(key, done_ttl) == DONE:
+                            elsewhere[channel_url] = leases.owner(key)
+                            get_journal(output_directory, journal_name).finish('channel', channel_url)
+                            print(f"Skipping {channel_url}: done by {elsewhere[channel_url]}")
+                        else:
+                            waiting.append(channel_url)
+                        continue
+                    held[channel_url] = lease
+                lease = held.get(channel_url)
+                future = executor.submit(process_channel, channel_url, output_directory, max_analyze, max_download,
+                                         worker_limit, journal_name, (lease.path, lease.token) if lease else None)
+                futures[future] = channel_url
+
+            if not futures:
+                if waiting:
+                    # Everything left is held by other nodes; wait until they finish or their leases expire
+                    time.sleep(LEASE_POLL_INTERVAL)
+                    pending, waiting = waiting, []
+                continue
+            done, _ = wait(futures, timeout=LEASE_POLL_INTERVAL if waiting else None, return_when=FIRST_COMPLETED)
+            if waiting and not pending:
+                pending, waiting = waiting, []
+
+            for future in done:
+                channel_url = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself died (e.g. killed or crashed in native code)
+                    result = {
+                        'channel': channel_url,
+                        'channel_name': channel_folder_name(channel_url, network=False),
+                        'status': 'failed',
+                        'videos_ranked': 0,
+                        'downloaded': [],
+                        'error': f"{type(e).__name__}: {e}",
+                    }
+                if channel_url in held:
+                    # A failed channel is left for another node to retry
+                    leases.release(held.pop(channel_url), done=result['status'] == 'ok')
+                get_metrics().merge(result.pop('metrics', {}))
+                if postprocessor:
+                    for path in result['downloaded']:
+                        postprocessor.submit(path)
+                print(f"{result['status'].upper():6} {channel_url}: {len(result['downloaded'])} downloaded"
+                      + (f" ({result['error']})" if result['error'] else ""))
+                results.append(result)
+
+    if leases:
+        leases.close()
+    if postprocessor:
+        postprocessor.close()
+
+    order = {channel_url: i for i, channel_url in enumerate(channels)}
+    results.sort(key=lambda result: order[result['channel']])
+    summary = {
+        'started_at': started.isoformat(timespec='seconds'),
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'output_directory': output_directory,
+        'workers': workers,
+        'channels_total': len(channels),
+        'duplicate_channels': duplicates,
+        'node': node_id,
+        'channels_done_elsewhere': elsewhere,
+        'channels_failed': sum(1 for result in results if result['status'] != 'ok'),
+        'videos_downloaded': sum(len(result['downloaded']) for result in results),
+        'postprocess': postprocessor.stats if postprocessor else None,
+        'metrics': {key: value for key, value in get_metrics().snapshot().items() if key != 'recent_transfers'},
+        'channels': results,
+    }
+
+    # Nodes sharing the output folder write one summary each
+    default_summary = f"run_summary.{node_id}.json" if node_id else SUMMARY_FILENAME
+    _write_summary(summary, summary_path or os.path.join(output_directory, default_summary))
+    return summary
+
+
+def _write_summary(summary, summary_path):
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Run summary written to {summary_path}")
+    counters = summary['metrics'].get('counters', {})
+    # Merged from every worker, for tuning the metadata cache TTLs
+    logger.info("Metadata cache: " + ", ".join(
+        f"{name} {counters.get(f'metadata_cache_{name}', 0)}"
+        for name in ('hits', 'stale_hits', 'misses', 'refreshes', 'evictions', 'too_large')))
+
+
+def rank_channel(channel_url, output_directory, max_analyze=None, journal_name=JOURNAL_FILENAME):
+    """
+    Analyze one channel for a global run and score its top videos relative to the channel.
+
+    Runs inside a worker process, like process_channel; nothing is downloaded.
+
+    Returns:
+        dict: Channel summary with the scored candidates in 'viral_videos'
+    """
+    started = time.time()
+    channel_name = channel_folder_name(channel_url)
+    summary = {
+        'channel': channel_url,
+        'channel_name': channel_name,
+        'status': 'ok',
+        'videos_ranked': 0,
+        'viral_videos': [],
+        'downloaded': [],
+        'error': None,
+    }
+    try:
+        if not channel_name:
+            raise ValueError(f"Invalid channel URL - {channel_url}")
+
+        from config import MAX_VIDEOS_TO_ANALYZE
+        from viral_analyzer import ViralAnalyzer
+        from global_ranking import ChannelStats, normalize
+
+        channel_folder = os.path.join(output_directory, channel_name)
+        os.makedirs(channel_folder, exist_ok=True)
+
+        journal = get_journal(output_directory, journal_name)
+        task = journal.get('channel', channel_url)
+        journal.start('channel', channel_url)
+        if task and 'viral_videos' in task['data']:
+            # Interrupted run: the candidates were scored when they were stored
+            viral_videos = task['data']['viral_videos']
+        else:
+            stats = ChannelStats()
+            analyzer = ViralAnalyzer(progress_var=_LogVar(), progress_label_var=_LogVar(channel_name))
+            viral_videos = analyzer.analyze_channel(channel_url, channel_folder,
+                                                    max_videos=max_analyze or MAX_VIDEOS_TO_ANALYZE, stats=stats)
+            normalize(viral_videos, stats)
+            journal.update('channel', channel_url, {'viral_videos': viral_videos})
+        summary['viral_videos'] = viral_videos
+        summary['videos_ranked'] = len(viral_videos)
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f"{type(e).__name__}: {e}"
+        traceback.print_exc()
+        get_journal(output_directory, journal_name).fail('channel', channel_url, summary['error'])
+    summary['seconds'] = round(time.time() - started, 3)
+    summary['metrics'] = get_metrics().snapshot()
+    return summary
+
+
+def run_global(channels, output_directory, budget, workers=DEFAULT_WORKERS, max_analyze=None, summary_path=None,
+               bandwidth_limit=None, postprocess_workers=DEFAULT_WORKERS):
+    """
+    Analyze every channel, then download the best candidates across all channels in score order.
+
+    Channels are analyzed across a pool of worker processes. Their candidates
+    go into one priority queue (global_ranking.GlobalQueue), which is
+    downloaded best first by ``workers`` threads until ``budget`` downloads
+    were attempted. Candidates that are already stored do not count against
+    the budget.
+
+    Args:
+        channels (list): Channel URLs
+        output_directory (str): Root folder for downloads
+        budget (int): Total downloads of the run, across all channels
+        workers (int): Channels analyzed, and videos downloaded, concurrently
+        max_analyze (int): Candidates ranked per channel
+        summary_path (str): Where to write the JSON summary
+        bandwidth_limit (float): Total download rate in bytes/s
+        postprocess_workers (int): Processes probing and cataloging the downloaded files
+
+    Returns:
+        dict: The run summary
+    """
+    from global_ranking import GlobalQueue, download_in_order
+    from viral_analyzer import ViralAnalyzer
+
+    os.makedirs(output_directory, exist_ok=True)
+    started = datetime.now()
+    resolver = get_resolver()
+    channels, duplicates = resolver.dedupe(channels)
+    for channel_url, kept in duplicates.items():
+        print(f"Skipping {channel_url}: same channel as {kept}")
+
+    journal = get_journal(output_directory)
+    remaining = journal.begin_run(channels)
+    if len(remaining) < len(channels):
+        print(f"Resuming interrupted run: {len(remaining)} of {len(channels)} channels left")
+
+    from concurrent.futures import as_completed
+
+    results = {}
+    queue = GlobalQueue()
+    with _channel_executor(workers) as executor:
+        futures = {executor.submit(rank_channel, channel_url, output_directory, max_analyze): channel_url
+                   for channel_url in remaining}
+        for future in as_completed(futures):
+            channel_url = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {
+                    'channel': channel_url,
+                    'channel_name': channel_folder_name(channel_url, network=False),
+                    'status': 'failed',
+                    'videos_ranked': 0,
+                    'viral_videos': [],
+                    'downloaded': [],
+                    'error': f"{type(e).__name__}: {e}",
+                }
+            get_metrics().merge(result.pop('metrics', {}))
+            queue.add(channel_url, result.pop('viral_videos'))
+            print(f"{'RANKED' if result['status'] == 'ok' else 'FAILED'} {channel_url}: "
+                  f"{result['videos_ranked']} candidates" + (f" ({result['error']})" if result['error'] else ""))
+            results[channel_url] = result
+
+    candidates = len(queue)
+    print(f"Downloading up to {budget} of {candidates} candidates in global score order")
+    if bandwidth_limit:
+        get_shaper().set_rate(bandwidth_limit)
+    postprocessor = PostProcessor(max_workers=postprocess_workers) if postprocess_workers else None
+    dedup = get_dedup_index(output_directory)
+    analyzers = {}
+
+    def folder_of(channel_url):
+        return os.path.join(output_directory, results[channel_url]['channel_name'])
+
+    def already_stored(channel_url, video):
+        return get_archive(folder_of(channel_url)).lookup_existing(video['video_id'])
+
+    def download(channel_url, video):
+        analyzer = analyzers.get(channel_url)
+        if analyzer is None:
+            # Download only: no listing, enrichment or history
+            analyzer = analyzers[channel_url] = ViralAnalyzer(
+                progress_label_var=_LogVar(results[channel_url]['channel_name']), journal=journal, dedup=dedup,
+                enricher=False, use_cache=False, use_history=False)
+        paths = analyzer.download_viral_videos([video], folder_of(channel_url), limit=1, channel_url=channel_url,
+                                               on_downloaded=postprocessor)
+        # The same pause between downloads as in per-channel runs, per download thread
+        if analyzer.download_delay[1] > 0:
+            with get_metrics().span('rate_limit_sleep'):
+                time.sleep(random.uniform(*analyzer.download_delay))
+        return paths[0] if paths else None
+
+    taken = download_in_order(queue, download, budget=budget, workers=workers, should_skip=already_stored)
+    for item in taken:
+        if item['path']:
+            results[item['channel']]['downloaded'].append(item['path'])
+    # Candidates left over the budget are not owed by this run; the next run ranks the channels again
+    for channel_url, result in results.items():
+        if result['status'] == 'ok':
+            journal.finish('channel', channel_url)
+    if postprocessor:
+        postprocessor.close()
+
+    order = {channel_url: i for i, channel_url in enumerate(channels)}
+    summary = {
+        'started_at': started.isoformat(timespec='seconds'),
+        'finished_at': datetime.now().isoformat(timespec='seconds'),
+        'output_directory': output_directory,
+        'workers': workers,
+        'ranking': 'global',
+        'global_budget': budget,
+        'candidates': candidates,
+        'channels_total': len(channels),
+        'duplicate_channels': duplicates,
+        'channels_failed': sum(1 for result in results.values() if result['status'] != 'ok'),
+        'videos_downloaded': sum(len(result['downloaded']) for result in results.values()),
+        'downloads_attempted': sum(1 for item in taken if not item['already_stored']),
+        # Best first: the order the candidates were taken from the queue
+        'download_order': [{'channel': item['channel'], 'video_id': item['video']['video_id'],
+                            'channel_score': item['video'].get('channel_score'), 'path': item['path'],
+                            'already_stored': item['already_stored']}
+                           for item in taken],
+        'postprocess': postprocessor.stats if postprocessor else None,
+        'metrics': {key: value for key, value in get_metrics().snapshot().items() if key != 'recent_transfers'},
+        'channels': sorted(results.values(), key=lambda result: order[result['channel']]),
+    }
+    _write_summary(summary, summary_path or os.path.join(output_directory, SUMMARY_FILENAME))
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Headless YouTube Shorts viral downloader")
+    parser.add_argument("--channels-file", default=CHANNELS_FILE, help="File with one channel URL per line")
+    parser.add_argument("--output", required=True, help="Folder to save videos into")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Channels processed concurrently")
+    parser.add_argument("--max-analyze", type=int, help="Videos ranked per channel")
+    parser.add_argument("--max-download", type=int, help="Videos downloaded per channel")
+    parser.add_argument("--global-budget", type=int,
+                        help="Rank all channels first and download this many videos in total, best first across "
+                             "channels (replaces --max-download)")
+    parser.add_argument("--summary", help="Path of the JSON run summary")
+    parser.add_argument("--daemon", action="store_true", help="Keep running, starting a new run every --interval")
+    parser.add_argument("--interval", type=int, default=3600, help="Seconds between daemon runs")
+    parser.add_argument("--bandwidth-limit", type=_parse_rate,
+                        help="Total download rate, e.g. 20M for 20 MiB/s (default: 3M per worker)")
+    parser.add_argument("--postprocess-workers", type=int, default=DEFAULT_WORKERS,
+                        help="Processes probing, thumbnailing and cataloging downloaded files (0 to disable)")
+    parser.add_argument("--shared", action="store_true",
+                        help="Share the channel list with other nodes using the same output folder (e.g. on NFS)")
+    parser.add_argument("--node-id", help="Name of this node in lease files (default: host name)")
+    parser.add_argument("--lease-ttl", type=float, default=LEASE_TTL,
+                        help="Seconds before the channels of a node that stopped are taken over")
+    parser.add_argument("--metrics-file", help="Periodically write metrics to this file (.prom for Prometheus text, "
+                                               "otherwise JSON)")
+    parser.add_argument("--metrics-port", type=int, help="Serve metrics on http://127.0.0.1:PORT/metrics")
+    return parser
+
+
+def main(argv=None):
+    configure_logging()
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.global_budget is not None and args.shared:
+        parser.error("--global-budget ranks the whole channel list on one node and cannot be combined with --shared")
+    if args.metrics_file:
+        start_file_exporter(args.metrics_file)
+    if args.metrics_port is not None:
+        start_http_exporter(args.metrics_port)
+
+    while True:
+        channels = read_channels(args.channels_file)
+        if not channels:
+            print(f"Error: No channels in {args.channels_file}")
+            return 1
+
+        started = time.monotonic()
+        if args.global_budget is not None:
+            summary = run_global(channels, args.output, args.global_budget, args.workers, args.max_analyze,
+                                 args.summary, args.bandwidth_limit, args.postprocess_workers)
+        else:
+            summary = run(channels, args.output, args.workers, args.max_analyze, args.max_download, args.summary,
+                          args.bandwidth_limit, args.postprocess_workers,
+                          node_id=(args.node_id or default_node_id()) if args.shared else None,
+                          lease_ttl=args.lease_ttl,
+                          # A channel finished by any node counts as done for this round
+                          done_ttl=args.interval)
+        if not args.daemon:
+            if args.metrics_file:
+                get_metrics().write(args.metrics_file)
+            return 1 if summary['channels_failed'] else 0
+
+        wait = max(0, args.interval - (time.monotonic() - started))
+        print(f"Next run in {int(wait)} seconds")
+        time.sleep(wait)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""
+Per-folder integrity manifest of downloaded files, hashed while they download.
+
+A ``StreamingHasher`` progress hook feeds the bytes of a download to SHA-256
+as they reach the disk, so the hash is ready when the transfer finishes
+without reading the file again. The size, the size announced by the server
+and the hash are recorded in a small SQLite manifest in the output folder.
+
+Verifying a file is then a manifest comparison: its size on disk must match
+the recorded size (and the recorded size the expected one). A file that
+fails the check is deleted so it is downloaded again, instead of being
+counted as already downloaded. Files downloaded before the manifest existed
+are not in it and are accepted as before.
+
+Usage (check folders; --deep also compares the hashes):
+    python integrity.py "C:\\PythonProjects\\Videos\\tennistv" [more folders...] [--deep]
+"""
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+INTEGRITY_FILENAME = ".integrity.sqlite"
+
+# The hasher catches up with the file once this many new bytes are on disk
+READ_SIZE = 1024 * 1024
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def hash_file(path):
+    """Return (size, sha256 hex digest) of a whole file."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+
+class StreamingHasher:
+    """
+    yt-dlp progress hook that hashes a download while it is being written.
+
+    On each progress report the bytes written since the last pass are read
+    back (from the page cache) and added to the digest; the file is opened
+    only for the read, so yt-dlp can still rename it. A resumed download is
+    hashed from the start of its partial file.
+
+    The expected size is the format's ``filesize`` from the info dict, or the
+    Content-Length of the transfer where the extractor gives none.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self.size = 0
+        self.filename = None
+        self.expected_size = None
+        # Content-Length of the transfer (plus the resumed part), from the progress reports
+        self._transfer_size = None
+
+    def _catch_up(self, path, to_end):
+        try:
+            with open(path, "rb") as f:
+                on_disk = os.fstat(f.fileno()).st_size
+                if on_disk < self.size:
+                    # The partial file was discarded and the download restarted
+                    self._digest = hashlib.sha256()
+                    self.size = 0
+                if not to_end and on_disk - self.size < READ_SIZE:
+                    return
+                f.seek(self.size)
+                for block in iter(lambda: f.read(READ_SIZE), b""):
+                    self._digest.update(block)
+                    self.size += len(block)
+        except OSError:
+            # Not created yet, or already renamed; the next report catches up
+            pass
+
+    def __call__(self, d):
+        status = d.get('status')
+        if status == 'downloading':
+            if d.get('total_bytes'):
+                self._transfer_size = d['total_bytes']
+            path = d.get('tmpfilename') or d.get('filename')
+            if path:
+                self._catch_up(path, to_end=False)
+        elif status == 'finished':
+            self.filename = d.get('filename')
+            # The 'finished' report's total_bytes only repeats the bytes received; the size the
+            # extractor announced for the format (or else the Content-Length) is what should be there
+            self.expected_size = (d.get('info_dict') or {}).get('filesize') or self._transfer_size
+            if self.filename:
+                self._catch_up(self.filename, to_end=True)
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+
+class IntegrityManifest:
+    """Size and SHA-256 of every file downloaded to a folder, backed by SQLite."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "name TEXT PRIMARY KEY, size INTEGER, expected_size INTEGER, sha256 TEXT, recorded_at REAL)"
+        )
+        self._conn.commit()
+        self._entries = {
+            name: (size, expected_size, sha256) for name, size, expected_size, sha256 in
+            self._conn.execute("SELECT name, size, expected_size, sha256 FROM files")
+        }
+
+    def __contains__(self, filepath):
+        return os.path.basename(filepath) in self._entries
+
+    def get(self, filepath):
+        """Return the (size, expected_size, sha256) recorded for a file, or None."""
+        return self._entries.get(os.path.basename(filepath))
+
+    def record(self, filepath, size, sha256, expected_size=None):
+        """Record the size and hash of a file."""
+        name = os.path.basename(filepath)
+        with self._lock:
+            self._entries[name] = (size, expected_size, sha256)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (name, size, expected_size, sha256, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                (name, size, expected_size, sha256, time.time())
+            )
+            self._conn.commit()
+
+    def record_download(self, hasher, filepath=None):
+        """
+        Record a finished download from its StreamingHasher.
+
+        If the file was changed after the transfer (e.g. by a yt-dlp fixup), or the
+        hasher saw no transfer, the file is hashed again.
+
+        Args:
+            hasher (StreamingHasher): The download's progress hook
+            filepath (str): Downloaded file, if the hasher did not see it finish
+
+        Returns:
+            bool: False if the file is missing or shorter/longer than the server announced
+        """
+        filepath = hasher.filename or filepath
+        try:
+            on_disk = os.path.getsize(filepath)
+        except (OSError, TypeError):
+            return False
+        if hasher.expected_size and hasher.size != hasher.expected_size:
+            logger.warning(f"Incomplete download: {filepath} has {hasher.size} of {hasher.expected_size} bytes")
+            return False
+        size, sha256, expected_size = hasher.size, hasher.sha256, hasher.expected_size
+        if hasher.filename is None or on_disk != size:
+            size, sha256 = hash_file(filepath)
+            expected_size = None
+            get_metrics().incr('integrity_rehashed')
+        self.record(filepath, size, sha256, expected_size)
+        return True
+
+    def check(self, filepath):
+        """
+        Cheaply verify a file against the manifest (no data is read).
+
+        Returns:
+            bool: True if it matches, False if it is missing or does not match,
+                None if the file is not in the manifest
+        """
+        entry = self.get(filepath)
+        if entry is None:
+            return None
+        size, expected_size, _ = entry
+        try:
+            on_disk = os.path.getsize(filepath)
+        except OSError:
+            return False
+        return on_disk == size and (not expected_size or size == expected_size)
+
+    def verify(self, filepath):
+        """
+        Verify a file by hashing it again.
+
+        Returns:
+            bool: True if size and hash match, False if not, None if the file is not in the manifest
+        """
+        entry = self.get(filepath)
+        if entry is None:
+            return None
+        try:
+            return hash_file(filepath) == (entry[0], entry[2]) and self.check(filepath)
+        except OSError:
+            return False
+
+    def forget(self, filepath):
+        """Remove a file from the manifest."""
+        name = os.path.basename(filepath)
+        with self._lock:
+            self._entries.pop(name, None)
+            self._conn.execute("DELETE FROM files WHERE name = ?", (name,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_integrity_manifest(output_path):
+    """
+    Return the shared integrity manifest of an output folder, opening it on first use.
+
+    Args:
+        output_path (str): Folder the videos are downloaded to
+
+    Returns:
+        IntegrityManifest: The folder's manifest
+    """
+    key = os.path.abspath(output_path)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            os.makedirs(key, exist_ok=True)
+            manifest = IntegrityManifest(os.path.join(key, INTEGRITY_FILENAME))
+            _manifests[key] = manifest
+        return manifest
+
+
+def discard(filepath):
+    """Delete a file that failed verification (so it is downloaded again) and forget it."""
+    logger.warning(f"Integrity check failed, removing for re-download: {filepath}")
+    get_metrics().incr('integrity_failures')
+    try:
+        os.remove(filepath)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Could not remove {filepath}: {e}")
+    get_integrity_manifest(os.path.dirname(filepath)).forget(filepath)
+
+
+def record_copy(source, destination):
+    """Record a linked or copied file in its folder's manifest with the entry of its source."""
+    entry = get_integrity_manifest(os.path.dirname(source)).get(source)
+    if entry:
+        size, expected_size, sha256 = entry
+        get_integrity_manifest(os.path.dirname(destination)).record(destination, size, sha256, expected_size)
+
+
+def is_intact(filepath):
+    """
+    Check a stored file before treating it as downloaded.
+
+    A file that fails the manifest check is discarded.
+
+    Returns:
+        bool: True if the file exists and matches the manifest (or is not in it)
+    """
+    if not filepath or not os.path.exists(filepath):
+        return False
+    if get_integrity_manifest(os.path.dirname(filepath)).check(filepath) is False:
+        discard(filepath)
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+    from archive import MEDIA_EXTENSIONS
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    deep = "--deep" in sys.argv
+    folders = [arg for arg in sys.argv[1:] if arg != "--deep"]
+    if not folders:
+        print("Usage: python integrity.py <folder> [more folders...] [--deep]")
+        sys.exit(1)
+    failed = 0
+    for folder in folders:
+        manifest = get_integrity_manifest(folder)
+        counts = {True: 0, False: 0, None: 0}
+        for name in sorted(os.listdir(folder)):
+            if os.path.splitext(name)[1].lower() not in MEDIA_EXTENSIONS:
+                continue
+            path = os.path.join(folder, name)
+            result = manifest.verify(path) if deep else manifest.check(path)
+            counts[result] += 1
+            if result is False:
+                print(f"FAILED {path}")
+        failed += counts[False]
+        print(f"{folder}: {counts[True]} ok, {counts[False]} failed, {counts[None]} not in manifest")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,272 @@
+"""
+Crash-safe job journal for channel runs.
+
+Every channel and video handled by a run is recorded as a task in a small
+SQLite database in the output folder, together with its state:
+
+    pending    not started yet (or interrupted and waiting to be resumed)
+    in_flight  being worked on
+    done       finished
+    failed     gave up; partial files were removed
+
+Each state change is committed immediately, so if the process dies or the
+window is closed mid-run, the next run finds the unfinished run in the
+journal and resumes it: tasks that were in flight go back to pending,
+channels that were already analyzed reuse the stored ranking instead of
+re-listing the channel, and videos continue from the bytes already in
+their ``.part`` file.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_FILENAME = ".job_journal.sqlite"
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+FINISHED_STATES = (DONE, FAILED)
+
+# Suffixes of the temporary files yt-dlp writes next to an unfinished download
+PARTIAL_SUFFIXES = ('.part', '.ytdl')
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+
+def remove_partial(path):
+    """
+    Delete the partial download files left behind for a target file path.
+
+    Args:
+        path (str): Final path of the download (may be None)
+
+    Returns:
+        int: Number of files removed
+    """
+    removed = 0
+    if not path:
+        return removed
+    for suffix in PARTIAL_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove partial file {path + suffix}: {e}")
+    return removed
+
+
+class JobJournal:
+    """Persistent record of the channel and video tasks of a run, backed by SQLite."""
+
+    def __init__(self, path):
+        """
+        Open (or create) a journal and recover tasks interrupted by a crash.
+
+        Args:
+            path (str): Path of the SQLite file
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        # Headless workers in other processes may share the journal, so wait for their writes
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            "kind TEXT, key TEXT, parent TEXT, state TEXT, attempts INTEGER, "
+            "data TEXT, error TEXT, updated_at REAL, PRIMARY KEY (kind, key))"
+        )
+        self._conn.commit()
+        self.recovered = self._recover()
+
+    def _recover(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET state = ?, updated_at = ? WHERE state = ?", (PENDING, time.time(), IN_FLIGHT)
+            )
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Journal: resuming {cursor.rowcount} interrupted tasks from {self.path}")
+        return cursor.rowcount
+
+    def begin_run(self, channels):
+        """
+        Start a run over a list of channels, resuming the previous run if it did not finish.
+
+        If every channel of the previous run is done or failed, the journal is
+        cleared and a fresh run is started. Otherwise the unfinished run is
+        continued; channels no longer in the list are dropped from it and new
+        ones are added.
+
+        Args:
+            channels (list): Channel URLs of the run
+
+        Returns:
+            list: The channels that still have to be processed, in input order
+        """
+        with self._lock:
+            states = dict(self._conn.execute("SELECT key, state FROM tasks WHERE kind = 'channel'"))
+        unfinished = any(state not in FINISHED_STATES for state in states.values())
+
+        if unfinished:
+            dropped = [key for key in states if key not in channels]
+            with self._lock:
+                for key in dropped:
+                    self._conn.execute("DELETE FROM tasks WHERE (kind = 'channel' AND key = ?) OR parent = ?",
+                                       (key, key))
+                self._conn.commit()
+            logger.info(f"Journal: resuming unfinished run ({sum(s not in FINISHED_STATES for s in states.values())} "
+                        f"channels left)")
+        else:
+            self.clear()
+            states = {}
+
+        for channel_url in channels:
+            self.add('channel', channel_url)
+        return [channel_url for channel_url in channels if states.get(channel_url) not in FINISHED_STATES]
+
+    def clear(self):
+        """Remove every task, deleting the partial files of unfinished downloads."""
+        for task in self.tasks('video'):
+            if task['state'] != DONE:
+                remove_partial(task['data'].get('path'))
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks")
+            self._conn.commit()
+
+    def add(self, kind, key, parent=None, data=None):
+        """Record a pending task; existing tasks are left untouched."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, key, parent, state, attempts, data, error, updated_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, NULL, ?)",
+                (kind, key, parent, PENDING, json.dumps(data or {}), time.time())
+            )
+            self._conn.commit()
+
+    def get(self, kind, key):
+        """
+        Return a task, or None if it is not in the journal.
+
+        Returns:
+            dict: kind, key, parent, state, attempts, data, error
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, key, parent, state, attempts, data, error FROM tasks WHERE kind = ? AND key = ?",
+                (kind, key)
+            ).fetchone()
+        return self._to_task(row) if row else None
+
+    def tasks(self, kind, parent=None, state=None):
+        """Return the tasks of a kind, optionally filtered by parent and state."""
+        query = "SELECT kind, key, parent, state, attempts, data, error FROM tasks WHERE kind = ?"
+        params = [kind]
+        if parent is not None:
+            query += " AND parent = ?"
+            params.append(parent)
+        if state is not None:
+            query += " AND state = ?"
+            params.append(state)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._to_task(row) for row in rows]
+
+    @staticmethod
+    def _to_task(row):
+        kind, key, parent, state, attempts, data, error = row
+        return {
+            'kind': kind,
+            'key': key,
+            'parent': parent,
+            'state': state,
+            'attempts': attempts,
+            'data': json.loads(data or '{}'),
+            'error': error,
+        }
+
+    def _set_state(self, kind, key, state, data=None, error=None, attempt=False, parent=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM tasks WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            merged = json.loads(row[0] or '{}') if row else {}
+            merged.update(data or {})
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO tasks (kind, key, parent, state, attempts, data, error, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, key, parent, state, int(attempt), json.dumps(merged), error, time.time())
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE tasks SET state = ?, attempts = attempts + ?, data = ?, error = ?, updated_at = ? "
+                    "WHERE kind = ? AND key = ?",
+                    (state, int(attempt), json.dumps(merged), error, time.time(), kind, key)
+                )
+            self._conn.commit()
+
+    def start(self, kind, key, data=None, parent=None):
+        """Mark a task as in flight and count the attempt."""
+        self._set_state(kind, key, IN_FLIGHT, data, attempt=True, parent=parent)
+
+    def update(self, kind, key, data):
+        """Merge data into a task (e.g. the target path or an analysis result) without changing its state."""
+        task = self.get(kind, key)
+        self._set_state(kind, key, task['state'] if task else PENDING, data)
+
+    def release(self, kind, key):
+        """Put an in-flight task back to pending, e.g. when it will be retried later."""
+        self._set_state(kind, key, PENDING)
+
+    def finish(self, kind, key, data=None):
+        """Mark a task as done."""
+        self._set_state(kind, key, DONE, data)
+
+    def fail(self, kind, key, error=None):
+        """Mark a task as failed and delete its partial download, if any."""
+        task = self.get(kind, key)
+        if task:
+            remove_partial(task['data'].get('path'))
+        self._set_state(kind, key, FAILED, error=error)
+
+    def stats(self):
+        """Return the number of tasks per kind and state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, state, COUNT(*) FROM tasks GROUP BY kind, state").fetchall()
+        stats = {}
+        for kind, state, count in rows:
+            stats.setdefault(kind, {})[state] = count
+        return stats
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def get_journal(output_path, filename=JOURNAL_FILENAME):
+    """
+    Return the shared job journal of an output folder, opening it on first use.
+
+    Args:
+        output_path (str): Root folder of the run
+        filename (str): Journal file name (nodes sharing an output folder each keep their own)
+
+    Returns:
+        JobJournal: The folder's journal
+    """
+    key = os.path.join(os.path.abspath(output_path), filename)
+    with _journals_lock:
+        journal = _journals.get(key)
+        if journal is None:
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            journal = JobJournal(key)
+            _journals[key] = journal
+        return journal
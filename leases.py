@@ -0,0 +1,414 @@
+"""
+Channel ownership across machines sharing an output folder, with lease files.
+
+Several nodes (e.g. boxes mounting the same NFS share) can work through one
+channel list together: before processing a channel, a node claims it by
+creating ``.leases/<channel>.lease`` in the output folder with ``O_EXCL``,
+which succeeds for exactly one node even on NFS (SQLite locking is not
+reliable there). The file names the owner and an expiry time.
+
+- A heartbeat thread rewrites the node's lease files every ``ttl / 3``
+  seconds, pushing their expiry forward. Renewing, taking over and
+  releasing a lease happen under a short-lived ``<lease>.lock`` file (also
+  created with ``O_EXCL``), so a renewal never overwrites a lease another
+  node took over, and the live lease file is only ever replaced atomically.
+- A node whose lease is lost anyway (it stopped renewing in time) is told
+  through ``Lease.watch``, and stops working on the channel.
+- A lease whose owner stopped renewing it (crashed, lost the share) expires
+  after ``ttl`` seconds and is taken over by the next node claiming it.
+- A lease left behind by a process of this node that is no longer running
+  (the node crashed and was restarted) is reclaimed at once. Node ids must
+  therefore be unique per machine.
+- When a channel is finished, its lease file is turned into a "done" marker,
+  so other nodes skip the channel for ``done_ttl`` seconds (one run interval).
+
+Expiry times are wall-clock times written by one node and read by others,
+so the nodes' clocks must be synchronized (NTP) to well within ``ttl``.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import threading
+import logging
+import contextlib
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+LEASE_DIR = ".leases"
+LEASE_SUFFIX = ".lease"
+LOCK_SUFFIX = ".lock"
+# Seconds a lease stays valid without renewal
+LEASE_TTL = 120
+# Seconds to wait for a lease's lock file, and age after which a lock file is left over from a crash
+LOCK_TIMEOUT = 5
+LOCK_STALE_AFTER = 30
+
+HELD = 'held'
+DONE = 'done'
+
+
+def default_node_id():
+    """Return the name of this machine, used as its node id (stable across restarts)."""
+    return re.sub(r"[^\w.-]", "_", socket.gethostname())
+
+
+def _process_running(pid):
+    """Return True if a process with this id is running on this machine."""
+    if os.name == 'nt':
+        import ctypes
+
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def lease_filename(key):
+    """Return the lease file name of a channel key (channel id or alias key)."""
+    return re.sub(r"[^\w.-]", "_", key) + LEASE_SUFFIX
+
+
+class Lease:
+    """A channel lease held by this node."""
+
+    def __init__(self, key, path, token, expires_at):
+        self.key = key
+        self.path = path
+        self.token = token
+        self.expires_at = expires_at
+        self._lost = threading.Event()
+        self._watchers = []
+        self._watch_lock = threading.Lock()
+
+    @property
+    def lost(self):
+        """True once another node took the lease over (this node stopped renewing it in time)."""
+        return self._lost.is_set()
+
+    def watch(self, event):
+        """Set a threading.Event as soon as the lease is lost (at once if it already is)."""
+        with self._watch_lock:
+            self._watchers.append(event)
+            if not self.lost:
+                return
+        event.set()
+
+    def mark_lost(self):
+        """Record that the lease was lost; returns False if it already was."""
+        with self._watch_lock:
+            if self.lost:
+                return False
+            self._lost.set()
+            watchers = list(self._watchers)
+        for event in watchers:
+            event.set()
+        return True
+
+
+def watch_lease_file(path, token, lost, interval):
+    """
+    Set an event once a lease file no longer carries a token, from a process without the Lease.
+
+    Used by worker processes working on a channel whose lease the parent holds.
+
+    Args:
+        path (str): Lease file
+        token (str): Token of the lease
+        lost (threading.Event): Set when the lease was taken over
+        interval (float): Seconds between checks
+
+    Returns:
+        threading.Event: Set it to stop watching
+    """
+    stop = threading.Event()
+
+    def check():
+        while not stop.wait(interval):
+            record = LeaseManager._read(path)
+            # A partly written file ({}) is a new claim: renewals replace the file whole
+            if not record or record.get('token') != token:
+                logger.warning(f"Lease {os.path.basename(path)} was taken over by "
+                               f"{record.get('owner') if record else 'nobody'}")
+                lost.set()
+                return
+
+    threading.Thread(target=check, name="lease-watch", daemon=True).start()
+    return stop
+
+
+class LeaseManager:
+    """Claims, renews and releases channel leases in a shared folder."""
+
+    def __init__(self, root, node_id=None, ttl=LEASE_TTL, heartbeat=None):
+        """
+        Args:
+            root (str): Shared output folder; lease files go to its .leases subfolder
+            node_id (str): Name of this node in lease files (defaults to the host name)
+            ttl (float): Seconds a lease stays valid without renewal
+            heartbeat (float): Seconds between renewals (defaults to ttl / 3; 0 disables renewal)
+        """
+        self.directory = os.path.join(root, LEASE_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self.node_id = node_id or default_node_id()
+        self.ttl = ttl
+        self.heartbeat = ttl / 3 if heartbeat is None else heartbeat
+        self._lock = threading.Lock()
+        self._held = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _path(self, key):
+        return os.path.join(self.directory, lease_filename(key))
+
+    def _record(self, key, token, state=HELD):
+        now = time.time()
+        record = {'key': key, 'owner': self.node_id, 'pid': os.getpid(), 'token': token, 'state': state,
+                  'updated_at': now}
+        if state == HELD:
+            record['expires_at'] = now + self.ttl
+        return record
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Being written by its owner (or damaged); treated as held until it expires by mtime
+            return {}
+
+    def _write(self, path, record):
+        tmp_path = f"{path}.{record['token']}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _create(self, path, record):
+        """Create a lease file; only one node's O_EXCL create can succeed."""
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def _state(self, path, record, done_ttl):
+        """Classify an existing lease file as HELD, DONE or None (expired, free to take over)."""
+        now = time.time()
+        if record == {}:
+            try:
+                return HELD if now - os.path.getmtime(path) < self.ttl else None
+            except OSError:
+                return None
+        if record.get('state') == DONE:
+            return DONE if done_ttl and now - record.get('updated_at', 0) < done_ttl else None
+        if record.get('expires_at', 0) <= now or self._left_by_dead_process(record):
+            return None
+        return HELD
+
+    def _left_by_dead_process(self, record):
+        """Return True if a lease was written by an earlier, no longer running process of this node."""
+        pid = record.get('pid')
+        if record.get('owner') != self.node_id or not pid or pid == os.getpid():
+            return False
+        return not _process_running(pid)
+
+    def status(self, key, done_ttl=None):
+        """
+        Return the state of a channel's lease.
+
+        Returns:
+            str: HELD (by a live node, possibly this one), DONE (finished within done_ttl
+                seconds) or None (free)
+        """
+        path = self._path(key)
+        record = self._read(path)
+        return None if record is None else self._state(path, record, done_ttl)
+
+    def owner(self, key):
+        """Return the node named in a channel's lease file, or None."""
+        record = self._read(self._path(key))
+        return record.get('owner') if record else None
+
+    @contextlib.contextmanager
+    def _locked(self, path):
+        """Hold a lease's lock file; raises TimeoutError if another node keeps it."""
+        lock_path = path + LOCK_SUFFIX
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                os.close(os.open(lock_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+                break
+            except FileExistsError:
+                pass
+            try:
+                if time.time() - os.path.getmtime(lock_path) > LOCK_STALE_AFTER:
+                    # Left by a node that died holding it (the lock is only held for a read and a write)
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Lease lock {lock_path} is held by another node")
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
+
+    def _take_over(self, path, stale):
+        """Remove an expired lease file; False if it changed since it was read as expired."""
+        try:
+            with self._locked(path):
+                current = self._read(path)
+                if current is None:
+                    return True  # Released in the meantime
+                if current != stale:
+                    # Renewed or re-claimed between our read and taking the lock
+                    return False
+                os.remove(path)
+        except TimeoutError:
+            return False
+        logger.info(f"Taking over expired lease of {stale.get('key')} from {stale.get('owner')}")
+        get_metrics().incr('leases_taken_over')
+        return True
+
+    def claim(self, key, done_ttl=None):
+        """
+        Try to become the owner of a channel.
+
+        Args:
+            key (str): Channel key (use the same key on every node, e.g. the resolved channel id)
+            done_ttl (float): Do not claim a channel another node finished less than this many
+                seconds ago
+
+        Returns:
+            Lease: The lease, or None if the channel is held by another node or was finished recently
+        """
+        path = self._path(key)
+        token = uuid.uuid4().hex
+        for _ in range(3):
+            record = self._record(key, token)
+            if self._create(path, record):
+                lease = Lease(key, path, token, record['expires_at'])
+                with self._lock:
+                    self._held[key] = lease
+                self._start_heartbeat()
+                get_metrics().incr('leases_claimed')
+                return lease
+            existing = self._read(path)
+            if existing is None:
+                continue  # Released in the meantime; try again
+            if self._state(path, existing, done_ttl) is not None:
+                return None
+            if not self._take_over(path, existing):
+                return None
+        return None
+
+    def renew(self, lease):
+        """
+        Push a lease's expiry forward.
+
+        The lease file is checked and replaced while holding its lock, so a
+        lease another node took over is never overwritten.
+
+        Returns:
+            bool: False if the lease was lost to another node
+        """
+        try:
+            with self._locked(lease.path):
+                record = self._read(lease.path)
+                if record and record.get('token') == lease.token:
+                    renewed = self._record(lease.key, lease.token)
+                    self._write(lease.path, renewed)
+                    lease.expires_at = renewed['expires_at']
+                    return True
+        except TimeoutError as e:
+            # Still ours until it expires; the next heartbeat tries again
+            logger.warning(f"Could not renew lease of {lease.key}: {e}")
+            return not lease.lost
+        if lease.mark_lost():
+            logger.warning(f"Lease of {lease.key} was taken over by {record.get('owner') if record else 'nobody'}")
+            get_metrics().incr('leases_lost')
+        with self._lock:
+            if self._held.get(lease.key) is lease:
+                del self._held[lease.key]
+        return False
+
+    def release(self, lease, done=False):
+        """
+        Give a lease up.
+
+        Args:
+            lease (Lease): The lease
+            done (bool): The channel was finished; other nodes skip it for their done_ttl
+        """
+        with self._lock:
+            if self._held.get(lease.key) is lease:
+                del self._held[lease.key]
+        try:
+            with self._locked(lease.path):
+                record = self._read(lease.path)
+                if not record or record.get('token') != lease.token:
+                    return
+                if done:
+                    self._write(lease.path, self._record(lease.key, lease.token, DONE))
+                else:
+                    os.remove(lease.path)
+        except (OSError, TimeoutError) as e:
+            logger.warning(f"Could not release lease of {lease.key}: {e}")
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._thread is not None or not self.heartbeat:
+                return
+            self._thread = threading.Thread(target=self._renew_loop, name="lease-heartbeat", daemon=True)
+            self._thread.start()
+
+    def _renew_loop(self):
+        while not self._stop.wait(self.heartbeat):
+            with self._lock:
+                leases = list(self._held.values())
+            for lease in leases:
+                try:
+                    self.renew(lease)
+                except OSError as e:
+                    logger.warning(f"Could not renew lease of {lease.key}: {e}")
+
+    def held(self):
+        """Return the keys of the leases this node holds."""
+        with self._lock:
+            return list(self._held)
+
+    def close(self):
+        """Stop renewing and release every lease still held (not as done)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            leases = list(self._held.values())
+        for lease in leases:
+            self.release(lease)
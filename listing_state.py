@@ -0,0 +1,77 @@
+"""
+Per-channel high-water marks for incremental channel listing.
+
+For every channel the newest video ids seen by the last listing are kept in
+a small JSON file. An incremental listing pages through the channel's
+newest-first shorts tab and stops at the first id it has already seen.
+"""
+import os
+import json
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+LISTING_STATE_FILE = "listing_state.json"
+
+# Number of newest ids remembered per channel. Keeping more than one makes the
+# high-water mark survive the newest short being deleted or made private.
+HIGH_WATER_DEPTH = 20
+
+
+class ListingState:
+    """JSON-backed store of the newest video ids seen per channel."""
+
+    def __init__(self, path=LISTING_STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._channels = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._channels = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read listing state {path}: {e}")
+
+    def seen_ids(self, channel_key):
+        """Return the set of ids forming the channel's high-water mark."""
+        with self._lock:
+            return set(self._channels.get(channel_key, []))
+
+    def update(self, channel_key, new_ids):
+        """
+        Advance a channel's high-water mark.
+
+        Args:
+            channel_key (str): Channel identifier (the shorts playlist URL)
+            new_ids (list): Newly seen ids, newest first
+        """
+        if not new_ids:
+            return
+        with self._lock:
+            previous = [i for i in self._channels.get(channel_key, []) if i not in new_ids]
+            self._channels[channel_key] = (list(new_ids) + previous)[:HIGH_WATER_DEPTH]
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._channels, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save listing state {self.path}: {e}")
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_listing_state():
+    """Return the shared listing state, loading it on first use."""
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = ListingState()
+        return _state
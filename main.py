@@ -1,8 +1,12 @@
-from gui import run_gui
+import sys
 
 def main():
     """Entry point for the application."""
+    if "--headless" in sys.argv[1:]:
+        from headless import main as run_headless
+        return run_headless([arg for arg in sys.argv[1:] if arg != "--headless"])
+    from gui import run_gui
     run_gui()
  
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
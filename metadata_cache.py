@@ -0,0 +1,258 @@
+"""
+On-disk TTL cache of per-channel video metadata.
+
+ViralAnalyzer stores the per-video info of each channel (title, id,
+view_count, comment_count, upload_date) here. Entries younger than
+``fresh_ttl`` are served as-is; entries older than that but younger than
+``max_age`` are served immediately while a background thread re-fetches
+them; anything older is fetched synchronously. When the cache grows past
+``max_bytes`` the least recently used channels are evicted.
+
+Channels with more than ``max_videos`` videos are not cached: loading them
+back would hold the whole channel in memory, which streaming the listing
+(``iter_or_fetch``) avoids.
+
+Hits, stale hits, misses, refreshes, evictions and uncacheable channels are
+also counted in the metrics registry (``metadata_cache_*`` counters), so they
+reach the exporters and the headless run summary, e.g. to tune the TTLs.
+"""
+import json
+import time
+import sqlite3
+import threading
+import logging
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+METADATA_CACHE_FILE = "metadata_cache.sqlite"
+DEFAULT_FRESH_TTL = 60 * 60            # 1 hour
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60     # 1 week
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024   # 64 MiB
+DEFAULT_MAX_VIDEOS = 5000
+
+
+class MetadataCache:
+    """SQLite-backed cache of channel video metadata with TTLs and LRU size eviction."""
+
+    def __init__(self, path=METADATA_CACHE_FILE, fresh_ttl=DEFAULT_FRESH_TTL,
+                 max_age=DEFAULT_MAX_AGE, max_bytes=DEFAULT_MAX_BYTES, max_videos=DEFAULT_MAX_VIDEOS):
+        """
+        Args:
+            path (str): Path of the SQLite file
+            fresh_ttl (float): Seconds an entry is served without refreshing
+            max_age (float): Seconds after which a stale entry is no longer served
+            max_bytes (int): Total size of cached metadata before LRU eviction
+            max_videos (int): Channels with more videos than this are streamed, never cached
+        """
+        self.path = path
+        self.fresh_ttl = fresh_ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.max_videos = max_videos
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+        self.too_large = 0
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS channels ("
+            "channel_key TEXT PRIMARY KEY, fetched_at REAL, accessed_at REAL, size INTEGER, videos TEXT)"
+        )
+        self._conn.commit()
+
+    def _load(self, channel_key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, videos FROM channels WHERE channel_key = ?", (channel_key,)
+            ).fetchone()
+            if row:
+                self._conn.execute(
+                    "UPDATE channels SET accessed_at = ? WHERE channel_key = ?", (time.time(), channel_key)
+                )
+                self._conn.commit()
+        if not row:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def put(self, channel_key, videos):
+        """Store the video metadata of a channel and evict old channels if over budget."""
+        payload = json.dumps(videos)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO channels (channel_key, fetched_at, accessed_at, size, videos) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (channel_key, now, now, len(payload), payload)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM channels").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT channel_key, size FROM channels ORDER BY accessed_at").fetchall()
+        # Never evict the most recently used channel (normally the one just stored)
+        for channel_key, size in rows[:-1]:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM channels WHERE channel_key = ?", (channel_key,))
+            total -= size
+            self.evictions += 1
+            get_metrics().incr('metadata_cache_evictions')
+            logger.debug(f"Metadata cache evicted {channel_key}")
+
+    def forget(self, channel_key):
+        """Remove a channel from the cache."""
+        with self._lock:
+            self._conn.execute("DELETE FROM channels WHERE channel_key = ?", (channel_key,))
+            self._conn.commit()
+
+    def get(self, channel_key, refresh=None):
+        """
+        Return a channel's cached video metadata if it can be served.
+
+        A stale entry is returned and, if refresh is given, re-fetched in the background.
+
+        Args:
+            channel_key (str): Channel URL used as cache key
+            refresh: Callable returning the channel's videos (a list or any iterable)
+
+        Returns:
+            list: Video metadata dicts, or None on a miss
+        """
+        fetched_at, videos = self._load(channel_key)
+        age = time.time() - fetched_at if fetched_at is not None else None
+
+        if age is not None and age < self.fresh_ttl:
+            self._count('hits')
+            return videos
+
+        if age is not None and age < self.max_age:
+            self._count('stale_hits')
+            if refresh:
+                self._refresh_in_background(channel_key, refresh)
+            return videos
+
+        self._count('misses')
+        return None
+
+    def get_or_fetch(self, channel_key, fetch, refresh=None):
+        """
+        Return a channel's video metadata, fetching or refreshing it as needed.
+
+        Args:
+            channel_key (str): Channel URL used as cache key
+            fetch: Callable returning the channel's list of video dicts
+            refresh: Callable used for background refreshes (defaults to fetch)
+
+        Returns:
+            list: Video metadata dicts
+        """
+        videos = self.get(channel_key, refresh or fetch)
+        if videos is None:
+            videos = list(fetch())
+            self.store(channel_key, videos)
+        return videos
+
+    def iter_or_fetch(self, channel_key, fetch, refresh=None):
+        """
+        Like get_or_fetch, but a miss is streamed: fetch returns an iterable
+        (e.g. a generator paging through the channel) that is consumed lazily.
+
+        The fetched videos are stored once the caller has consumed all of them,
+        unless there are more than max_videos.
+
+        Returns:
+            iterable: Video metadata dicts
+        """
+        videos = self.get(channel_key, refresh or fetch)
+        if videos is None:
+            return self._collect(channel_key, fetch())
+        return videos
+
+    def _collect(self, channel_key, videos):
+        """Yield videos, storing copies of them at the end unless there are more than max_videos."""
+        kept = []
+        for video in videos:
+            if kept is not None:
+                # Copies, so fields the caller adds while ranking are not cached
+                kept.append(dict(video))
+                if len(kept) > self.max_videos:
+                    kept = None
+            yield video
+        if kept is not None:
+            self.put(channel_key, kept)
+            return
+        self._count('too_large')
+        logger.debug(f"Not caching {channel_key}: more than {self.max_videos} videos")
+        self.forget(channel_key)
+
+    def store(self, channel_key, videos):
+        """
+        Store the video metadata of a channel unless it has more than max_videos videos.
+
+        Args:
+            channel_key (str): Channel URL used as cache key
+            videos: List or iterable of video dicts (consumed)
+        """
+        for _ in self._collect(channel_key, videos):
+            pass
+
+    def _refresh_in_background(self, channel_key, fetch):
+        with self._lock:
+            if channel_key in self._refreshing:
+                return
+            self._refreshing.add(channel_key)
+
+        def refresh():
+            try:
+                self.store(channel_key, fetch())
+                self._count('refreshes')
+            except Exception as e:
+                logger.warning(f"Background refresh of {channel_key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(channel_key)
+
+        threading.Thread(target=refresh, name="metadata-refresh", daemon=True).start()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+        get_metrics().incr(f'metadata_cache_{name}')
+
+    def stats(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            channels, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM channels"
+            ).fetchone()
+            return {
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'evictions': self.evictions,
+                'too_large': self.too_large,
+                'channels': channels,
+                'bytes': size,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """Return the shared metadata cache, opening it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = MetadataCache()
+        return _cache
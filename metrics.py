@@ -0,0 +1,279 @@
+"""
+Structured metrics for the download pipeline.
+
+Counters (downloads succeeded/skipped/failed, ...), timing spans (extract_info,
+download, post-processing, rate-limit sleeps) and per-video transfer
+statistics (bytes, throughput, time to first byte) are collected in a
+process-wide ``Metrics`` registry. The transfer statistics come from yt-dlp
+progress hooks, not from parsing log output.
+
+The registry can be exported as JSON or Prometheus text, either to a file
+rewritten periodically (``start_file_exporter``) or from a local HTTP
+endpoint (``start_http_exporter``, serving /metrics and /metrics.json).
+"""
+import os
+import json
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "shorts_downloader"
+RECENT_TRANSFERS = 100
+
+
+class TransferTracker:
+    """
+    yt-dlp progress hook that measures one video transfer.
+
+    Records the time to first byte, bytes transferred, throughput and the
+    output filename, and reports them to the registry when the download
+    finishes. The download span runs from ``begin()`` to the end of the
+    transfer; whatever follows until ``close()`` is counted as post-processing.
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+        self.started = time.monotonic()
+        self.first_byte = None
+        self.finished = None
+        self.filename = None
+        self.bytes = 0
+        self.resumed_bytes = 0
+
+    def begin(self, filename):
+        """Call right before the download starts, with the target path from prepare_filename."""
+        self.started = time.monotonic()
+        try:
+            # Bytes already on disk from an earlier, interrupted attempt are not counted
+            self.resumed_bytes = os.path.getsize(filename + '.part')
+        except OSError:
+            self.resumed_bytes = 0
+
+    def __call__(self, d):
+        status = d.get('status')
+        now = time.monotonic()
+        downloaded = d.get('downloaded_bytes') or 0
+        if status == 'downloading':
+            if self.first_byte is None and downloaded > self.resumed_bytes:
+                self.first_byte = now
+        elif status == 'finished' and self.finished is None:
+            self.finished = now
+            self.filename = d.get('filename')
+            total = d.get('total_bytes') or downloaded
+            self.bytes = max(0, total - self.resumed_bytes)
+            seconds = now - self.started
+            self.metrics.observe('download', seconds)
+            self.metrics.incr('bytes_downloaded', self.bytes)
+            self.metrics.record_transfer({
+                'filename': self.filename,
+                'bytes': self.bytes,
+                'seconds': round(seconds, 3),
+                'ttfb': round(self.first_byte - self.started, 3) if self.first_byte else None,
+                'throughput': round(self.bytes / seconds) if seconds > 0 else None,
+            })
+
+    def close(self):
+        """Call once yt-dlp returns; records the post-processing time after the transfer."""
+        if self.finished is not None:
+            self.metrics.observe('postprocess', time.monotonic() - self.finished)
+
+
+class Metrics:
+    """Thread-safe registry of counters, timing spans and recent transfers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self._counters = {}
+        self._spans = {}
+        self._transfers = deque(maxlen=RECENT_TRANSFERS)
+        self._ttfb = {'count': 0, 'total': 0.0}
+
+    def incr(self, name, value=1):
+        """Add to a counter."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        """Record one timing of a span."""
+        with self._lock:
+            span = self._spans.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+            span['count'] += 1
+            span['total'] += seconds
+            span['max'] = max(span['max'], seconds)
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block as one observation of ``name``."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started)
+
+    def transfer(self):
+        """Return a progress hook measuring one video transfer."""
+        return TransferTracker(self)
+
+    def record_transfer(self, transfer):
+        with self._lock:
+            self._transfers.append(transfer)
+            if transfer.get('ttfb') is not None:
+                self._ttfb['count'] += 1
+                self._ttfb['total'] += transfer['ttfb']
+
+    def merge(self, snapshot):
+        """Add the counters and spans of another registry's snapshot (e.g. from a worker process)."""
+        with self._lock:
+            for name, value in snapshot.get('counters', {}).items():
+                self._counters[name] = self._counters.get(name, 0) + value
+            for name, other in snapshot.get('spans', {}).items():
+                span = self._spans.setdefault(name, {'count': 0, 'total': 0.0, 'max': 0.0})
+                span['count'] += other['count']
+                span['total'] += other['total_seconds']
+                span['max'] = max(span['max'], other['max_seconds'])
+            ttfb = snapshot.get('ttfb', {})
+            self._ttfb['count'] += ttfb.get('count', 0)
+            self._ttfb['total'] += ttfb.get('total_seconds', 0.0)
+            self._transfers.extend(snapshot.get('recent_transfers', []))
+
+    def snapshot(self):
+        """
+        Return the current state of the registry.
+
+        Returns:
+            dict: counters, spans (count/total/mean/max seconds), ttfb and recent transfers
+        """
+        with self._lock:
+            spans = {
+                name: {
+                    'count': span['count'],
+                    'total_seconds': round(span['total'], 3),
+                    'mean_seconds': round(span['total'] / span['count'], 3) if span['count'] else 0.0,
+                    'max_seconds': round(span['max'], 3),
+                }
+                for name, span in self._spans.items()
+            }
+            return {
+                'uptime_seconds': round(time.time() - self.started, 3),
+                'counters': dict(self._counters),
+                'spans': spans,
+                'ttfb': {'count': self._ttfb['count'], 'total_seconds': round(self._ttfb['total'], 3)},
+                'recent_transfers': list(self._transfers),
+            }
+
+    def to_prometheus(self):
+        """Render the registry in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {PREFIX}_uptime_seconds gauge", f"{PREFIX}_uptime_seconds {snapshot['uptime_seconds']}"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        if snapshot['spans']:
+            lines.append(f"# TYPE {PREFIX}_span_seconds summary")
+            for name, span in sorted(snapshot['spans'].items()):
+                lines.append(f'{PREFIX}_span_seconds_count{{span="{name}"}} {span["count"]}')
+                lines.append(f'{PREFIX}_span_seconds_sum{{span="{name}"}} {span["total_seconds"]}')
+        lines.append(f"# TYPE {PREFIX}_ttfb_seconds summary")
+        lines.append(f"{PREFIX}_ttfb_seconds_count {snapshot['ttfb']['count']}")
+        lines.append(f"{PREFIX}_ttfb_seconds_sum {snapshot['ttfb']['total_seconds']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Atomically write the registry to a file.
+
+        Args:
+            path (str): Target file; ``.prom``/``.txt`` files get Prometheus text, anything else JSON
+        """
+        if path.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry."""
+    return _metrics
+
+
+def start_file_exporter(path, interval=15, metrics=None):
+    """
+    Rewrite a metrics file every ``interval`` seconds from a daemon thread.
+
+    Args:
+        path (str): Target file (see Metrics.write for the format)
+        interval (float): Seconds between writes
+        metrics (Metrics): Registry to export (defaults to the process-wide one)
+
+    Returns:
+        threading.Event: Set it to stop the exporter (a final write is made)
+    """
+    metrics = metrics or _metrics
+    stop = threading.Event()
+
+    def run():
+        while True:
+            stopping = stop.wait(interval)
+            try:
+                metrics.write(path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics to {path}: {e}")
+            if stopping:
+                return
+
+    threading.Thread(target=run, name="metrics-exporter", daemon=True).start()
+    return stop
+
+
+def start_http_exporter(port, host="127.0.0.1", metrics=None):
+    """
+    Serve the registry on a local HTTP endpoint (/metrics and /metrics.json) from a daemon thread.
+
+    Args:
+        port (int): Port to listen on (0 picks a free port)
+        host (str): Interface to bind
+        metrics (Metrics): Registry to export (defaults to the process-wide one)
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            registry = self.server.metrics
+            if self.path == "/metrics":
+                body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = json.dumps(registry.snapshot()), "application/json"
+            else:
+                self.send_error(404)
+                return
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.metrics = metrics or _metrics
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info(f"Metrics available at http://{host}:{server.server_address[1]}/metrics")
+    return server
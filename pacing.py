@@ -0,0 +1,156 @@
+import random
+import threading
+import time
+import logging
+from collections import deque
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPacer:
+    """
+    Shared request scheduler for concurrent downloads (fixed spacing).
+
+    Instead of every download sleeping for a fixed time before and after
+    itself, all workers ask the pacer for a start slot. Slots are handed out
+    at least ``min_delay``-``max_delay`` seconds apart across the whole pool,
+    with an extra pause after every ``burst_size`` starts, so the request rate
+    seen by YouTube stays bounded no matter how many workers are running.
+    """
+
+    def __init__(self, min_delay=5.0, max_delay=10.0, burst_size=10, burst_pause=(15, 30)):
+        """
+        Args:
+            min_delay (float): Minimum spacing between two request starts, in seconds
+            max_delay (float): Maximum spacing between two request starts, in seconds
+            burst_size (int): Number of starts after which an extended pause is added
+                (0 disables the extended pause)
+            burst_pause (tuple): (min, max) seconds of the extended pause
+        """
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.burst_size = burst_size
+        self.burst_pause = burst_pause
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self._started = 0
+
+    def _spacing(self):
+        spacing = random.uniform(self.min_delay, self.max_delay) if self.max_delay > 0 else 0.0
+        if self.burst_size and self._started % self.burst_size == 0:
+            spacing += random.uniform(*self.burst_pause)
+        return spacing
+
+    def reserve(self):
+        """
+        Reserve the next start slot without waiting for it.
+
+        Returns:
+            float: Seconds until the reserved slot (0 if it is due now)
+        """
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._started += 1
+            self._next_slot = slot + self._spacing()
+            return slot - now
+
+    def wait(self, label_callback=None):
+        """
+        Block the calling worker until its start slot is due.
+
+        Args:
+            label_callback: Optional callable receiving a status message when
+                the worker has to wait for more than a second
+
+        Returns:
+            float: Seconds actually waited
+        """
+        delay = self.reserve()
+        if delay > 1 and label_callback:
+            label_callback(f"Rate limiting pause for {int(delay)} seconds...")
+        if delay > 0:
+            logger.debug(f"Pacing: waiting {delay:.1f}s for next request slot")
+            with get_metrics().span('rate_limit_sleep'):
+                time.sleep(delay)
+        return delay
+
+    def on_success(self):
+        """Report a request that completed without throttling (no-op for fixed pacing)."""
+
+    def on_throttle(self, reason=""):
+        """Report a 429 or throttled transfer (no-op for fixed pacing)."""
+
+
+class AdaptiveRequestPacer(RequestPacer):
+    """
+    Request pacer driven by an AIMD (additive increase, multiplicative decrease) controller.
+
+    The allowed request rate grows by ``increase`` requests/s after every
+    successful request and is multiplied by ``decrease`` whenever YouTube
+    answers with a 429 or a transfer is throttled, so the rate settles just
+    below the point where throttling starts.
+    """
+
+    def __init__(self, initial_rate=1 / 7.5, min_rate=1 / 60, max_rate=0.5, increase=0.01, decrease=0.5,
+                 jitter=0.2, history_size=500):
+        """
+        Args:
+            initial_rate (float): Starting request rate in requests/s
+            min_rate (float): Lowest rate the controller backs off to
+            max_rate (float): Highest rate the controller probes up to
+            increase (float): Rate added after each successful request
+            decrease (float): Factor applied to the rate on throttling
+            jitter (float): Relative random jitter applied to the request spacing
+            history_size (int): Number of (timestamp, rate) samples kept
+        """
+        super().__init__(min_delay=0, max_delay=0, burst_size=0)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.jitter = jitter
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self.successes = 0
+        self.throttles = 0
+        self.rate_history = deque([(time.time(), self.rate)], maxlen=history_size)
+
+    @property
+    def current_rate(self):
+        """Currently allowed request rate in requests/s."""
+        return self.rate
+
+    def _spacing(self):
+        spacing = 1.0 / self.rate
+        return spacing * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def on_success(self):
+        with self._lock:
+            self.successes += 1
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self.rate_history.append((time.time(), self.rate))
+
+    def on_throttle(self, reason=""):
+        with self._lock:
+            self.throttles += 1
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.rate_history.append((time.time(), self.rate))
+            # Push the next slot out so requests already queued also slow down
+            self._next_slot = max(self._next_slot, time.monotonic() + 1.0 / self.rate)
+            rate = self.rate
+        logger.warning(f"Throttled{f' ({reason})' if reason else ''}: request rate lowered to {rate * 60:.1f}/min")
+
+    def stats(self):
+        """Return the current rate and success/throttle counters."""
+        with self._lock:
+            return {
+                'rate_per_min': self.rate * 60,
+                'successes': self.successes,
+                'throttles': self.throttles,
+            }
+
+
+def no_pacing():
+    """Return a pacer that never waits (used by benchmarks and tests)."""
+    return RequestPacer(min_delay=0, max_delay=0, burst_size=0)
@@ -0,0 +1,342 @@
+"""
+asyncio pipeline that overlaps channel analysis with downloading.
+
+Channel listing/analysis runs in producer tasks and downloads run in
+consumer tasks; the two stages are connected by a bounded queue, so the
+metadata of upcoming channels is fetched while earlier channels are still
+downloading (or waiting out their inter-channel pause), but analysis never
+runs more than ``queue_size`` channels ahead. Blocking yt-dlp work runs in
+thread pool executors. Downloaded files can be handed to a post-download
+stage (postprocess.PostProcessor) that probes and catalogs them in worker
+processes while the downloads go on.
+
+With a job journal, every channel and video is recorded as it progresses,
+so a run interrupted by a crash or by closing the window is resumed by the
+next one: finished channels are skipped, analyzed channels reuse their
+stored ranking and interrupted downloads continue from their partial file.
+"""
+import os
+import asyncio
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from channel_resolver import get_resolver
+from utils import channel_folder_name
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class ChannelPipeline:
+    """Analyze and download a list of channels with overlapping stages."""
+
+    def __init__(self, channels, output_directory, progress_var=None, progress_label_var=None,
+                 current_channel_var=None, on_downloaded=None, max_analyze=100, max_download=31,
+                 incremental_limit=None, analyze_workers=2, download_workers=1, queue_size=2,
+                 channel_pause=(60, 300), journal=None, dedup=None, postprocessor=None, leases=None):
+        """
+        Args:
+            channels (list): Channel URLs
+            output_directory (str): Root folder; videos go to a per-channel subfolder
+            progress_var: Optional tkinter variable for the progress bar
+            progress_label_var: Optional tkinter variable for the progress label
+            current_channel_var: Optional tkinter variable showing the channel being downloaded
+            on_downloaded: Optional callable receiving each downloaded file path as soon as
+                it is stored
+            max_analyze (int): Videos ranked per channel
+            max_download (int): Videos downloaded per channel
+            incremental_limit (int): If set, channels without new shorts (checked
+                incrementally, listing at most this many) are skipped
+            analyze_workers (int): Channels analyzed concurrently
+            download_workers (int): Channels downloaded concurrently
+            queue_size (int): Analyzed channels allowed to wait for the download stage
+            channel_pause (tuple): (min, max) seconds a download worker pauses after a channel
+            journal (JobJournal): Optional job journal used to resume interrupted runs
+            dedup (DedupIndex): Optional dedup index shared by the channel folders
+            postprocessor (PostProcessor): Optional post-download stage fed every downloaded
+                file while downloads continue; the pipeline closes it when the run ends
+            leases (LeaseManager): Optional channel leases in a folder shared with other machines;
+                channels another node is working on are skipped, and a channel whose lease is
+                taken over is stopped and recorded as failed. Closed when the run ends.
+        """
+        self.channels = list(channels)
+        self.output_directory = output_directory
+        self.progress_var = progress_var
+        self.progress_label_var = progress_label_var
+        self.current_channel_var = current_channel_var
+        self.on_downloaded = on_downloaded
+        self.max_analyze = max_analyze
+        self.max_download = max_download
+        self.incremental_limit = incremental_limit
+        self.analyze_workers = max(1, analyze_workers)
+        self.download_workers = max(1, download_workers)
+        self.queue_size = queue_size
+        self.channel_pause = channel_pause
+        self.journal = journal
+        self.dedup = dedup
+        self.postprocessor = postprocessor
+        self.leases = leases
+        self._held = {}
+        self.results = {}
+        self._new_shorts = {}
+        self._new_links = {}
+        self._finished = 0
+        self._total = len(self.channels)
+        self._loop = None
+        self._tasks = []
+        # Set by cancel(); ends the running channel's downloads between videos
+        self._stop = threading.Event()
+        # Per-channel stop events, also set when the channel's lease is lost
+        self._channel_stops = {}
+
+    def _set(self, var, text):
+        if var is not None:
+            try:
+                var.set(text)
+            except Exception:
+                print(f"GUI update error: {text}")
+
+    def _label(self, text):
+        self._set(self.progress_label_var, text)
+
+    def _record(self, channel_url, status, error=None, downloaded=None, analyzed=False):
+        """
+        Record a channel's outcome, release its lease and update the journal.
+
+        The channel's high-water mark moves past the new shorts found by the
+        incremental check if it finished ('ok') or was analyzed without finding
+        viral videos (analyzed=True); otherwise they are listed again next run.
+        """
+        self.results[channel_url] = {'status': status, 'error': error, 'downloaded': downloaded or [],
+                                     'new_shorts': self._new_shorts.get(channel_url)}
+        self._finished += 1
+        new_links = self._new_links.pop(channel_url, None)
+        if new_links and (status == 'ok' or analyzed):
+            from downloader import mark_short_links_seen
+            mark_short_links_seen(channel_url, new_links)
+        lease = self._held.pop(channel_url, None)
+        if lease:
+            self.leases.release(lease, done=status == 'ok')
+        if self.journal:
+            if status == 'failed':
+                self.journal.fail('channel', channel_url, error)
+            else:
+                self.journal.finish('channel', channel_url)
+
+    def _analyze(self, channel_url, channel_name, channel_folder):
+        """Blocking analysis stage of one channel (runs in the analysis executor)."""
+        from viral_analyzer import ViralAnalyzer
+
+        if self.journal:
+            task = self.journal.get('channel', channel_url)
+            self.journal.start('channel', channel_url)
+            if task and 'viral_videos' in task['data']:
+                self._label(f"Resuming {channel_name} from the job journal")
+                return task['data']['viral_videos']
+
+        if self.incremental_limit:
+            from downloader import get_short_links
+            new_links = get_short_links(channel_url, None, self.progress_label_var, max_videos=self.incremental_limit,
+                                        incremental=True)
+            self._new_shorts[channel_url] = len(new_links)
+            self._new_links[channel_url] = new_links
+            if not new_links:
+                self._label(f"No new shorts for {channel_name}, skipping")
+                return None
+
+        os.makedirs(channel_folder, exist_ok=True)
+        # Analysis runs ahead of downloads, so it only reports to the label, not the progress bar
+        analyzer = ViralAnalyzer(progress_label_var=self.progress_label_var)
+        self._label(f"Analyzing viral potential for {channel_name}...")
+        viral_videos = analyzer.analyze_channel(channel_url, channel_folder, max_videos=self.max_analyze)
+        if self.journal and viral_videos:
+            self.journal.update('channel', channel_url, {'viral_videos': viral_videos})
+        return viral_videos
+
+    def _stored(self, path):
+        """Called from the download threads with every downloaded (or linked) file."""
+        if self.on_downloaded:
+            self.on_downloaded(path)
+        if self.postprocessor:
+            self.postprocessor.submit(path)
+
+    def _download(self, channel_url, channel_name, channel_folder, viral_videos):
+        """Blocking download stage of one channel (runs in the download executor)."""
+        from viral_analyzer import ViralAnalyzer
+
+        self._set(self.current_channel_var, f"Current Channel: {channel_name}")
+        analyzer = ViralAnalyzer(progress_var=self.progress_var, progress_label_var=self.progress_label_var,
+                                 journal=self.journal, dedup=self.dedup)
+        stop = threading.Event()
+        self._channel_stops[channel_url] = stop
+        lease = self._held.get(channel_url)
+        if lease:
+            lease.watch(stop)
+        if self._stop.is_set():
+            stop.set()
+        self._label(f"Downloading top {self.max_download} viral videos for {channel_name}...")
+        try:
+            return analyzer.download_viral_videos(viral_videos, channel_folder, limit=self.max_download,
+                                                  channel_url=channel_url, on_downloaded=self._stored, stop=stop)
+        finally:
+            self._channel_stops.pop(channel_url, None)
+
+    def _lease_lost(self, channel_url, channel_name):
+        """Record a channel whose lease another node took over; True if that happened."""
+        lease = self._held.get(channel_url)
+        if not (lease and lease.lost):
+            return False
+        self._label(f"{channel_name} was taken over by {self.leases.owner(lease.key)}, stopping")
+        self._record(channel_url, 'failed', "Lease lost to another node")
+        return True
+
+    async def _producer(self, work, queue, executor):
+        loop = asyncio.get_running_loop()
+        while work:
+            index, channel_url = work.pop(0)
+            # Resolved when the work list was deduplicated, so this is a cache lookup
+            channel_name = channel_folder_name(channel_url, network=False)
+            if not channel_name:
+                self._label(f"Error: Invalid channel URL - {channel_url}")
+                self._record(channel_url, 'failed', 'Invalid channel URL')
+                continue
+            channel_folder = os.path.join(self.output_directory, channel_name)
+            if self.leases:
+                channel = get_resolver().resolve(channel_url, network=False)
+                key = channel['key'] if channel else channel_url
+                lease = await loop.run_in_executor(executor, self.leases.claim, key)
+                if lease is None:
+                    self._label(f"{channel_name} is being processed by {self.leases.owner(key)}, skipping")
+                    self._record(channel_url, 'skipped', f"Claimed by {self.leases.owner(key)}")
+                    continue
+                self._held[channel_url] = lease
+            try:
+                viral_videos = await loop.run_in_executor(
+                    executor, self._analyze, channel_url, channel_name, channel_folder)
+            except Exception as e:
+                logger.exception(f"Analysis of {channel_url} failed")
+                self._label(f"Error analyzing channel {channel_name}: {str(e)}")
+                self._record(channel_url, 'failed', str(e))
+                continue
+            if self._lease_lost(channel_url, channel_name):
+                continue
+            if not viral_videos:
+                if viral_videos is not None:
+                    self._label(f"No viral videos found for {channel_name}")
+                self._record(channel_url, 'skipped', analyzed=viral_videos is not None)
+                continue
+            await queue.put((index, channel_url, channel_name, channel_folder, viral_videos))
+
+    async def _consumer(self, queue, executor):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await queue.get()
+            try:
+                if item is _DONE:
+                    return
+                index, channel_url, channel_name, channel_folder, viral_videos = item
+                if self._lease_lost(channel_url, channel_name):
+                    continue
+                try:
+                    paths = await loop.run_in_executor(
+                        executor, self._download, channel_url, channel_name, channel_folder, viral_videos)
+                except Exception as e:
+                    logger.exception(f"Downloads for {channel_url} failed")
+                    self._label(f"Error downloading channel {channel_name}: {str(e)}")
+                    self._record(channel_url, 'failed', str(e))
+                    continue
+                if self._stop.is_set():
+                    # Cut short by cancel(); the journal resumes the channel next run
+                    return
+                if self._lease_lost(channel_url, channel_name):
+                    continue
+                self._record(channel_url, 'ok', downloaded=paths)
+                self._label(f"Channel {index}: Downloaded {len(paths)} viral videos.")
+
+                # Pause between channels, unless this was the last one
+                if self.channel_pause and self.channel_pause[1] > 0 and self._finished < self._total:
+                    pause_time = random.randint(*self.channel_pause)
+                    self._label(f"Channel {index} completed. Pausing for {pause_time} seconds...")
+                    await asyncio.sleep(pause_time)
+            finally:
+                queue.task_done()
+
+    async def run(self):
+        """
+        Run the pipeline until every channel is processed or the pipeline is cancelled.
+
+        Returns:
+            dict: Per-channel results keyed by channel URL (status, error, downloaded,
+                new_shorts found by the incremental check or None)
+        """
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        # The same channel listed twice (or under another alias) is processed once
+        channels, duplicates = await self._loop.run_in_executor(None, get_resolver().dedupe, self.channels)
+        for channel_url, kept in duplicates.items():
+            self.results[channel_url] = {'status': 'skipped', 'error': f"Same channel as {kept}", 'downloaded': [],
+                                         'new_shorts': None}
+        work, kept = [], set(channels)
+        for index, channel_url in enumerate(self.channels, start=1):
+            if channel_url in kept:
+                kept.discard(channel_url)
+                work.append((index, channel_url))
+        if self.journal:
+            remaining = set(self.journal.begin_run(channels))
+            work = [(index, channel_url) for index, channel_url in work if channel_url in remaining]
+            if len(work) < len(channels):
+                self._label(f"Resuming interrupted run: {len(work)} of {len(channels)} channels left")
+        self._total = len(work)
+        analyze_executor = ThreadPoolExecutor(self.analyze_workers, thread_name_prefix="analyze")
+        download_executor = ThreadPoolExecutor(self.download_workers, thread_name_prefix="download")
+
+        producers = [asyncio.create_task(self._producer(work, queue, analyze_executor))
+                     for _ in range(self.analyze_workers)]
+        consumers = [asyncio.create_task(self._consumer(queue, download_executor))
+                     for _ in range(self.download_workers)]
+        self._tasks = producers + consumers
+        completed = False
+        try:
+            await asyncio.gather(*producers)
+            for _ in consumers:
+                await queue.put(_DONE)
+            await asyncio.gather(*consumers)
+            if self.postprocessor:
+                self._label("Waiting for post-processing to finish...")
+                await self._loop.run_in_executor(None, self.postprocessor.join)
+            completed = True
+            self._label("All channels processed.")
+        except asyncio.CancelledError:
+            self._label("Processing cancelled.")
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            # Blocking yt-dlp calls cannot be interrupted; let the running ones finish, drop the rest
+            for executor in (analyze_executor, download_executor):
+                executor.shutdown(wait=False, cancel_futures=True)
+            await asyncio.gather(
+                *(self._loop.run_in_executor(None, executor.shutdown, True)
+                  for executor in (analyze_executor, download_executor))
+            )
+            if self.postprocessor:
+                # After a cancelled run, files not yet processed are picked up when their channel runs again
+                await self._loop.run_in_executor(None, self.postprocessor.close, completed)
+            if self.leases:
+                await self._loop.run_in_executor(None, self.leases.close)
+            self._set(self.current_channel_var, "Current Channel: None")
+        return self.results
+
+    def cancel(self):
+        """Cancel the pipeline; safe to call from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            self._stop.set()
+            return
+        for task in self._tasks:
+            self._loop.call_soon_threadsafe(task.cancel)
+        # The running downloads stop at the next video instead of finishing the channel
+        self._stop.set()
+        for stop in list(self._channel_stops.values()):
+            stop.set()
@@ -0,0 +1,221 @@
+"""
+Per-channel adaptive polling scheduler.
+
+Every channel has its own next-check time, kept in a priority queue. The
+interval of a channel follows its observed upload rate (an exponentially
+weighted average of the new shorts found per second between checks): a channel uploading several
+shorts a day is checked often, one that has been quiet for weeks drifts
+towards ``max_interval``. The scheduler thread sleeps until the earliest
+due check, hands all channels due at that moment to ``dispatch`` as one
+batch, and only puts a channel back in the queue once its check has been
+reported complete, so work for the same channel never overlaps.
+
+Upload-rate estimates and next-check times survive restarts in a small JSON
+file.
+"""
+import os
+import json
+import time
+import heapq
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+POLL_SCHEDULE_FILE = "poll_schedule.json"
+
+MIN_INTERVAL = 15 * 60
+MAX_INTERVAL = 24 * 3600
+DEFAULT_INTERVAL = 3600
+
+# Aim for about this many new shorts per check
+TARGET_NEW_PER_CHECK = 1.0
+# Weight of the latest observation in the upload-rate average
+RATE_SMOOTHING = 0.3
+# Channels due within this many seconds of each other are dispatched together
+BATCH_WINDOW = 60
+
+
+class PollScheduler:
+    """Schedules incremental channel checks according to each channel's upload rate."""
+
+    def __init__(self, dispatch, path=POLL_SCHEDULE_FILE, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 default_interval=DEFAULT_INTERVAL, on_change=None):
+        """
+        Args:
+            dispatch: Callable receiving a list of due channel URLs. It must
+                eventually call complete() (or fail()) for each of them.
+            path (str): JSON file persisting the per-channel state
+            min_interval (float): Shortest time between two checks of a channel, in seconds
+            max_interval (float): Longest time between two checks of a channel, in seconds
+            default_interval (float): Interval used until a channel's upload rate is known
+            on_change: Optional callable receiving the next due time (epoch seconds or None)
+                whenever the schedule changes
+        """
+        self.dispatch = dispatch
+        self.path = path
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.on_change = on_change
+        self._cond = threading.Condition()
+        self._heap = []
+        self._channels = {}
+        self._in_flight = set()
+        self._active = set()
+        self._stopped = False
+        self._thread = None
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._channels = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read poll schedule {self.path}: {e}")
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._channels, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not save poll schedule {self.path}: {e}")
+
+    def interval(self, channel_url):
+        """
+        Return the polling interval of a channel derived from its upload rate.
+
+        Returns:
+            float: Seconds between two checks
+        """
+        rate = self._channels.get(channel_url, {}).get('rate')
+        if rate is None:
+            return self.default_interval
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, TARGET_NEW_PER_CHECK / rate))
+
+    def _push(self, channel_url, due):
+        self._channels.setdefault(channel_url, {})['next_check'] = due
+        heapq.heappush(self._heap, (due, channel_url))
+
+    def set_channels(self, channels):
+        """
+        Replace the set of scheduled channels.
+
+        New channels are first checked after default_interval unless a
+        next-check time is stored for them; removed channels are dropped
+        from the queue.
+        """
+        now = time.time()
+        with self._cond:
+            channels = list(dict.fromkeys(channels))
+            self._active = set(channels)
+            self._heap = [(due, url) for due, url in self._heap if url in self._active]
+            heapq.heapify(self._heap)
+            queued = {url for _, url in self._heap}
+            for channel_url in channels:
+                if channel_url in queued or channel_url in self._in_flight:
+                    continue
+                self._push(channel_url, self._channels.get(channel_url, {}).get('next_check',
+                                                                                 now + self.default_interval))
+            self._save()
+            self._cond.notify()
+        self._changed()
+
+    def complete(self, channel_url, new_shorts):
+        """
+        Report a finished check and schedule the channel's next one.
+
+        Args:
+            channel_url (str): Channel that was checked
+            new_shorts (int): Number of new shorts found by the check
+        """
+        now = time.time()
+        with self._cond:
+            state = self._channels.setdefault(channel_url, {})
+            last_check = state.get('last_check')
+            if last_check and now > last_check:
+                observed = new_shorts / (now - last_check)
+                previous = state.get('rate')
+                state['rate'] = observed if previous is None else (
+                    RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * previous)
+            state['last_check'] = now
+            self._reschedule(channel_url, now + self.interval(channel_url))
+        logger.info(f"Poll: {channel_url} had {new_shorts} new shorts, next check in "
+                    f"{int(self.interval(channel_url) / 60)} minutes")
+        self._changed()
+
+    def fail(self, channel_url):
+        """Report a check that failed; the channel is retried after min_interval."""
+        with self._cond:
+            self._reschedule(channel_url, time.time() + self.min_interval)
+        self._changed()
+
+    def _reschedule(self, channel_url, due):
+        self._in_flight.discard(channel_url)
+        if channel_url in self._active:
+            self._push(channel_url, due)
+        self._save()
+        self._cond.notify()
+
+    def next_due(self):
+        """Return the earliest next-check time (epoch seconds), or None if nothing is queued."""
+        with self._cond:
+            return self._heap[0][0] if self._heap else None
+
+    def _changed(self):
+        if self.on_change:
+            try:
+                self.on_change(self.next_due())
+            except Exception as e:
+                logger.error(f"Poll schedule callback error: {e}")
+
+    def _take_due(self):
+        """Pop every channel due now (within BATCH_WINDOW); returns [] if nothing is due yet."""
+        now = time.time()
+        if not self._heap or self._heap[0][0] > now:
+            return []
+        due = []
+        while self._heap and self._heap[0][0] <= now + BATCH_WINDOW:
+            _, channel_url = heapq.heappop(self._heap)
+            if channel_url not in self._in_flight:
+                self._in_flight.add(channel_url)
+                due.append(channel_url)
+        return due
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    due = self._take_due()
+                    if due:
+                        break
+                    # Sleep exactly until the next due check (or until the schedule changes)
+                    timeout = self._heap[0][0] - time.time() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopped:
+                    return
+            self._changed()
+            logger.info(f"Poll: checking {len(due)} channels")
+            try:
+                self.dispatch(due)
+            except Exception as e:
+                logger.error(f"Poll dispatch failed: {e}")
+                for channel_url in due:
+                    self.fail(channel_url)
+
+    def start(self):
+        """Start the scheduler thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="poll-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
@@ -0,0 +1,333 @@
+"""
+Post-download stage: probe media, extract a thumbnail and catalog every file.
+
+Once a video is downloaded, its path is handed to a PostProcessor (usually
+as the ``progress_callback`` / ``on_downloaded`` callable of the downloader).
+The file is processed on a pool of worker processes while downloads carry
+on, by a list of pluggable steps:
+
+- ``probe_media`` reads duration, resolution, frame rate and codecs with
+  ffprobe;
+- ``extract_thumbnail`` writes a JPEG frame to ``thumbnails/`` next to the
+  video with ffmpeg.
+
+A step is a module-level function ``step(path, record)`` returning a dict of
+fields to add to the record (steps run in a worker process, so they must be
+importable). A failing step is recorded in the record's ``errors`` and the
+remaining steps still run.
+
+The records are appended by the parent process, as JSON lines, to a
+``manifest.jsonl`` in each channel folder; files already in the manifest are
+not processed again.
+
+Submitting never blocks the downloader: at most ``max_queue`` files wait for
+a worker; beyond that, up to ``max_overflow`` paths are set aside and fed to
+the pool as soon as it catches up (at the latest when the stage is closed).
+Files submitted while both are full are dropped and counted; as they are not
+in the manifest, they are submitted again when their channel next runs.
+"""
+import os
+import json
+import time
+import queue
+import shutil
+import subprocess
+import threading
+import logging
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.jsonl"
+THUMBNAIL_DIR = "thumbnails"
+
+FFPROBE = "ffprobe"
+FFMPEG = "ffmpeg"
+# Height of extracted thumbnails (width follows the aspect ratio)
+THUMBNAIL_HEIGHT = 360
+STEP_TIMEOUT = 120
+
+DEFAULT_WORKERS = 2
+# Files waiting for a worker before further ones are set aside
+DEFAULT_MAX_QUEUE = 8
+# Files set aside before further ones are dropped
+DEFAULT_MAX_OVERFLOW = 256
+
+
+def _find_tool(tool):
+    executable = shutil.which(tool)
+    if not executable:
+        raise FileNotFoundError(f"{tool} not found on PATH")
+    return executable
+
+
+def _run_tool(tool, args):
+    result = subprocess.run([_find_tool(tool), *args], capture_output=True, text=True, timeout=STEP_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(f"{tool} exited with {result.returncode}: {result.stderr.strip()[-300:]}")
+    return result.stdout
+
+
+def probe_media(path, record):
+    """
+    Read the duration, resolution, frame rate and codecs of a media file with ffprobe.
+
+    Returns:
+        dict: duration (seconds), width, height, fps, vcodec, acodec and bitrate (where present)
+    """
+    output = _run_tool(FFPROBE, ["-v", "error", "-print_format", "json", "-show_format", "-show_streams", path])
+    data = json.loads(output or "{}")
+    streams = data.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+    fields = {
+        'duration': data.get('format', {}).get('duration'),
+        'bitrate': data.get('format', {}).get('bit_rate'),
+        'width': video.get('width'),
+        'height': video.get('height'),
+        'vcodec': video.get('codec_name'),
+        'acodec': audio.get('codec_name'),
+    }
+    if fields['duration'] is not None:
+        fields['duration'] = round(float(fields['duration']), 3)
+    if fields['bitrate'] is not None:
+        fields['bitrate'] = int(fields['bitrate'])
+    numerator, _, denominator = (video.get('avg_frame_rate') or "").partition('/')
+    if numerator and denominator and float(denominator):
+        fields['fps'] = round(float(numerator) / float(denominator), 3)
+    return {name: value for name, value in fields.items() if value is not None}
+
+
+def extract_thumbnail(path, record):
+    """
+    Write a JPEG frame of a video to the thumbnails folder next to it with ffmpeg.
+
+    The frame is taken one second in, or halfway through shorter videos (using
+    the duration found by probe_media, if it ran first).
+
+    Returns:
+        dict: thumbnail (path relative to the video's folder)
+    """
+    _find_tool(FFMPEG)
+    folder, filename = os.path.split(path)
+    relative_path = os.path.join(THUMBNAIL_DIR, f"{os.path.splitext(filename)[0]}.jpg")
+    thumbnail_path = os.path.join(folder, relative_path)
+    os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+    duration = record.get('duration')
+    offset = min(1.0, duration / 2) if duration else 0
+    _run_tool(FFMPEG, ["-v", "error", "-y", "-ss", str(offset), "-i", path, "-frames:v", "1",
+                       "-vf", f"scale=-2:{THUMBNAIL_HEIGHT}", thumbnail_path])
+    return {'thumbnail': relative_path}
+
+
+DEFAULT_STEPS = (probe_media, extract_thumbnail)
+
+
+def run_steps(path, steps):
+    """
+    Run post-processing steps on one file (runs in a worker process).
+
+    Returns:
+        dict: The manifest record (file, size, fields added by the steps, errors, seconds)
+    """
+    started = time.monotonic()
+    record = {'file': os.path.basename(path), 'size': os.path.getsize(path)}
+    errors = {}
+    for step in steps:
+        try:
+            record.update(step(path, record) or {})
+        except Exception as e:
+            errors[step.__name__] = f"{type(e).__name__}: {e}"
+    if errors:
+        record['errors'] = errors
+    record['seconds'] = round(time.monotonic() - started, 3)
+    return record
+
+
+class PostProcessor:
+    """Runs post-processing steps on downloaded files in worker processes and catalogs the results."""
+
+    def __init__(self, steps=DEFAULT_STEPS, max_workers=DEFAULT_WORKERS, max_queue=DEFAULT_MAX_QUEUE,
+                 max_overflow=DEFAULT_MAX_OVERFLOW):
+        """
+        Args:
+            steps (tuple): Step functions, run in order on every file
+            max_workers (int): Worker processes
+            max_queue (int): Files allowed to wait for a worker; further files are set aside
+                instead of blocking the caller
+            max_overflow (int): Files allowed to be set aside; further files are dropped
+        """
+        self.steps = tuple(steps)
+        self.max_workers = max(1, max_workers)
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._overflow = []
+        self.max_overflow = max(0, max_overflow)
+        self._slots = threading.Semaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._outstanding = 0
+        self._seen = set()
+        self._manifests = {}
+        self._executor = None
+        self._dispatcher = None
+        self._closed = False
+        self.stats = {'submitted': 0, 'processed': 0, 'step_errors': 0, 'failed': 0, 'deferred': 0, 'dropped': 0}
+
+    def _cataloged(self, folder):
+        """Return the files already in a folder's manifest (read once per folder)."""
+        files = self._manifests.get(folder)
+        if files is None:
+            files = set()
+            try:
+                with open(os.path.join(folder, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            files.add(json.loads(line)['file'])
+                        except (ValueError, KeyError):
+                            continue
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not read manifest in {folder}: {e}")
+            self._manifests[folder] = files
+        return files
+
+    def _start(self):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Spawned workers do not inherit the parent's threads, locks or open sessions
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        self._dispatcher = threading.Thread(target=self._dispatch, name="postprocess", daemon=True)
+        self._dispatcher.start()
+
+    def submit(self, path):
+        """
+        Queue a downloaded file for post-processing; never blocks.
+
+        Usable as the downloader's progress_callback or the pipeline's on_downloaded.
+
+        Returns:
+            bool: False if the file was already processed (or queued), the stage is closed,
+                the path is not a file or the stage is too far behind and dropped it
+        """
+        path = os.path.abspath(path)
+        folder, filename = os.path.split(path)
+        with self._lock:
+            if self._closed or path in self._seen or filename in self._cataloged(folder):
+                return False
+            if not os.path.isfile(path):
+                return False
+            if self._queue.full() and len(self._overflow) >= self.max_overflow:
+                # Not cataloged, so it is submitted again when its channel next runs
+                self.stats['dropped'] += 1
+                get_metrics().incr('postprocess_dropped')
+                logger.warning(f"Post-processing is behind, not processing {path} in this run")
+                return False
+            self._seen.add(path)
+            self._outstanding += 1
+            self.stats['submitted'] += 1
+            if self._executor is None:
+                self._start()
+            try:
+                self._queue.put_nowait(path)
+            except queue.Full:
+                # The pool is behind; keep the path and feed it once the queue drains
+                self._overflow.append(path)
+                self.stats['deferred'] += 1
+                get_metrics().incr('postprocess_deferred')
+        return True
+
+    __call__ = submit
+
+    def _next(self):
+        with self._lock:
+            while self._overflow and not self._queue.full():
+                self._queue.put_nowait(self._overflow.pop(0))
+        return self._queue.get()
+
+    def _dispatch(self):
+        while True:
+            path = self._next()
+            if path is None:
+                return
+            self._slots.acquire()
+            try:
+                future = self._executor.submit(run_steps, path, self.steps)
+            except Exception as e:
+                self._slots.release()
+                self._finish(path, None, e)
+                continue
+            future.add_done_callback(lambda future, path=path: self._done(path, future))
+
+    def _done(self, path, future):
+        self._slots.release()
+        try:
+            record, error = future.result(), None
+        except Exception as e:
+            record, error = None, e
+        self._finish(path, record, error)
+
+    def _finish(self, path, record, error):
+        metrics = get_metrics()
+        folder = os.path.dirname(path)
+        with self._lock:
+            try:
+                if error is not None:
+                    self.stats['failed'] += 1
+                    metrics.incr('postprocess_failed')
+                    logger.error(f"Post-processing {path} failed: {error}")
+                    return
+                record['processed_at'] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                try:
+                    # The parent is the only writer, so appends never interleave
+                    with open(os.path.join(folder, MANIFEST_FILENAME), "a", encoding="utf-8") as f:
+                        f.write(json.dumps(record) + "\n")
+                    self._cataloged(folder).add(record['file'])
+                except OSError as e:
+                    logger.error(f"Could not write manifest in {folder}: {e}")
+                self.stats['processed'] += 1
+                metrics.incr('postprocess_completed')
+                metrics.observe('postprocess_stage', record.get('seconds', 0))
+                if record.get('errors'):
+                    self.stats['step_errors'] += 1
+                    metrics.incr('postprocess_step_errors')
+                    logger.warning(f"Post-processing {record['file']}: {record['errors']}")
+            finally:
+                self._outstanding -= 1
+                self._idle.notify_all()
+
+    def join(self, timeout=None):
+        """
+        Wait until every submitted file is processed.
+
+        Returns:
+            bool: True if the stage is idle, False on timeout
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
+
+    def close(self, wait=True):
+        """
+        Stop accepting files and shut the worker processes down.
+
+        Args:
+            wait (bool): Process the files already submitted first; otherwise they are dropped
+        """
+        with self._lock:
+            self._closed = True
+            if not wait:
+                self._overflow.clear()
+                while True:
+                    try:
+                        self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+        if wait:
+            self.join()
+        if self._executor is not None:
+            self._queue.put(None)
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+        logger.info(f"Post-processing: {self.stats}")
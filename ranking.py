@@ -0,0 +1,109 @@
+"""
+Streaming top-N ranking of channel videos.
+
+Keeps a bounded min-heap of the best ``top_n`` videos while consuming video
+dicts one at a time, so ranking a channel costs O(n log top_n) time and
+O(top_n) memory. The order matches the previous pandas implementation:
+most comments, then most views, then newest upload date, with missing
+upload dates last and ties kept in input order.
+
+When engagement history is available, ``growth_key`` ranks by projected
+view velocity instead (see engagement.py).
+"""
+import heapq
+import json
+
+
+def ranking_key(video):
+    """Sort key for a video dict: comments, views, then upload date (missing dates rank last)."""
+    upload_date = video.get('upload_date')
+    return (
+        video.get('comments', 0),
+        video.get('views', 0),
+        upload_date is not None,
+        upload_date or '',
+    )
+
+
+# Hours ahead the growth ranking projects a video's view velocity
+GROWTH_HORIZON = 1.0
+
+
+def growth_key(video):
+    """Sort key for a scored video dict: projected views/hour, then ranking_key."""
+    projected = video.get('views_per_hour', 0) + GROWTH_HORIZON * video.get('acceleration', 0)
+    return (projected,) + ranking_key(video)
+
+
+class TopN:
+    """Bounded heap holding the top N videos seen so far."""
+
+    def __init__(self, top_n, key=ranking_key):
+        """
+        Args:
+            top_n (int): Number of videos to keep
+            key: Callable returning a comparable sort key (larger ranks higher)
+        """
+        self.top_n = top_n
+        self.key = key
+        self.count = 0
+        self._heap = []
+
+    def push(self, video):
+        """Offer a video to the ranking."""
+        # Earlier videos win ties, like a stable sort
+        item = (self.key(video), -self.count, video)
+        self.count += 1
+        if len(self._heap) < self.top_n:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+
+    def extend(self, videos):
+        """Offer every video of an iterable to the ranking."""
+        for video in videos:
+            self.push(video)
+
+    def results(self):
+        """Return the kept videos, best first."""
+        return [item[2] for item in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+def rank_videos(videos, top_n):
+    """
+    Return the top N videos of an iterable, best first.
+
+    Args:
+        videos: Iterable of video dicts
+        top_n (int): Number of videos to return
+
+    Returns:
+        list: Top video dicts
+    """
+    ranking = TopN(top_n)
+    ranking.extend(videos)
+    return ranking.results()
+
+
+def to_dataframe(videos):
+    """Convert ranked video dicts to a pandas DataFrame (pandas is only imported here)."""
+    import pandas as pd
+    return pd.DataFrame(videos)
+
+
+def to_json(videos, path):
+    """
+    Write ranked video dicts as JSON records.
+
+    The output is byte-identical to ``DataFrame.to_json(path, orient="records", indent=4)``,
+    which earlier versions used for viral_videos_metadata.json.
+
+    Args:
+        videos (list): Video dicts
+        path (str): Output file path
+    """
+    text = json.dumps(videos, indent=4, separators=(',', ':'), ensure_ascii=True)
+    # pandas escapes forward slashes; "/" can only occur inside JSON strings
+    text = text.replace('/', '\\/')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
@@ -1,5 +1,4 @@
 import os
-import keyring
 
 def get_api_key():
     # Try environment variable first
@@ -9,6 +8,7 @@ def get_api_key():
     
     # Try system keyring
     try:
+        import keyring
         api_key = keyring.get_password("youtube_api", "api_key")
         if api_key:
             return api_key
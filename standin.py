@@ -0,0 +1,261 @@
+"""
+Local YouTube stand-in for offline benchmarks and tests.
+
+``start_stand_in_server`` serves synthetic channels and video payloads over
+HTTP on 127.0.0.1:
+
+    /api/channel/<name>?page=N   JSON page of a channel's shorts listing (newest first)
+    /api/video/<id>              JSON metadata of one video
+    /video/<id>.mp4              Synthetic video payload (supports resuming with Range)
+                                 ids added to ``server.truncated`` are served cut in half, once
+    /youtube/v3/videos?id=a,b    YouTube Data API videos.list (statistics of up to 50 ids)
+                                 answers 403 quotaExceeded while ``server.quota_exceeded`` is set
+
+``make_standin_extractor`` builds a yt-dlp InfoExtractor that claims
+youtube.com URLs of the synthetic channels (``@bench<N>`` or their
+``/channel/UCbench<N>___`` id URLs) and videos (ids
+starting with ``zz``) and resolves them against the server. Registering it
+with the session pool (``get_pool().register_extractor``) lets the real code
+paths (get_short_links, download_videos_from_links, ViralAnalyzer) run
+unmodified without network access.
+"""
+import re
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PAGE_SIZE = 100
+
+
+def standin_video_id(channel_index, video_index):
+    """Return the 11-character synthetic video id of a channel's n-th short."""
+    return f"zz{channel_index:02d}{video_index:07d}"
+
+
+def standin_channel_id(name):
+    """Return the 24-character synthetic channel id (``UCbench3___...``) of a stand-in channel."""
+    return f"UC{name:_<22}"
+
+
+def standin_video_metadata(video_id):
+    """Return deterministic synthetic metadata for a stand-in video id."""
+    rng = random.Random(video_id)
+    return {
+        'id': video_id,
+        'title': f"Stand-in short {video_id}",
+        'view_count': rng.randint(0, 5_000_000),
+        'comment_count': rng.randint(0, 200),
+        'upload_date': f"2024{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+    }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves synthetic channel listings, video metadata and payloads."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this each keep-alive response stalls on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_channel_page(self, name, query):
+        server = self.server
+        channel_index = int(name[len("bench"):] or 0)
+        page = int(query.get('page', ['0'])[0])
+        start = page * PAGE_SIZE
+        end = min(start + PAGE_SIZE, server.channel_size)
+        # Video 0 is the newest short
+        entries = [standin_video_metadata(standin_video_id(channel_index, i)) for i in range(start, end)]
+        self._send_json({'entries': entries, 'has_more': end < server.channel_size})
+
+    def _send_video(self, video_id, head_only=False):
+        server = self.server
+        size = server.video_size
+        with server.stats_lock:
+            if not head_only and video_id in server.truncated:
+                # A damaged copy that is consistent with its own headers, as a broken cache would serve it
+                server.truncated.discard(video_id)
+                size //= 2
+        # Honour "Range: bytes=N-" so resumed downloads only fetch the missing bytes
+        start = 0
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and int(match.group(1)) < size:
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+        if head_only:
+            return
+        with server.stats_lock:
+            server.bytes_sent += size - start
+        chunk = b"\0" * 16384
+        remaining = size - start
+        while remaining > 0:
+            block = chunk[:min(len(chunk), remaining)]
+            self.wfile.write(block)
+            remaining -= len(block)
+            if server.bandwidth:
+                time.sleep(len(block) / server.bandwidth)
+
+    def _send_videos_list(self, query):
+        # Same response shape as the Data API: counts are strings
+        video_ids = [video_id for video_id in query.get('id', [''])[0].split(',') if video_id]
+        if not video_ids or len(video_ids) > 50:
+            self.send_error(400)
+            return
+        with self.server.stats_lock:
+            self.server.api_calls += 1
+        if self.server.quota_exceeded:
+            self._send_quota_exceeded()
+            return
+        items = []
+        for video_id in video_ids:
+            metadata = standin_video_metadata(video_id)
+            items.append({'kind': 'youtube#video', 'id': video_id, 'statistics': {
+                'viewCount': str(metadata['view_count']),
+                'likeCount': str(metadata['view_count'] // 20),
+                'commentCount': str(metadata['comment_count']),
+            }})
+        self._send_json({'kind': 'youtube#videoListResponse', 'items': items,
+                         'pageInfo': {'totalResults': len(items), 'resultsPerPage': len(items)}})
+
+    def _send_quota_exceeded(self):
+        message = "The request cannot be completed because you have exceeded your quota."
+        body = json.dumps({'error': {'code': 403, 'message': message, 'errors': [
+            {'message': message, 'domain': 'youtube.quota', 'reason': 'quotaExceeded'}]}}).encode("utf-8")
+        self.send_response(403)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, head_only=False):
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        time.sleep(self.server.latency)
+        with self.server.stats_lock:
+            self.server.requests += 1
+        if parts[:2] == ["api", "channel"] and len(parts) == 3:
+            self._send_channel_page(parts[2], parse_qs(parsed.query))
+        elif parts[:2] == ["api", "video"] and len(parts) == 3:
+            self._send_json({**standin_video_metadata(parts[2]), 'filesize': self.server.video_size})
+        elif parts[0] == "video" and len(parts) == 2:
+            self._send_video(parts[1].split(".")[0], head_only)
+        elif parts == ["youtube", "v3", "videos"]:
+            self._send_videos_list(parse_qs(parsed.query))
+        else:
+            self.send_error(404)
+
+    def do_HEAD(self):
+        self._route(head_only=True)
+
+    def do_GET(self):
+        try:
+            self._route()
+        except (BrokenPipeError, ConnectionResetError):
+            # Clients may close the connection after reading only part of a payload
+            pass
+
+
+def start_stand_in_server(video_size=256 * 1024, latency=0.2, bandwidth=1024 * 1024, channel_size=200):
+    """
+    Start the stand-in server on a free local port in a daemon thread.
+
+    Args:
+        video_size (int): Size of each synthetic video in bytes
+        latency (float): Seconds of simulated latency per request
+        bandwidth (int): Simulated per-connection bandwidth in bytes/s (0 for unlimited)
+        channel_size (int): Number of shorts in every synthetic channel
+
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() when done)
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.video_size = video_size
+    server.latency = latency
+    server.bandwidth = bandwidth
+    server.channel_size = channel_size
+    server.requests = 0
+    server.bytes_sent = 0
+    server.api_calls = 0
+    server.truncated = set()
+    server.quota_exceeded = False
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_base_url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def make_standin_extractor(base_url):
+    """
+    Build a yt-dlp extractor that resolves synthetic youtube.com URLs against a stand-in server.
+
+    Args:
+        base_url (str): Base URL of the stand-in server
+
+    Returns:
+        type: InfoExtractor subclass
+    """
+    from yt_dlp.extractor.common import InfoExtractor
+
+    class StandInYoutubeIE(InfoExtractor):
+        IE_NAME = 'standin:youtube'
+        _VALID_URL = (r'https?://(?:www\.)?youtube\.com/(?:(?:@|channel/UC)(?P<channel>bench\d+)_*(?:/shorts)?/?$'
+                      r'|(?:shorts/|watch\?v=)(?P<id>zz\d{9}))')
+
+        def _channel_entries(self, channel):
+            page = 0
+            while True:
+                data = self._download_json(f"{base_url}/api/channel/{channel}?page={page}", channel,
+                                           note=False)
+                for entry in data['entries']:
+                    yield self.url_result(
+                        f"https://www.youtube.com/shorts/{entry['id']}", StandInYoutubeIE, entry['id'],
+                        entry['title'], view_count=entry['view_count'], comment_count=entry['comment_count'],
+                        upload_date=entry['upload_date'])
+                if not data['has_more']:
+                    return
+                page += 1
+
+        def _real_extract(self, url):
+            channel, video_id = self._match_valid_url(url).group('channel', 'id')
+            if channel:
+                return self.playlist_result(self._channel_entries(channel), channel, channel,
+                                            channel_id=standin_channel_id(channel), uploader_id=f"@{channel}")
+            metadata = self._download_json(f"{base_url}/api/video/{video_id}", video_id, note=False)
+            filesize = metadata.pop('filesize', None)
+            return {
+                **metadata,
+                'formats': [{
+                    'url': f"{base_url}/video/{video_id}.mp4",
+                    'filesize': filesize,
+                    'ext': 'mp4',
+                    'format_id': 'mp4',
+                    'height': 720,
+                    'vcodec': 'avc1',
+                    'acodec': 'mp4a',
+                }],
+            }
+
+    return StandInYoutubeIE
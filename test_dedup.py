@@ -0,0 +1,52 @@
+"""
+Linking stored copies across channel folders must never replace or delete other files.
+
+Run with pytest, or directly: python test_dedup.py
+"""
+import os
+import tempfile
+from dedup import DedupIndex
+from integrity import get_integrity_manifest
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_link_existing_keeps_a_different_file_with_the_same_name():
+    with tempfile.TemporaryDirectory() as root:
+        index = DedupIndex(os.path.join(root, "index.sqlite"))
+        source = _write(os.path.join(root, "one", "Same title.mp4"), b"first video" * 100)
+        index.register("aaaaaaaaaaa", source)
+        other = _write(os.path.join(root, "two", "Same title.mp4"), b"second video" * 100)
+
+        linked = index.link_existing("aaaaaaaaaaa", os.path.join(root, "two"))
+        assert linked == os.path.join(root, "two", "Same title [aaaaaaaaaaa].mp4")
+        assert os.path.samefile(linked, source)
+        with open(other, "rb") as f:
+            assert f.read() == b"second video" * 100
+        # Linking again reuses the existing link
+        assert index.link_existing("aaaaaaaaaaa", os.path.join(root, "two")) == linked
+        index.close()
+
+
+def test_lookup_does_not_remove_a_failing_copy():
+    with tempfile.TemporaryDirectory() as root:
+        index = DedupIndex(os.path.join(root, "index.sqlite"))
+        source = _write(os.path.join(root, "one", "Clip.mp4"), b"clip" * 100)
+        index.register("bbbbbbbbbbb", source)
+        get_integrity_manifest(os.path.dirname(source)).record(source, 1, "0" * 64)
+
+        assert index.lookup("bbbbbbbbbbb") is None
+        assert os.path.exists(source)
+        index.close()
+
+
+if __name__ == "__main__":
+    test_link_existing_keeps_a_different_file_with_the_same_name()
+    print("ok  test_link_existing_keeps_a_different_file_with_the_same_name")
+    test_lookup_does_not_remove_a_failing_copy()
+    print("ok  test_lookup_does_not_remove_a_failing_copy")
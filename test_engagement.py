@@ -0,0 +1,57 @@
+"""
+score_growth turns known view snapshots into the expected velocity and acceleration.
+
+Run with pytest, or directly: python test_engagement.py
+"""
+import math
+from engagement import score_growth
+
+HOUR = 3600
+NOW = 1_700_000_000.0
+T0 = NOW - 2 * HOUR
+
+# (video index, seconds after T0, views); video 5 has no snapshots
+SNAPSHOTS = [
+    (0, 0, 1000), (0, HOUR, 2000), (0, 2 * HOUR, 4000),      # 1000 then 2000 views/h
+    (1, 2 * HOUR, 500),                                      # seen once, uploaded 10 h ago
+    (2, 1.5 * HOUR, 100), (2, 2 * HOUR, 400),                # half an hour apart, upload date unknown
+    (3, 1.5 * HOUR, 100), (3, 2 * HOUR, 400),                # half an hour apart, uploaded 100 h ago
+    (4, 0, 0), (4, 2 * HOUR, 1000),                          # one full window only
+]
+UPLOAD_TIMES = [NOW - 50 * HOUR, NOW - 10 * HOUR, math.nan, NOW - 100 * HOUR, NOW - 50 * HOUR, NOW]
+
+
+def _score(window=HOUR):
+    groups, offsets, views = zip(*SNAPSHOTS)
+    return score_growth(list(groups), [T0 + offset for offset in offsets], list(views), len(UPLOAD_TIMES),
+                        upload_times=UPLOAD_TIMES, now=NOW, window=window)
+
+
+def test_velocity_and_acceleration():
+    velocity, acceleration = _score()
+    assert velocity[0] == 2000
+    # From 1000 to 2000 views/h between interval midpoints one hour apart
+    assert acceleration[0] == 1000
+    assert velocity[4] == 500 and acceleration[4] == 0
+
+
+def test_single_snapshot_uses_lifetime_average():
+    velocity, acceleration = _score()
+    assert velocity[1] == 50 and acceleration[1] == 0
+    assert velocity[5] == 0 and acceleration[5] == 0
+
+
+def test_window_too_short():
+    velocity, acceleration = _score()
+    # Snapshots closer than the window are not a velocity; the lifetime average is used if known
+    assert velocity[2] == 0 and acceleration[2] == 0
+    assert velocity[3] == 4 and acceleration[3] == 0
+    # With a window the snapshots span, the same history yields a velocity
+    velocity, _ = _score(window=HOUR / 2)
+    assert velocity[2] == velocity[3] == 600
+
+
+if __name__ == "__main__":
+    for test in (test_velocity_and_acceleration, test_single_snapshot_uses_lifetime_average, test_window_too_short):
+        test()
+        print(f"ok  {test.__name__}")
@@ -0,0 +1,93 @@
+"""
+Statistics enrichment batches 50 ids per videos.list call, charges the quota
+tracker and stops calling the API once it reports quotaExceeded.
+
+The enricher is pointed at the stand-in server through YOUTUBE_API_ENDPOINT.
+
+Run with pytest, or directly: python test_enrichment.py
+"""
+import os
+import tempfile
+from enrichment import StatisticsEnricher, QuotaTracker
+from metrics import get_metrics
+from standin import start_stand_in_server, server_base_url, standin_video_id, standin_video_metadata
+
+VIDEOS = 120
+
+
+def _counters():
+    counters = get_metrics().snapshot()['counters']
+    return {name: counters.get(name, 0) for name in ('api_calls', 'api_quota_units', 'api_errors')}
+
+
+def _with_stand_in(test, daily_budget=1000):
+    server = start_stand_in_server(latency=0, channel_size=0)
+    endpoint = os.environ.get('YOUTUBE_API_ENDPOINT')
+    os.environ['YOUTUBE_API_ENDPOINT'] = server_base_url(server)
+    try:
+        with tempfile.TemporaryDirectory() as folder:
+            quota = QuotaTracker(os.path.join(folder, "api_quota.sqlite"), daily_budget=daily_budget)
+            try:
+                test(server, StatisticsEnricher("stand-in key", quota=quota), quota)
+            finally:
+                quota.close()
+    finally:
+        if endpoint is None:
+            os.environ.pop('YOUTUBE_API_ENDPOINT', None)
+        else:
+            os.environ['YOUTUBE_API_ENDPOINT'] = endpoint
+        server.shutdown()
+
+
+def test_ids_are_fetched_50_per_call():
+    def check(server, enricher, quota):
+        video_ids = [standin_video_id(1, i) for i in range(VIDEOS)]
+        before = _counters()
+        statistics = enricher.fetch(video_ids + video_ids[:10])
+        assert server.api_calls == 3
+        assert quota.used() == 3
+        after = _counters()
+        assert {name: after[name] - before[name] for name in after} == {
+            'api_calls': 3, 'api_quota_units': 3, 'api_errors': 0}
+        assert set(statistics) == set(video_ids)
+        metadata = standin_video_metadata(video_ids[0])
+        assert statistics[video_ids[0]] == {'views': metadata['view_count'], 'likes': metadata['view_count'] // 20,
+                                            'comments': metadata['comment_count']}
+
+    _with_stand_in(check)
+
+
+def test_spent_budget_skips_batches():
+    def check(server, enricher, quota):
+        statistics = enricher.fetch([standin_video_id(1, i) for i in range(VIDEOS)])
+        # Only two of the three batches fit in the budget
+        assert server.api_calls == 2
+        assert quota.remaining() == 0
+        assert len(statistics) == 100
+
+    _with_stand_in(check, daily_budget=2)
+
+
+def test_quota_exceeded_pauses_enrichment():
+    def check(server, enricher, quota):
+        server.quota_exceeded = True
+        before = _counters()
+        videos = [{'video_id': standin_video_id(1, i), 'views': 7, 'comments': 1} for i in range(10)]
+        enricher.enrich(videos)
+        assert server.api_calls == 1
+        assert _counters()['api_errors'] == before['api_errors'] + 1
+        assert quota.remaining() == 0
+        # Listing values are kept and the API is not asked again today
+        assert {(video['views'], video['comments'], video['likes']) for video in videos} == {(7, 1, None)}
+        server.quota_exceeded = False
+        assert enricher.fetch([standin_video_id(1, 0)]) == {}
+        assert server.api_calls == 1
+
+    _with_stand_in(check)
+
+
+if __name__ == "__main__":
+    for test in (test_ids_are_fetched_50_per_call, test_spent_budget_skips_batches,
+                 test_quota_exceeded_pauses_enrichment):
+        test()
+        print(f"ok  {test.__name__}")
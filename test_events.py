@@ -0,0 +1,50 @@
+"""
+The progress bus coalesces variable updates but runs every queued call.
+
+Run with pytest, or directly: python test_events.py
+"""
+from events import CALL_BACKLOG_WARNING, ProgressBus
+
+
+class _Var:
+    """Minimal stand-in for a tkinter variable."""
+
+    def __init__(self, name):
+        self.name = name
+        self.values = []
+
+    def set(self, value):
+        self.values.append(value)
+
+    def get(self):
+        return self.values[-1] if self.values else None
+
+    def __str__(self):
+        return self.name
+
+
+def test_variable_updates_are_coalesced():
+    bus = ProgressBus(root=None)
+    progress = _Var("progress")
+    proxy = bus.var(progress)
+    for value in range(100):
+        proxy.set(value)
+    bus.flush()
+    assert progress.values == [99]
+
+
+def test_queued_calls_are_never_dropped():
+    bus = ProgressBus(root=None)
+    ran = []
+    calls = 3 * CALL_BACKLOG_WARNING
+    for i in range(calls):
+        bus.call(ran.append, i)
+    bus.flush()
+    assert ran == list(range(calls))
+
+
+if __name__ == "__main__":
+    test_variable_updates_are_coalesced()
+    print("ok  test_variable_updates_are_coalesced")
+    test_queued_calls_are_never_dropped()
+    print("ok  test_queued_calls_are_never_dropped")
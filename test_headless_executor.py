@@ -0,0 +1,35 @@
+"""
+The headless channel pool must build on every supported Python version.
+
+Run with pytest, or directly: python test_headless_executor.py
+"""
+import os
+import sys
+import concurrent.futures
+import headless
+
+
+class _Python310Executor(concurrent.futures.ProcessPoolExecutor):
+    """ProcessPoolExecutor with the constructor signature of Python 3.10."""
+
+    def __init__(self, max_workers=None, mp_context=None, initializer=None, initargs=()):
+        super().__init__(max_workers=max_workers, mp_context=mp_context, initializer=initializer,
+                         initargs=initargs)
+
+
+def test_channel_executor_runs_a_task():
+    with headless._channel_executor(2) as executor:
+        assert executor.submit(os.getpid).result(timeout=60) != os.getpid()
+
+
+def test_channel_executor_on_python_310(monkeypatch):
+    monkeypatch.setattr(sys, "version_info", (3, 10, 13, "final", 0))
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", _Python310Executor)
+    with headless._channel_executor(1) as executor:
+        assert isinstance(executor, _Python310Executor)
+        assert executor.submit(os.getpid).result(timeout=60) != os.getpid()
+
+
+if __name__ == "__main__":
+    test_channel_executor_runs_a_task()
+    print("ok  test_channel_executor_runs_a_task")
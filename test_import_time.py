@@ -0,0 +1,107 @@
+"""
+Import-time budget for the GUI and headless entry points.
+
+Starting the application should only load what the window (or the headless
+runner) needs; yt-dlp, pandas, NumPy, the Google API client and friends are
+loaded by the subsystem that uses them, on first use. This check runs
+``python -X importtime`` in a fresh interpreter and fails if a heavy module
+is imported at startup or the import time exceeds its budget.
+
+Run with pytest, or directly: python test_import_time.py
+Set IMPORT_TIME_BUDGET_SCALE (e.g. 2) on slow machines.
+"""
+import os
+import re
+import sys
+import subprocess
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative import time allowed per entry module, in milliseconds
+BUDGETS_MS = {
+    'gui': 100,
+    'headless': 100,
+    'main': 50,
+}
+
+# Loaded on first use by the subsystem that needs them, never at startup
+LAZY_MODULES = ['yt_dlp', 'pandas', 'numpy', 'googleapiclient', 'dotenv', 'keyring', 'http.server']
+# The GUI only needs asyncio once a run starts
+LAZY_GUI_MODULES = ['asyncio']
+
+RUNS = 3
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_profile(module):
+    """
+    Import a module in a fresh interpreter under ``-X importtime``.
+
+    Returns:
+        tuple: (cumulative import time of the module in ms, set of all modules imported)
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=REPO_DIR, capture_output=True, text=True, check=True)
+    cumulative_ms, imported = None, set()
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module and not match.group(3):
+            cumulative_ms = int(match.group(2)) / 1000
+    return cumulative_ms, imported
+
+
+def best_profile(module):
+    """Return the fastest of RUNS import profiles (the first run may also compile .pyc files)."""
+    profiles = [import_profile(module) for _ in range(RUNS)]
+    return min(profiles, key=lambda profile: profile[0])
+
+
+def _check_entry_point(module, lazy_modules):
+    cumulative_ms, imported = best_profile(module)
+    loaded = [name for name in lazy_modules if name in imported]
+    assert not loaded, f"importing {module} loads {', '.join(loaded)} at startup"
+    budget = BUDGETS_MS[module] * float(os.environ.get("IMPORT_TIME_BUDGET_SCALE", "1"))
+    assert cumulative_ms <= budget, f"importing {module} took {cumulative_ms:.1f} ms (budget {budget:.0f} ms)"
+    return cumulative_ms
+
+
+def test_gui_import_time():
+    _check_entry_point('gui', LAZY_MODULES + LAZY_GUI_MODULES)
+
+
+def test_headless_import_time():
+    _check_entry_point('headless', LAZY_MODULES)
+
+
+def test_main_import_time():
+    _check_entry_point('main', LAZY_MODULES + LAZY_GUI_MODULES)
+
+
+def test_import_has_no_side_effects():
+    # Importing must not configure logging, create log files or read .env
+    code = (
+        "import sys, os, logging\n"
+        f"sys.path.insert(0, {REPO_DIR!r})\n"
+        "import downloader, viral_analyzer, config, gui, headless\n"
+        "assert not logging.getLogger().handlers, logging.getLogger().handlers\n"
+        "assert not os.path.exists('downloader.log')\n"
+        "assert 'dotenv' not in sys.modules\n"
+    )
+    with tempfile.TemporaryDirectory() as work_dir:
+        subprocess.run([sys.executable, "-c", code], cwd=work_dir, check=True)
+
+
+if __name__ == "__main__":
+    failed = False
+    for module, lazy in (('gui', LAZY_MODULES + LAZY_GUI_MODULES), ('headless', LAZY_MODULES),
+                         ('main', LAZY_MODULES + LAZY_GUI_MODULES)):
+        try:
+            print(f"{module:10} {_check_entry_point(module, lazy):7.1f} ms (budget {BUDGETS_MS[module]} ms)")
+        except AssertionError as e:
+            print(f"FAILED: {e}")
+            failed = True
+    sys.exit(1 if failed else 0)
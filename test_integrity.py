@@ -0,0 +1,149 @@
+"""
+Downloads that arrive shorter than their format's announced size are caught.
+
+The stand-in serves a video cut in half (with matching Content-Length, so
+yt-dlp itself sees a complete transfer) while its format announces the full
+size. The integrity check must discard that copy and download it again.
+
+Run with pytest, or directly: python test_integrity.py
+"""
+import os
+import tempfile
+from standin import start_stand_in_server, server_base_url, make_standin_extractor, standin_video_id
+from ydl_pool import get_pool
+from metrics import get_metrics
+from integrity import get_integrity_manifest
+
+VIDEO_SIZE = 64 * 1024
+
+_server = None
+
+
+def _stand_in():
+    global _server
+    if _server is None:
+        _server = start_stand_in_server(video_size=VIDEO_SIZE, latency=0, bandwidth=0)
+        get_pool().register_extractor(make_standin_extractor(server_base_url(_server)))
+    return _server
+
+
+def test_truncated_download_is_discarded_and_downloaded_again():
+    from downloader import DOWNLOAD_CORRUPT, _download_video, download_single_video
+
+    server = _stand_in()
+    video_id = standin_video_id(1, 1)
+    link = f"https://www.youtube.com/shorts/{video_id}"
+    with tempfile.TemporaryDirectory() as output_path:
+        failures = get_metrics().snapshot()['counters'].get('integrity_failures', 0)
+        server.truncated.add(video_id)
+        assert _download_video(link, output_path) == (DOWNLOAD_CORRUPT, None)
+        assert get_metrics().snapshot()['counters']['integrity_failures'] == failures + 1
+        assert not [name for name in os.listdir(output_path) if name.endswith(".mp4")]
+
+        server.truncated.add(video_id)
+        ok, filepath = download_single_video(link, output_path)
+        assert ok and os.path.getsize(filepath) == VIDEO_SIZE
+        assert get_integrity_manifest(output_path).check(filepath) is True
+
+
+def test_corrupt_download_has_its_own_retry_limit():
+    import downloader
+
+    attempts = []
+
+    def corrupt(link, output_path, extra_opts=None, pacer=None):
+        attempts.append(link)
+        return downloader.DOWNLOAD_CORRUPT, None
+
+    download_video = downloader._download_video
+    downloader._download_video = corrupt
+    try:
+        assert downloader.download_single_video("https://www.youtube.com/shorts/x", ".") == (False, None)
+        assert len(attempts) == 1 + downloader.MAX_CORRUPT_RETRIES
+    finally:
+        downloader._download_video = download_video
+
+
+class _Pacer:
+    def wait(self, label_callback=None):
+        pass
+
+
+def test_pool_counts_throttle_and_corrupt_retries_separately():
+    import time
+    import downloader
+
+    outcomes = {
+        # Throttled first: still gets its corrupt retry
+        'https://www.youtube.com/shorts/a': [downloader.DOWNLOAD_THROTTLED, downloader.DOWNLOAD_CORRUPT,
+                                             downloader.DOWNLOAD_OK],
+        # Corrupt first: its first throttle retry is not delayed as a second attempt
+        'https://www.youtube.com/shorts/b': [downloader.DOWNLOAD_CORRUPT, downloader.DOWNLOAD_THROTTLED,
+                                             downloader.DOWNLOAD_OK],
+    }
+    calls = {link: [] for link in outcomes}
+
+    def scripted(link, output_path, extra_opts=None, pacer=None, journal=None, dedup=None):
+        calls[link].append(time.monotonic())
+        status = outcomes[link].pop(0)
+        return status, (link if status == downloader.DOWNLOAD_OK else None)
+
+    download_video, corrupt_delay = downloader._download_video, downloader.CORRUPT_RETRY_DELAY
+    downloader._download_video, downloader.CORRUPT_RETRY_DELAY = scripted, 0
+    stored = []
+    try:
+        with tempfile.TemporaryDirectory() as output_path:
+            downloader.download_videos_from_links(list(outcomes), output_path, _Labels(), _Labels(),
+                                                  progress_callback=stored.append, pacer=_Pacer(),
+                                                  max_retries=1, retry_delay=0.5)
+    finally:
+        downloader._download_video, downloader.CORRUPT_RETRY_DELAY = download_video, corrupt_delay
+    assert sorted(stored) == sorted(outcomes)
+    assert [len(times) for times in calls.values()] == [3, 3]
+    corrupt_then_throttled = calls['https://www.youtube.com/shorts/b']
+    assert corrupt_then_throttled[2] - corrupt_then_throttled[1] < 0.9
+
+
+class _Labels:
+    def __init__(self):
+        self.values = []
+
+    def set(self, value):
+        self.values.append(value)
+
+
+def test_viral_download_retries_truncated_video_after_the_pass():
+    from journal import get_journal
+    from viral_analyzer import ViralAnalyzer
+
+    server = _stand_in()
+    videos = [{'video_id': standin_video_id(2, i), 'title': f"Stand-in short {standin_video_id(2, i)}"}
+              for i in range(3)]
+    with tempfile.TemporaryDirectory() as output_path:
+        journal = get_journal(output_path)
+        labels, progress = _Labels(), _Labels()
+        analyzer = ViralAnalyzer(progress_var=progress, progress_label_var=labels, use_cache=False, enricher=False,
+                                 use_history=False, download_delay=(0, 0), journal=journal)
+        server.truncated.add(videos[0]['video_id'])
+        paths = analyzer.download_viral_videos(videos, output_path, limit=3, channel_url="@bench2")
+
+        assert len(paths) == 3 and all(os.path.getsize(path) == VIDEO_SIZE for path in paths)
+        # The first pass counts to its own total; the truncated video is retried after it
+        assert [label for label in labels.values if label.startswith("Downloading ")] == [
+            f"Downloading {len(videos)} viral videos...",
+            *[f"Downloading {i}/3: {video['title']}" for i, video in enumerate(videos, 1)],
+            f"Downloading 1/1 (retry): {videos[0]['title']}",
+        ]
+        assert progress.values == [0, 33, 66, 100]
+        for video, path in zip(videos, [paths[2], paths[0], paths[1]]):
+            task = journal.get('video', video['video_id'])
+            assert task['state'] == 'done' and task['data']['path'] == path
+
+
+if __name__ == "__main__":
+    for test in (test_truncated_download_is_discarded_and_downloaded_again,
+                 test_corrupt_download_has_its_own_retry_limit,
+                 test_pool_counts_throttle_and_corrupt_retries_separately,
+                 test_viral_download_retries_truncated_video_after_the_pass):
+        test()
+        print(f"ok  {test.__name__}")
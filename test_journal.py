@@ -0,0 +1,89 @@
+"""
+The job journal recovers interrupted tasks, resumes or restarts runs, and
+removes the partial download of a failed video.
+
+Run with pytest, or directly: python test_journal.py
+"""
+import os
+import tempfile
+from journal import JobJournal, PENDING, IN_FLIGHT, DONE, FAILED
+
+CHANNELS = ["https://www.youtube.com/@a", "https://www.youtube.com/@b", "https://www.youtube.com/@c"]
+
+
+def _touch(path):
+    with open(path, "wb") as f:
+        f.write(b"partial")
+
+
+def test_in_flight_tasks_are_pending_after_a_crash():
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "journal.sqlite")
+        journal = JobJournal(path)
+        journal.begin_run(CHANNELS)
+        journal.start('channel', CHANNELS[0])
+        journal.start('video', "aaaaaaaaaaa", parent=CHANNELS[0])
+        journal.start('video', "bbbbbbbbbbb", parent=CHANNELS[0])
+        journal.finish('video', "bbbbbbbbbbb")
+        # The process dies here; the next one reopens the journal
+        journal.close()
+
+        journal = JobJournal(path)
+        assert journal.recovered == 2
+        assert journal.get('channel', CHANNELS[0])['state'] == PENDING
+        video = journal.get('video', "aaaaaaaaaaa")
+        assert video['state'] == PENDING and video['attempts'] == 1
+        assert journal.get('video', "bbbbbbbbbbb")['state'] == DONE
+        assert not journal.tasks('video', state=IN_FLIGHT)
+        journal.close()
+
+
+def test_begin_run_resumes_drops_and_clears():
+    with tempfile.TemporaryDirectory() as folder:
+        journal = JobJournal(os.path.join(folder, "journal.sqlite"))
+        assert journal.begin_run(CHANNELS) == CHANNELS
+        journal.finish('channel', CHANNELS[0])
+        journal.start('video', "aaaaaaaaaaa", parent=CHANNELS[1])
+        journal.start('video', "bbbbbbbbbbb", parent=CHANNELS[2])
+
+        # Unfinished run: done channels are skipped, channels no longer listed are dropped with their videos
+        new_channel = "https://www.youtube.com/@d"
+        assert journal.begin_run(CHANNELS[:2] + [new_channel]) == [CHANNELS[1], new_channel]
+        assert journal.get('channel', CHANNELS[2]) is None
+        assert journal.get('video', "bbbbbbbbbbb") is None
+        assert journal.get('video', "aaaaaaaaaaa")['state'] == IN_FLIGHT
+
+        # Finished run: the next run starts from scratch and removes leftover partial files
+        partial = os.path.join(folder, "leftover.mp4")
+        _touch(partial + ".part")
+        journal.update('video', "aaaaaaaaaaa", {'path': partial})
+        journal.fail('channel', CHANNELS[1])
+        journal.finish('channel', new_channel)
+        journal.add('video', "ccccccccccc", parent=new_channel, data={'path': partial})
+        assert journal.begin_run(CHANNELS) == CHANNELS
+        assert journal.tasks('video') == []
+        assert not os.path.exists(partial + ".part")
+        assert {task['key']: task['state'] for task in journal.tasks('channel')} == dict.fromkeys(CHANNELS, PENDING)
+        journal.close()
+
+
+def test_fail_removes_the_partial_download():
+    with tempfile.TemporaryDirectory() as folder:
+        journal = JobJournal(os.path.join(folder, "journal.sqlite"))
+        target = os.path.join(folder, "video.mp4")
+        _touch(target + ".part")
+        _touch(target + ".ytdl")
+        journal.start('video', "aaaaaaaaaaa", data={'path': target})
+        journal.fail('video', "aaaaaaaaaaa", error="HTTP Error 403")
+
+        task = journal.get('video', "aaaaaaaaaaa")
+        assert task['state'] == FAILED and task['error'] == "HTTP Error 403"
+        assert not os.path.exists(target + ".part") and not os.path.exists(target + ".ytdl")
+        journal.close()
+
+
+if __name__ == "__main__":
+    for test in (test_in_flight_tasks_are_pending_after_a_crash, test_begin_run_resumes_drops_and_clears,
+                 test_fail_removes_the_partial_download):
+        test()
+        print(f"ok  {test.__name__}")
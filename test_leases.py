@@ -0,0 +1,217 @@
+"""
+Channel leases shared by several processes, standing in for nodes on shared storage.
+
+Each "node" is a separate process with its own LeaseManager on a common
+folder, as machines mounting the same NFS share would be.
+
+Run with pytest, or directly: python test_leases.py
+"""
+import os
+import time
+import tempfile
+import threading
+import multiprocessing
+from collections import Counter
+from leases import LeaseManager
+
+NODES = 4
+CHANNELS = 60
+
+
+def _work_through(root, node_id, keys, log_path):
+    """Node process: claim, 'process' and finish every channel it can get."""
+    leases = LeaseManager(root, node_id, ttl=5)
+    for key in keys:
+        lease = leases.claim(key, done_ttl=3600)
+        if lease is None:
+            continue
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(f"{key} {node_id}\n")
+        time.sleep(0.01)
+        leases.release(lease, done=True)
+    leases.close()
+
+
+def _claim_and_die(root, key, claimed):
+    """Node process that claims a channel and stops without renewing or releasing it."""
+    leases = LeaseManager(root, "crashed", ttl=1, heartbeat=0)
+    assert leases.claim(key)
+    claimed.set()
+    os._exit(0)
+
+
+def _claim_and_exit(root, key, node_id, claimed):
+    """Process of a node that claims a channel with a long ttl and exits without releasing it."""
+    leases = LeaseManager(root, node_id, ttl=600, heartbeat=0)
+    assert leases.claim(key)
+    claimed.set()
+    os._exit(0)
+
+
+def _claim_and_hold(root, key, claimed, stop):
+    """Node process that holds a channel, renewing its lease, until told to stop."""
+    leases = LeaseManager(root, "holder", ttl=1, heartbeat=0.2)
+    lease = leases.claim(key)
+    assert lease
+    claimed.set()
+    stop.wait(10)
+    leases.release(lease, done=True)
+    leases.close()
+
+
+def _spawn(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def test_each_channel_processed_once_across_nodes():
+    with tempfile.TemporaryDirectory() as root:
+        log_path = os.path.join(root, "processed.log")
+        keys = [f"UCchannel{i:04d}" for i in range(CHANNELS)]
+        nodes = [_spawn(_work_through, root, f"node{n}", keys, log_path) for n in range(NODES)]
+        for node in nodes:
+            node.join(60)
+            assert node.exitcode == 0
+        with open(log_path, "r", encoding="utf-8") as f:
+            processed = [line.split() for line in f]
+        per_key = Counter(key for key, _ in processed)
+        assert sorted(per_key) == keys
+        assert set(per_key.values()) == {1}, [key for key, count in per_key.items() if count > 1]
+        # The work is shared, not done by whichever node started first
+        assert len({node for _, node in processed}) > 1
+
+
+def test_expired_lease_is_taken_over():
+    with tempfile.TemporaryDirectory() as root:
+        context = multiprocessing.get_context("spawn")
+        claimed = context.Event()
+        crashed = context.Process(target=_claim_and_die, args=(root, "UCchannel", claimed))
+        crashed.start()
+        assert claimed.wait(30)
+        crashed.join(30)
+
+        leases = LeaseManager(root, "survivor", ttl=5)
+        assert leases.claim("UCchannel") is None
+        assert leases.owner("UCchannel") == "crashed"
+        time.sleep(1.2)
+        lease = leases.claim("UCchannel")
+        assert lease is not None
+        assert leases.owner("UCchannel") == "survivor"
+        leases.release(lease, done=True)
+        # Finished channels are skipped by other nodes for done_ttl, then free again
+        other = LeaseManager(root, "other", ttl=5)
+        assert other.claim("UCchannel", done_ttl=3600) is None
+        assert other.claim("UCchannel") is not None
+        other.close()
+        leases.close()
+
+
+def test_heartbeat_keeps_lease_alive():
+    with tempfile.TemporaryDirectory() as root:
+        context = multiprocessing.get_context("spawn")
+        claimed, stop = context.Event(), context.Event()
+        holder = context.Process(target=_claim_and_hold, args=(root, "UCchannel", claimed, stop))
+        holder.start()
+        try:
+            assert claimed.wait(30)
+            leases = LeaseManager(root, "other", ttl=5)
+            # Well past the 1 s ttl, the renewed lease is still held
+            time.sleep(2)
+            assert leases.claim("UCchannel") is None
+        finally:
+            stop.set()
+            holder.join(30)
+        assert holder.exitcode == 0
+        assert leases.claim("UCchannel", done_ttl=3600) is None
+        leases.close()
+
+
+def test_node_reclaims_leases_of_its_crashed_process():
+    with tempfile.TemporaryDirectory() as root:
+        context = multiprocessing.get_context("spawn")
+        claimed = context.Event()
+        crashed = context.Process(target=_claim_and_exit, args=(root, "UCchannel", "node1", claimed))
+        crashed.start()
+        assert claimed.wait(30)
+        crashed.join(30)
+
+        # Other nodes wait for the ttl, the restarted node takes its channel back at once
+        assert LeaseManager(root, "node2", ttl=600).claim("UCchannel") is None
+        leases = LeaseManager(root, "node1", ttl=600)
+        lease = leases.claim("UCchannel")
+        assert lease is not None
+        # A lease held by this process is not reclaimed
+        assert LeaseManager(root, "node1", ttl=600).claim("UCchannel") is None
+        leases.release(lease)
+        leases.close()
+
+
+def test_renewal_racing_claims_keeps_the_lease():
+    with tempfile.TemporaryDirectory() as root:
+        holder = LeaseManager(root, "holder", ttl=600, heartbeat=0)
+        lease = holder.claim("UCchannel")
+        other = LeaseManager(root, "other", ttl=600, heartbeat=0)
+        read = holder._read
+
+        def slow_read(path):
+            # Widen the renewal's window, so the claims below land inside it
+            time.sleep(0.05)
+            return read(path)
+
+        holder._read = slow_read
+        stop = threading.Event()
+        renewals = []
+
+        def renew_continuously():
+            while not stop.is_set():
+                renewals.append(holder.renew(lease))
+
+        renewer = threading.Thread(target=renew_continuously)
+        renewer.start()
+        try:
+            claims = []
+            deadline = time.monotonic() + 1
+            while time.monotonic() < deadline:
+                claims.append(other.claim("UCchannel"))
+        finally:
+            stop.set()
+            renewer.join()
+        assert claims == [None] * len(claims)
+        assert renewals and all(renewals)
+        assert not lease.lost
+        assert other.owner("UCchannel") == "holder"
+        holder.close()
+        other.close()
+
+
+def test_renewal_does_not_overwrite_a_lease_taken_over():
+    with tempfile.TemporaryDirectory() as root:
+        slow = LeaseManager(root, "slow", ttl=1, heartbeat=0)
+        lease = slow.claim("UCchannel")
+        expires_at = lease.expires_at
+        time.sleep(0.01)
+        assert slow.renew(lease)
+        assert lease.expires_at > expires_at
+        lost = threading.Event()
+        lease.watch(lost)
+
+        # This node stopped renewing in time and another one took the lease over
+        time.sleep(1.2)
+        other = LeaseManager(root, "other", ttl=600, heartbeat=0)
+        assert other.claim("UCchannel") is not None
+        assert not slow.renew(lease)
+        assert lease.lost and lost.is_set()
+        assert other.owner("UCchannel") == "other"
+        assert slow.held() == []
+        assert os.listdir(os.path.dirname(lease.path)) == [os.path.basename(lease.path)]
+        other.close()
+        slow.close()
+
+
+if __name__ == "__main__":
+    for test in (test_each_channel_processed_once_across_nodes, test_expired_lease_is_taken_over,
+                 test_heartbeat_keeps_lease_alive, test_node_reclaims_leases_of_its_crashed_process,
+                 test_renewal_racing_claims_keeps_the_lease, test_renewal_does_not_overwrite_a_lease_taken_over):
+        test()
+        print(f"ok  {test.__name__}")
@@ -0,0 +1,36 @@
+"""
+Metadata cache hits, stale hits and misses reach the metrics registry.
+
+Run with pytest, or directly: python test_metadata_cache.py
+"""
+import os
+import time
+import tempfile
+from metadata_cache import MetadataCache
+from metrics import get_metrics
+
+VIDEOS = [{'id': 'aaaaaaaaaaa', 'title': 'Short', 'view_count': 10}]
+
+
+def _counters():
+    counters = get_metrics().snapshot()['counters']
+    return {name: counters.get(f'metadata_cache_{name}', 0) for name in ('hits', 'stale_hits', 'misses')}
+
+
+def test_cache_counters_are_exported():
+    with tempfile.TemporaryDirectory() as folder:
+        cache = MetadataCache(os.path.join(folder, "cache.sqlite"), fresh_ttl=0.2, max_age=60)
+        before = _counters()
+        assert cache.get("@channel") is None
+        cache.store("@channel", VIDEOS)
+        assert cache.get("@channel") == VIDEOS
+        time.sleep(0.3)
+        assert cache.get("@channel") == VIDEOS
+        after = _counters()
+        assert {name: after[name] - before[name] for name in after} == {'hits': 1, 'stale_hits': 1, 'misses': 1}
+        assert {key: cache.stats()[key] for key in after} == {'hits': 1, 'stale_hits': 1, 'misses': 1}
+
+
+if __name__ == "__main__":
+    test_cache_counters_are_exported()
+    print("ok  test_cache_counters_are_exported")
@@ -0,0 +1,82 @@
+"""
+The adaptive pacer raises and lowers its rate within bounds, and throttled
+downloads wait in the retry queue with a doubling delay.
+
+Run with pytest, or directly: python test_pacing.py
+"""
+import time
+import tempfile
+import downloader
+from pacing import AdaptiveRequestPacer, no_pacing
+
+
+def test_rate_increases_additively_up_to_max():
+    pacer = AdaptiveRequestPacer(initial_rate=0.1, min_rate=0.01, max_rate=0.3, increase=0.05)
+    pacer.on_success()
+    pacer.on_success()
+    assert abs(pacer.current_rate - 0.2) < 1e-9
+    for _ in range(10):
+        pacer.on_success()
+    assert pacer.current_rate == 0.3
+    assert pacer.stats()['successes'] == 12
+
+
+def test_rate_decreases_multiplicatively_down_to_min():
+    pacer = AdaptiveRequestPacer(initial_rate=0.4, min_rate=0.05, max_rate=0.5, decrease=0.5, jitter=0)
+    pacer.on_throttle("429")
+    assert pacer.current_rate == 0.2
+    for _ in range(10):
+        pacer.on_throttle()
+    assert pacer.current_rate == 0.05
+    assert pacer.stats() == {'rate_per_min': 3.0, 'successes': 0, 'throttles': 11}
+    # Requests already queued are pushed out to the new spacing
+    assert pacer.reserve() > 19
+
+
+def test_initial_rate_is_clamped():
+    assert AdaptiveRequestPacer(initial_rate=5, max_rate=0.5).current_rate == 0.5
+    assert AdaptiveRequestPacer(initial_rate=0, min_rate=0.01).current_rate == 0.01
+
+
+class _Labels:
+    def set(self, value):
+        pass
+
+
+def test_throttled_downloads_are_retried_with_doubling_delay():
+    recovers, gives_up = 'https://www.youtube.com/shorts/a', 'https://www.youtube.com/shorts/b'
+    outcomes = {
+        recovers: [downloader.DOWNLOAD_THROTTLED, downloader.DOWNLOAD_THROTTLED, downloader.DOWNLOAD_OK],
+        gives_up: [downloader.DOWNLOAD_THROTTLED] * 3,
+    }
+    calls = {link: [] for link in outcomes}
+
+    def scripted(link, output_path, extra_opts=None, pacer=None, journal=None, dedup=None):
+        calls[link].append(time.monotonic())
+        status = outcomes[link].pop(0)
+        return status, (link if status == downloader.DOWNLOAD_OK else None)
+
+    download_video = downloader._download_video
+    downloader._download_video = scripted
+    stored = []
+    try:
+        with tempfile.TemporaryDirectory() as output_path:
+            downloader.download_videos_from_links(list(outcomes), output_path, _Labels(), _Labels(),
+                                                  progress_callback=stored.append, pacer=no_pacing(),
+                                                  max_retries=2, retry_delay=0.2)
+    finally:
+        downloader._download_video = download_video
+    assert stored == [recovers]
+    # Two retries each; the video still throttled after them is given up
+    assert [len(times) for times in calls.values()] == [3, 3]
+    assert not any(outcomes.values())
+    times = calls[recovers]
+    assert 0.2 <= times[1] - times[0] < 0.35
+    assert 0.4 <= times[2] - times[1] < 0.55
+
+
+if __name__ == "__main__":
+    for test in (test_rate_increases_additively_up_to_max, test_rate_decreases_multiplicatively_down_to_min,
+                 test_initial_rate_is_clamped, test_throttled_downloads_are_retried_with_doubling_delay):
+        test()
+        print(f"ok  {test.__name__}")
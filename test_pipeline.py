@@ -0,0 +1,133 @@
+"""
+Cancelling the channel pipeline, or losing a channel's lease, stops the running channel between videos.
+
+A stand-in channel is downloaded with the analyzer's default 11-21 s pause
+between videos. cancel() after the first download must end the run during
+that pause, leave the channel unrecorded and its remaining videos pending
+in the journal. A lease taken over by another node after the first
+download must likewise stop the channel, which is recorded as failed.
+
+Run with pytest, or directly: python test_pipeline.py
+"""
+import os
+import time
+import tempfile
+import threading
+import multiprocessing
+
+
+def _cancel_after_first_download(work_dir, results):
+    """Child process: run the pipeline on one stand-in channel and cancel it after one video."""
+    import asyncio
+    os.chdir(work_dir)
+    from standin import start_stand_in_server, server_base_url, make_standin_extractor
+    from ydl_pool import get_pool
+    from journal import get_journal
+    from pipeline import ChannelPipeline
+
+    server = start_stand_in_server(video_size=16 * 1024, latency=0, bandwidth=0, channel_size=10)
+    os.environ['YOUTUBE_API_ENDPOINT'] = server_base_url(server)
+    get_pool().register_extractor(make_standin_extractor(server_base_url(server)))
+    journal = get_journal("out")
+    downloaded = []
+
+    def on_downloaded(path):
+        downloaded.append(path)
+        threading.Thread(target=pipeline.cancel).start()
+
+    pipeline = ChannelPipeline(["https://www.youtube.com/@bench1"], "out", on_downloaded=on_downloaded,
+                               max_analyze=5, max_download=3, channel_pause=None, journal=journal)
+    start = time.monotonic()
+    outcome = asyncio.run(pipeline.run())
+    elapsed = time.monotonic() - start
+    videos = [task['state'] for task in journal.tasks('video')]
+    server.shutdown()
+    results.put((len(downloaded), elapsed, outcome, videos))
+
+
+def _lose_lease_after_first_download(work_dir, results):
+    """Child process: run the pipeline with a lease that another node takes over after one video."""
+    import asyncio
+    os.chdir(work_dir)
+    from standin import start_stand_in_server, server_base_url, make_standin_extractor
+    from ydl_pool import get_pool
+    from leases import LeaseManager
+    from pipeline import ChannelPipeline
+
+    server = start_stand_in_server(video_size=16 * 1024, latency=0, bandwidth=0, channel_size=10)
+    os.environ['YOUTUBE_API_ENDPOINT'] = server_base_url(server)
+    get_pool().register_extractor(make_standin_extractor(server_base_url(server)))
+    leases = LeaseManager("out", "node1", ttl=1, heartbeat=0)
+    downloaded = []
+
+    def take_over():
+        (lease,) = leases._held.values()
+        # The lease expires unrenewed, another node claims it and the next renewal notices
+        time.sleep(1.1)
+        assert LeaseManager("out", "node2", ttl=600, heartbeat=0).claim(lease.key) is not None
+        assert not leases.renew(lease)
+
+    def on_downloaded(path):
+        downloaded.append(path)
+        threading.Thread(target=take_over).start()
+
+    pipeline = ChannelPipeline(["https://www.youtube.com/@bench1"], "out", on_downloaded=on_downloaded,
+                               max_analyze=5, max_download=3, channel_pause=None, leases=leases)
+    start = time.monotonic()
+    outcome = asyncio.run(pipeline.run())
+    elapsed = time.monotonic() - start
+    server.shutdown()
+    results.put((len(downloaded), elapsed, outcome))
+
+
+def _run_in_child(target):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as work_dir:
+        process = context.Process(target=target, args=(work_dir, results))
+        process.start()
+        result = results.get(timeout=300)
+        process.join(60)
+    return result
+
+
+def test_cancel_stops_downloads_between_videos():
+    downloaded, elapsed, outcome, videos = _run_in_child(_cancel_after_first_download)
+    assert downloaded == 1
+    # The first rate limiting pause alone lasts at least 11 s
+    assert elapsed < 11, f"cancelled run took {elapsed:.1f} s"
+    assert outcome == {}
+    assert sorted(videos) == ['done', 'pending', 'pending']
+
+
+def test_lost_lease_stops_the_channel():
+    downloaded, elapsed, outcome = _run_in_child(_lose_lease_after_first_download)
+    assert downloaded == 1
+    assert elapsed < 11, f"run with a lost lease took {elapsed:.1f} s"
+    (result,) = outcome.values()
+    assert result['status'] == 'failed' and result['error'] == "Lease lost to another node"
+
+
+def test_high_water_mark_moves_for_analyzed_channels_only():
+    import downloader
+    from pipeline import ChannelPipeline
+
+    marked = []
+    mark_short_links_seen = downloader.mark_short_links_seen
+    downloader.mark_short_links_seen = lambda channel_url, links: marked.append(channel_url)
+    try:
+        pipeline = ChannelPipeline([], "out")
+        for channel_url, status, analyzed in (("ok", 'ok', False), ("no-viral", 'skipped', True),
+                                              ("leased", 'skipped', False), ("failed", 'failed', False)):
+            pipeline._new_links[channel_url] = ["https://www.youtube.com/shorts/aaaaaaaaaaa"]
+            pipeline._record(channel_url, status, analyzed=analyzed)
+    finally:
+        downloader.mark_short_links_seen = mark_short_links_seen
+    assert marked == ["ok", "no-viral"]
+
+
+if __name__ == "__main__":
+    for test in (test_cancel_stops_downloads_between_videos, test_lost_lease_stops_the_channel,
+                 test_high_water_mark_moves_for_analyzed_channels_only):
+        test()
+        print(f"ok  {test.__name__}")
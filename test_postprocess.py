@@ -0,0 +1,50 @@
+"""
+The post-download stage holds a bounded number of files and drops (and counts) the rest.
+
+Run with pytest, or directly: python test_postprocess.py
+"""
+import os
+import time
+import tempfile
+from postprocess import PostProcessor
+from metrics import get_metrics
+
+FILES = 12
+
+
+def slow_step(path, record):
+    """Step that keeps the single worker busy, so submitted files pile up."""
+    time.sleep(0.2)
+    return {'slow': True}
+
+
+def test_full_stage_drops_and_counts_files():
+    with tempfile.TemporaryDirectory() as folder:
+        paths = []
+        for i in range(FILES):
+            paths.append(os.path.join(folder, f"video{i}.mp4"))
+            with open(paths[-1], "wb") as f:
+                f.write(b"data")
+        dropped_before = get_metrics().snapshot()['counters'].get('postprocess_dropped', 0)
+        stage = PostProcessor(steps=(slow_step,), max_workers=1, max_queue=1, max_overflow=2)
+        accepted = [stage.submit(path) for path in paths]
+        assert len(stage._overflow) <= 2
+        stage.close()
+
+        stats = stage.stats
+        assert stats['dropped'] > 0
+        assert stats['submitted'] + stats['dropped'] == FILES == len(accepted)
+        assert stats['processed'] == stats['submitted'] == accepted.count(True)
+        assert get_metrics().snapshot()['counters']['postprocess_dropped'] == dropped_before + stats['dropped']
+        with open(os.path.join(folder, "manifest.jsonl"), encoding="utf-8") as f:
+            assert sum(1 for _ in f) == stats['processed']
+
+        # Dropped files are not cataloged, so a later run processes them
+        rerun = PostProcessor(steps=(slow_step,), max_workers=1, max_queue=FILES)
+        assert [rerun.submit(path) for path in paths].count(True) == stats['dropped']
+        rerun.close()
+
+
+if __name__ == "__main__":
+    test_full_stage_drops_and_counts_files()
+    print("ok  test_full_stage_drops_and_counts_files")
@@ -0,0 +1,90 @@
+"""
+Peak memory of listing and ranking a very large channel.
+
+A stand-in channel of 50,000 shorts is streamed through the real listing
+and ranking paths (``iter_short_links`` and ``ViralAnalyzer.get_channel_videos``)
+in a fresh process, and the growth of its peak RSS (``ru_maxrss``) is
+compared with a budget that holding the channel in memory exceeds several
+times over. Building the whole list (``fetch_channel_metadata``) is measured
+as a reference.
+
+Run with pytest, or directly: python test_streaming_memory.py
+"""
+import os
+import sys
+import tempfile
+import multiprocessing
+
+CHANNEL_SIZE = 50_000
+# Peak RSS growth allowed while streaming the channel, in MiB
+STREAMING_BUDGET_MB = 10
+
+
+def _peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _measure(mode, work_dir, results):
+    """Child process: warm the code paths up on a small channel, then list a large one."""
+    os.chdir(work_dir)
+    from standin import start_stand_in_server, server_base_url, make_standin_extractor
+    from ydl_pool import get_pool
+    from engagement import EngagementStore
+    from downloader import iter_short_links
+    from viral_analyzer import ViralAnalyzer
+
+    server = start_stand_in_server(latency=0, bandwidth=0, channel_size=200)
+    get_pool().register_extractor(make_standin_extractor(server_base_url(server)))
+    analyzer = ViralAnalyzer(use_cache=False, enricher=False, history=EngagementStore("history.sqlite"))
+    # Imports, sessions and the history store are loaded before the baseline is taken
+    analyzer.get_channel_videos("https://www.youtube.com/@bench1", top_n=10)
+    sum(1 for _ in iter_short_links("https://www.youtube.com/@bench1"))
+    baseline = _peak_rss_mb()
+
+    server.channel_size = CHANNEL_SIZE
+    if mode == 'links':
+        count = sum(1 for _ in iter_short_links("https://www.youtube.com/@bench2"))
+    elif mode == 'ranking':
+        top = analyzer.get_channel_videos("https://www.youtube.com/@bench2", top_n=10)
+        count = len(top)
+    else:
+        count = len(analyzer.fetch_channel_metadata("https://www.youtube.com/@bench2"))
+    server.shutdown()
+    results.put((count, _peak_rss_mb() - baseline))
+
+
+def peak_growth(mode):
+    """Return (items returned, peak RSS growth in MiB) of a mode run in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory() as work_dir:
+        process = context.Process(target=_measure, args=(mode, work_dir, results))
+        process.start()
+        result = results.get(timeout=300)
+        process.join(60)
+    return result
+
+
+def test_streamed_listing_memory_is_constant():
+    count, growth = peak_growth('links')
+    assert count == CHANNEL_SIZE
+    assert growth < STREAMING_BUDGET_MB, f"peak RSS grew by {growth:.1f} MiB"
+
+
+def test_streamed_ranking_memory_is_constant():
+    count, growth = peak_growth('ranking')
+    assert count == 10
+    assert growth < STREAMING_BUDGET_MB, f"peak RSS grew by {growth:.1f} MiB"
+    # The whole channel in memory costs several times the budget
+    _, materialized = peak_growth('list')
+    assert materialized > 2 * STREAMING_BUDGET_MB, f"listing the whole channel only took {materialized:.1f} MiB"
+
+
+if __name__ == "__main__":
+    for mode in ('links', 'ranking', 'list'):
+        count, growth = peak_growth(mode)
+        print(f"{mode:8} {count:6} items, peak RSS +{growth:.1f} MiB")
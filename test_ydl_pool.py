@@ -0,0 +1,52 @@
+"""
+Pooled yt-dlp sessions outlive the threads that use them, in bounded numbers.
+
+Run with pytest, or directly: python test_ydl_pool.py
+"""
+import time
+import threading
+from ydl_pool import YoutubeDLPool
+
+OPTS = {'quiet': True, 'no_warnings': True}
+
+
+def _use(pool, profile, hold=None):
+    with pool.session(profile, OPTS) as ydl:
+        if hold:
+            hold.wait(30)
+        return ydl
+
+
+def test_short_lived_threads_reuse_sessions():
+    pool = YoutubeDLPool(max_idle=2)
+    for _ in range(20):
+        thread = threading.Thread(target=_use, args=(pool, 'listing'))
+        thread.start()
+        thread.join()
+    assert pool.stats() == {'created': 1, 'reused': 19, 'open': 1}
+    pool.close()
+
+
+def test_idle_sessions_are_capped():
+    pool = YoutubeDLPool(max_idle=2)
+    release = threading.Event()
+    seen = []
+    threads = [threading.Thread(target=lambda: seen.append(_use(pool, 'download', release))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while pool.stats()['created'] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+    # Concurrent sessions never share an instance; only max_idle of them stay open afterwards
+    assert len({id(ydl) for ydl in seen}) == 5
+    assert pool.stats()['open'] == 2
+    pool.close()
+    assert pool.stats()['open'] == 0
+
+
+if __name__ == "__main__":
+    for test in (test_short_lived_threads_reuse_sessions, test_idle_sessions_are_capped):
+        test()
+        print(f"ok  {test.__name__}")
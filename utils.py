@@ -1,8 +1,10 @@
 import re
+import logging
+from channel_resolver import get_resolver, parse_channel_url
 
 def extract_channel_name(channel_url):
     """
-    Extracts the channel name from a YouTube channel URL.
+    Extracts the channel name from a YouTube channel URL without any network access.
     
     Args:
         channel_url (str): The YouTube channel URL.
@@ -13,7 +15,76 @@ def extract_channel_name(channel_url):
     # - https://www.youtube.com/@ChannelName
     # - https://www.youtube.com/c/ChannelName
     # - https://www.youtube.com/channel/ChannelID
-    match = re.match(r"https?://(?:www\.)?youtube\.com/(?:@|c/|channel/)([a-zA-Z0-9_-]+)", channel_url)
+    # (see channel_resolver.parse_channel_url for all accepted forms)
+    parsed = parse_channel_url(channel_url)
+    if parsed:
+        return parsed[1]
+    return None
+
+def channel_folder_name(channel_url, network=True):
+    """
+    Returns the output folder name of a channel; every alias of a channel gets the same folder.
+    
+    Args:
+        channel_url (str): The YouTube channel URL.
+        network (bool): Resolve the channel on YouTube if it is not cached yet.
+    Returns:
+        str: The folder name, or None if the URL is invalid.
+    """
+    channel = get_resolver().resolve(channel_url, network=network)
+    if channel:
+        return channel['name']
+    return None
+
+def read_channels(channels_file):
+    """
+    Reads the channel list file, one channel URL per line.
+    
+    Args:
+        channels_file (str): Path of the channels file.
+    Returns:
+        list: Channel URLs in file order, without blank lines or exact duplicates.
+    """
+    channels = []
+    try:
+        with open(channels_file, "r") as file:
+            for line in file:
+                channel = line.strip()
+                if channel and channel not in channels:
+                    channels.append(channel)
+    except FileNotFoundError:
+        pass
+    return channels
+
+
+def extract_video_id(video_url):
+    """
+    Extracts the video ID from a YouTube video or short URL without any network access.
+    
+    Args:
+        video_url (str): The YouTube video URL.
+    Returns:
+        str: The 11-character video ID, or None if the URL is not a YouTube video URL.
+    """
+    # Match video URLs like:
+    # - https://www.youtube.com/shorts/VideoID
+    # - https://www.youtube.com/watch?v=VideoID
+    # - https://youtu.be/VideoID
+    match = re.match(r"https?://(?:www\.|m\.)?(?:youtube\.com/(?:shorts/|watch\?(?:.*&)?v=)|youtu\.be/)([a-zA-Z0-9_-]{11})", video_url)
     if match:
         return match.group(1)
-    return None
\ No newline at end of file
+    return None
+
+
+def configure_logging(log_file="downloader.log", level=logging.INFO):
+    """
+    Sets up logging to the console and a log file; call once from the entry point.
+    
+    Args:
+        log_file (str): Path of the log file (None for console only).
+        level (int): Logging level of the root logger.
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s', handlers=handlers)
@@ -1,23 +1,74 @@
 import os
 import json
 import datetime
-import yt_dlp
 import time
 import random
-import pandas as pd
+import threading
+from archive import get_archive
+from integrity import StreamingHasher, discard, get_integrity_manifest
+from ydl_pool import get_pool, iter_playlist_entries
+from metadata_cache import get_metadata_cache
+from metrics import get_metrics
+from bandwidth import get_shaper
+from enrichment import get_enricher
+from engagement import get_engagement_store
+from channel_resolver import get_resolver
+from ranking import TopN, growth_key, ranking_key, to_dataframe, to_json
+
+# Base yt-dlp options of the analyzer's pooled sessions
+CHANNEL_LISTING_OPTS = {
+    'quiet': True,
+    'extract_flat': True,
+    'force_generic_extractor': True
+}
+
+VIRAL_DOWNLOAD_OPTS = {
+    'format': 'best[height<=720]',
+    'quiet': True,
+    'noprogress': True,
+    'no_warnings': True,
+    'ignoreerrors': True,
+    'continuedl': True  # Resume interrupted downloads from their .part file
+}
+
+# Times a video whose download fails its integrity check is queued again
+MAX_INTEGRITY_RETRIES = 2
+
+# Listed videos are enriched, recorded and scored this many at a time (a multiple of the API batch size)
+STREAM_CHUNK_SIZE = 500
 
 class ViralAnalyzer:
-    def __init__(self, api_key=None, progress_var=None, progress_label_var=None):
+    def __init__(self, api_key=None, progress_var=None, progress_label_var=None, cache=None, use_cache=True,
+                 download_delay=(11, 21), journal=None, dedup=None, enricher=None, history=None, use_history=True):
         """
         Initialize the ViralAnalyzer with optional progress tracking.
         
         Args:
-            api_key (str): Not used in this version as we're using yt-dlp
+            api_key (str): YouTube Data API key used to fetch video statistics
+                (defaults to the key found by secure_config)
             progress_var: Optional tkinter variable for progress bar
             progress_label_var: Optional tkinter variable for progress label
+            cache (MetadataCache): Channel metadata cache (defaults to the shared cache)
+            use_cache (bool): Set to False to always fetch channel metadata from YouTube
+            download_delay (tuple): (min, max) seconds to pause between viral video downloads
+            journal (JobJournal): Optional job journal recording the state of each download
+            dedup (DedupIndex): Optional cross-channel dedup index; videos already stored
+                under another channel are hardlinked instead of downloaded
+            enricher (StatisticsEnricher): Fetches view and comment counts missing from
+                flat listings (defaults to one using api_key; pass False to rank on
+                listing values only)
+            history (EngagementStore): Engagement history used for growth ranking (defaults
+                to the shared store)
+            use_history (bool): Set to False to neither record snapshots nor rank by growth
         """
         self.progress_var = progress_var
         self.progress_label_var = progress_label_var
+        self.cache = (cache or get_metadata_cache()) if use_cache else None
+        self.download_delay = download_delay
+        self.journal = journal
+        self.dedup = dedup
+        self.enricher = get_enricher(api_key) if enricher is None else (enricher or None)
+        self.history = (history or get_engagement_store()) if use_history else None
     
     def update_label(self, text):
         """Update the progress label if available."""
@@ -35,68 +86,155 @@ class ViralAnalyzer:
             except Exception:
                 print(f"Progress update error: {value}")
     
-    def get_channel_videos(self, channel_url, top_n=11):
+    def _notify(self, callback, path):
+        """Pass a stored video to the caller's callback; its errors never fail the download."""
+        if callback:
+            try:
+                callback(path)
+            except Exception as e:
+                print(f"Download callback error: {e}")
+    
+    def iter_channel_metadata(self, channel_url, report_progress=True, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the per-video metadata of a channel while paging through its listing.
+        
+        Videos are enriched with missing statistics and recorded in the
+        engagement history a chunk at a time, so memory stays constant however
+        many videos the channel has.
+        
+        Args:
+            channel_url (str): YouTube channel URL
+            report_progress (bool): Update the progress label while listing
+            chunk_size (int): Videos processed at a time
+            
+        Yields:
+            dict: One dict per video (title, url, video_id, views, likes, comments, upload_date)
+        """
+        count = 0
+        with get_pool().session('analyzer_listing', CHANNEL_LISTING_OPTS) as ydl:
+            chunk = []
+            for video in iter_playlist_entries(ydl, channel_url, span='channel_listing'):
+                if not video:
+                    continue
+                chunk.append({
+                    'title': video.get('title'),
+                    'url': video.get('url'),
+                    'video_id': video.get('id'),
+                    'views': int(video.get('view_count') or 0),
+                    # Listings rarely carry likes; None until enrichment fills them in
+                    'likes': video.get('like_count'),
+                    'comments': int(video.get('comment_count') or 0),
+                    'upload_date': video.get('upload_date')  # YYYYMMDD format
+                })
+                if len(chunk) >= chunk_size:
+                    count += len(chunk)
+                    yield from self._process_chunk(chunk, count, report_progress)
+                    chunk = []
+            count += len(chunk)
+            yield from self._process_chunk(chunk, count, report_progress)
+    
+    def _process_chunk(self, video_data, count, report_progress):
+        """Enrich a chunk of listed videos and record their engagement snapshot."""
+        if not video_data:
+            return video_data
+        if report_progress:
+            self.update_label(f"Processing videos ({count} listed so far)...")
+
+        # Flat listings often lack the counts; fetch them in batches from the Data API
+        if self.enricher:
+            self.enricher.enrich(video_data)
+
+        if self.history:
+            self.history.record(video_data)
+        
+        return video_data
+    
+    def fetch_channel_metadata(self, channel_url, report_progress=True):
+        """
+        Fetch the per-video metadata of a channel from YouTube.
+        
+        Holds the whole channel in memory; see iter_channel_metadata for large channels.
+        
+        Args:
+            channel_url (str): YouTube channel URL
+            report_progress (bool): Update the progress widgets while processing
+            
+        Returns:
+            list: One dict per video (title, url, video_id, views, likes, comments, upload_date)
+        """
+        return list(self.iter_channel_metadata(channel_url, report_progress))
+    
+    def get_channel_videos(self, channel_url, top_n=11, as_dataframe=False, stats=None):
         """
         Get the top viral videos from a channel using yt-dlp.
         
+        Channel metadata is served from the metadata cache when available;
+        stale entries are ranked immediately and refreshed in the background.
+        Otherwise the channel listing is streamed: videos are scored and
+        ranked through a bounded top-N heap a chunk at a time as pages
+        arrive, so memory does not grow with the size of the channel. With
+        engagement history, videos are ranked by projected view velocity
+        (fast growth) first; without it, by comments, views and upload date.
+        
         Args:
             channel_url (str): YouTube channel URL
             top_n (int): Number of top videos to return
+            as_dataframe (bool): Return a pandas DataFrame instead of a list
+            stats (ChannelStats): Optional accumulator offered every listed video after
+                scoring (used to normalize scores across channels, see global_ranking.py)
             
         Returns:
-            DataFrame: Top videos sorted by comments, views, and upload date
+            list: Top video dicts sorted by growth (when history is used), comments, views,
+                and upload date
         """
         self.update_label(f"Fetching videos from {channel_url}...")
         
-        ydl_opts = {
-            'quiet': True,
-            'extract_flat': True,
-            'force_generic_extractor': True
-        }
-
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(channel_url, download=False)
-            
-            videos = info.get('entries', [])
-            video_data = []
-
-            # Extract metadata
-            self.update_label(f"Processing {len(videos)} videos...")
-            for i, video in enumerate(videos):
-                video_data.append({
-                    'title': video.get('title'),
-                    'url': video.get('url'),
-                    'video_id': video.get('id'),
-                    'views': int(video.get('view_count', 0)),
-                    'comments': int(video.get('comment_count', 0)),
-                    'upload_date': video.get('upload_date')  # YYYYMMDD format
-                })
-                
-                # Update progress every 10 videos
-                if i % 10 == 0 and self.progress_var:
-                    self.update_progress(int((i / len(videos)) * 100))
+            # Aliases of a channel (handle, /c/ or /channel/ URL) are listed from one canonical URL
+            # and share one cache entry
+            channel = get_resolver().resolve(channel_url)
+            listing_url = channel['url'] if channel else channel_url
+            if self.cache:
+                video_data = self.cache.iter_or_fetch(
+                    channel['key'] if channel else channel_url,
+                    lambda: self.iter_channel_metadata(listing_url),
+                    refresh=lambda: self.iter_channel_metadata(listing_url, report_progress=False)
+                )
+            else:
+                video_data = self.iter_channel_metadata(listing_url)
 
-            # Convert to DataFrame
-            df = pd.DataFrame(video_data)
+            # Ranking: Fastest Growth → Most Comments → Most Views → Newest Upload
+            ranking = TopN(top_n, key=growth_key if self.history else ranking_key)
+            now = time.time()
+            chunk = []
+            for video in video_data:
+                chunk.append(video)
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    self._rank_chunk(ranking, chunk, now, stats)
+                    chunk = []
+            self._rank_chunk(ranking, chunk, now, stats)
+            top_videos = ranking.results()
             
-            if df.empty:
+            if not top_videos:
                 self.update_label("No videos found in channel")
-                return df
-                
-            # Sorting: Most Comments → Most Views → Newest Upload
-            df = df.sort_values(by=['comments', 'views', 'upload_date'], 
-                               ascending=[False, False, False])
-
-            # Return Top N
-            self.update_label(f"Found {len(df)} videos, returning top {top_n}")
-            return df.head(top_n)
+            else:
+                self.update_label(f"Found {ranking.count} videos, returning top {top_n}")
             
         except Exception as e:
             self.update_label(f"Error fetching videos: {str(e)}")
-            return pd.DataFrame()  # Return empty DataFrame on error
+            top_videos = []  # Return no videos on error
+        
+        return to_dataframe(top_videos) if as_dataframe else top_videos
+    
+    def _rank_chunk(self, ranking, videos, now, stats=None):
+        """Score a chunk of videos from the engagement history and offer them to the ranking."""
+        if self.history and videos:
+            self.history.score(videos, now=now)
+        if stats is not None:
+            stats.extend(videos)
+        ranking.extend(videos)
     
-    def analyze_channel(self, channel_url, output_folder, max_videos=100):
+    def analyze_channel(self, channel_url, output_folder, max_videos=100, stats=None):
         """
         Analyze a YouTube channel to find viral videos.
         
@@ -104,84 +242,174 @@ class ViralAnalyzer:
             channel_url (str): URL of the YouTube channel
             output_folder (str): Folder to save metadata
             max_videos (int): Maximum number of videos to analyze
+            stats (ChannelStats): Optional accumulator of the whole channel's engagement
             
         Returns:
-            DataFrame: DataFrame containing viral videos sorted by engagement
+            list: Viral video dicts sorted by engagement
         """
         self.update_label(f"Analyzing channel: {channel_url}")
         
         # Get top videos from channel
-        df_videos = self.get_channel_videos(channel_url, top_n=max_videos)
+        videos = self.get_channel_videos(channel_url, top_n=max_videos, stats=stats)
         
-        if df_videos.empty:
+        if not videos:
             self.update_label("No videos found to analyze")
-            return df_videos
+            return videos
         
         # Save metadata to JSON file
         metadata_path = os.path.join(output_folder, "viral_videos_metadata.json")
         try:
-            df_videos.to_json(metadata_path, orient="records", indent=4)
+            to_json(videos, metadata_path)
             self.update_label(f"Saved metadata to {metadata_path}")
         except Exception as e:
             self.update_label(f"Error saving metadata: {str(e)}")
         
-        return df_videos
+        return videos
     
-    def download_viral_videos(self, viral_videos_df, output_folder, limit=10):
+    def download_viral_videos(self, viral_videos, output_folder, limit=10, channel_url=None, on_downloaded=None,
+                              stop=None):
         """
         Download the top viral videos.
         
         Args:
-            viral_videos_df (DataFrame): DataFrame containing viral videos
+            viral_videos (list): Viral video dicts (a DataFrame is also accepted)
             output_folder (str): Folder to save downloaded videos
             limit (int): Maximum number of videos to download
+            channel_url (str): Channel the videos belong to (parent of the journal tasks)
+            on_downloaded: Optional callable receiving the path of each video as soon as it
+                is stored (downloaded, linked or found in the archive)
+            stop (threading.Event): Optional event that ends the downloads early; it is checked
+                between videos and interrupts the rate limiting pause. Videos not reached stay
+                pending in the journal.
             
         Returns:
             list: Paths of downloaded videos
         """
-        if viral_videos_df.empty:
+        if hasattr(viral_videos, 'to_dict'):
+            viral_videos = viral_videos.to_dict('records')
+        if not viral_videos:
             self.update_label("No videos to download")
             return []
         
         # Limit the number of videos to download
-        videos_to_download = viral_videos_df.head(limit)
+        videos_to_download = viral_videos[:limit]
         total_videos = len(videos_to_download)
         
         self.update_label(f"Downloading {total_videos} viral videos...")
         downloaded_paths = []
+        archive = get_archive(output_folder)
+        metrics = get_metrics()
+        journal = self.journal
+        dedup = self.dedup
+        integrity = get_integrity_manifest(output_folder)
+        stop = stop or threading.Event()
+        if journal:
+            for video in videos_to_download:
+                journal.add('video', video['video_id'], parent=channel_url)
         
-        for i, (_, video) in enumerate(videos_to_download.iterrows()):
-            video_url = f"https://www.youtube.com/watch?v={video['video_id']}"
-            video_title = video['title']
-            
-            self.update_label(f"Downloading {i+1}/{total_videos}: {video_title}")
-            self.update_progress(int((i / total_videos) * 100))
-            
-            # Set up yt-dlp options
-            ydl_opts = {
-                'format': 'best[height<=720]',
-                'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
-                'quiet': True,
-                'no_warnings': True,
-                'ignoreerrors': True
-            }
-            
-            try:
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(video_url, download=True)
-                    if info:
-                        filename = ydl.prepare_filename(info)
-                        downloaded_paths.append(filename)
-                        self.update_label(f"Successfully downloaded: {os.path.basename(filename)}")
-            except Exception as e:
-                self.update_label(f"Error downloading {video_title}: {str(e)}")
-            
-            # Add delay between downloads to avoid rate limiting
-            if i < total_videos - 1:
-                sleep_time = random.uniform(11, 21)
-                self.update_label(f"Rate limiting pause for {int(sleep_time)} seconds...")
-                time.sleep(sleep_time)
+        # Videos whose download fails the integrity check are collected during a pass and
+        # downloaded again in the next one, up to MAX_INTEGRITY_RETRIES times
+        pending = videos_to_download
+        for attempt in range(MAX_INTEGRITY_RETRIES + 1):
+            if not pending or stop.is_set():
+                break
+            retries = []
+            for i, video in enumerate(pending):
+                if stop.is_set():
+                    break
+                # Retry rounds are labelled as such and leave the progress bar where the first pass left it
+                position = f"{i+1}/{len(pending)}" + (" (retry)" if attempt else "")
+                video_url = f"https://www.youtube.com/watch?v={video['video_id']}"
+                video_title = video['title']
+                
+                if not attempt:
+                    self.update_progress(min(99, int((i / total_videos) * 100)))
+                archived_path = archive.lookup_existing(video['video_id'])
+                if archived_path:
+                    if journal:
+                        journal.finish('video', video['video_id'], {'path': archived_path})
+                    downloaded_paths.append(archived_path)
+                    self._notify(on_downloaded, archived_path)
+                    metrics.incr('downloads_skipped')
+                    self.update_label(f"Already downloaded {position}: {video_title}")
+                    continue
+                linked_path = dedup.link_existing(video['video_id'], output_folder) if dedup else None
+                if linked_path:
+                    archive.add(video['video_id'], linked_path)
+                    if journal:
+                        journal.finish('video', video['video_id'], {'path': linked_path})
+                    downloaded_paths.append(linked_path)
+                    self._notify(on_downloaded, linked_path)
+                    metrics.incr('downloads_deduplicated')
+                    self.update_label(f"Linked existing copy {position}: {video_title}")
+                    continue
+                
+                self.update_label(f"Downloading {position}: {video_title}")
+                
+                transfer = metrics.transfer()
+                # Hashed while it downloads, for the folder's integrity manifest
+                hasher = StreamingHasher()
+                # Draw from the process-wide bandwidth budget, shared fairly with other channels
+                flow = get_shaper().flow(channel_url or output_folder)
+                try:
+                    overrides = {
+                        'outtmpl': os.path.join(output_folder, '%(title)s.%(ext)s'),
+                        'progress_hooks': [transfer, flow, hasher],
+                    }
+                    with get_pool().session('analyzer_download', VIRAL_DOWNLOAD_OPTS, overrides) as ydl:
+                        with metrics.span('extract_info'):
+                            info = ydl.extract_info(video_url, download=False)
+                        if info:
+                            filename = ydl.prepare_filename(info)
+                            if journal:
+                                journal.start('video', video['video_id'], {'path': filename})
+                            transfer.begin(filename)
+                            info = ydl.process_ie_result(info, download=True)
+                            transfer.close()
+                        if info and os.path.exists(filename) and not integrity.record_download(hasher, filename):
+                            discard(filename)
+                            if attempt < MAX_INTEGRITY_RETRIES:
+                                if journal:
+                                    journal.release('video', video['video_id'])
+                                retries.append(video)
+                                self.update_label(f"Incomplete download, queued again: {video_title}")
+                            else:
+                                metrics.incr('downloads_failed')
+                                if journal:
+                                    journal.fail('video', video['video_id'], "Integrity check failed")
+                        elif info and os.path.exists(filename):
+                            downloaded_paths.append(filename)
+                            archive.add(info.get('id') or video['video_id'], filename)
+                            metrics.incr('downloads_succeeded')
+                            if dedup and dedup.register(info.get('id') or video['video_id'], filename):
+                                metrics.incr('content_duplicates_linked')
+                            if journal:
+                                journal.finish('video', video['video_id'], {'path': filename})
+                            self.update_label(f"Successfully downloaded: {os.path.basename(filename)}")
+                            self._notify(on_downloaded, filename)
+                        else:
+                            metrics.incr('downloads_failed')
+                            if journal:
+                                journal.fail('video', video['video_id'], "Download failed")
+                except Exception as e:
+                    metrics.incr('downloads_failed')
+                    if journal:
+                        journal.fail('video', video['video_id'], str(e))
+                    self.update_label(f"Error downloading {video_title}: {str(e)}")
+                finally:
+                    flow.close()
+                
+                # Add delay between downloads to avoid rate limiting
+                if (i < len(pending) - 1 or retries) and self.download_delay[1] > 0:
+                    sleep_time = random.uniform(*self.download_delay)
+                    self.update_label(f"Rate limiting pause for {int(sleep_time)} seconds...")
+                    with metrics.span('rate_limit_sleep'):
+                        stop.wait(sleep_time)
+            pending = retries
         
+        if stop.is_set():
+            self.update_label(f"Stopped after {len(downloaded_paths)}/{total_videos} videos")
+            return downloaded_paths
         self.update_label(f"Downloaded {len(downloaded_paths)}/{total_videos} videos")
         self.update_progress(100)
         
@@ -0,0 +1,222 @@
+"""
+Pool of long-lived yt-dlp sessions.
+
+Creating a ``yt_dlp.YoutubeDL`` per video redoes extractor setup and throws
+away HTTP keep-alive connections and cookies. The pool keeps instances per
+option profile instead: a ``session()`` block checks an idle instance out (or
+creates one) and returns it when the block ends, so an instance is used by
+one thread at a time and outlives the threads that used it. At most
+``MAX_IDLE_PER_PROFILE`` idle instances are kept per profile; the rest are
+closed when returned, so executors created and discarded by every run do
+not accumulate sessions. Per-call options such as ``outtmpl``, ``logger`` or
+``progress_hooks`` are applied for the duration of the block and restored
+afterwards.
+
+yt-dlp itself is imported when the first session is created, so importing
+this module (and everything built on it) stays cheap.
+"""
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+import logging
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Idle sessions kept per profile; sessions returned beyond this are closed
+MAX_IDLE_PER_PROFILE = 8
+
+
+class YoutubeDLPool:
+    """Lends out preconfigured YoutubeDL instances per profile, keeping a bounded number idle."""
+
+    def __init__(self, max_idle=MAX_IDLE_PER_PROFILE):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._instances = []
+        self._extractors = []
+        self.created = 0
+        self.reused = 0
+
+    def _checkout(self, profile, base_opts):
+        with self._lock:
+            idle = self._idle.get(profile)
+            if idle:
+                self.reused += 1
+                return idle.pop()
+        import yt_dlp
+        ydl = yt_dlp.YoutubeDL(dict(base_opts))
+        with self._lock:
+            self._instances.append(ydl)
+            self.created += 1
+            extractors = list(self._extractors)
+        for ie_class in extractors:
+            self._install_extractor(ydl, ie_class)
+        logger.debug(f"Created yt-dlp session '{profile}' for {threading.current_thread().name}")
+        return ydl
+
+    def _return(self, profile, ydl):
+        with self._lock:
+            idle = self._idle.setdefault(profile, [])
+            if len(idle) < self.max_idle and ydl in self._instances:
+                idle.append(ydl)
+                return
+            if ydl in self._instances:
+                self._instances.remove(ydl)
+        self._close(ydl)
+
+    @staticmethod
+    def _close(ydl):
+        try:
+            ydl.close()
+        except Exception as e:
+            logger.debug(f"Error closing yt-dlp session: {e}")
+
+    @staticmethod
+    def _install_extractor(ydl, ie_class):
+        ie = ie_class()
+        ie.set_downloader(ydl)
+        # Put it first so it takes precedence over the built-in extractors
+        ydl._ies = {ie.ie_key(): ie, **ydl._ies}
+        ydl._ies_instances[ie.ie_key()] = ie
+
+    def register_extractor(self, ie_class):
+        """
+        Inject an extra InfoExtractor into every session, ahead of the built-in ones.
+
+        Used by the benchmark suite and tests to point yt-dlp at a local stand-in server.
+
+        Args:
+            ie_class: yt-dlp InfoExtractor subclass
+        """
+        with self._lock:
+            self._extractors.append(ie_class)
+            instances = list(self._instances)
+        for ydl in instances:
+            self._install_extractor(ydl, ie_class)
+
+    @contextmanager
+    def session(self, profile, base_opts, overrides=None):
+        """
+        Borrow a YoutubeDL of a profile for the duration of the block.
+
+        Args:
+            profile (str): Name of the option profile (instances are only shared within a profile)
+            base_opts (dict): Options used when the instance is first created
+            overrides (dict): Options applied only for this block, e.g. outtmpl,
+                logger or progress_hooks
+
+        Yields:
+            yt_dlp.YoutubeDL: The pooled instance
+        """
+        ydl = self._checkout(profile, base_opts)
+        overrides = dict(overrides or {})
+        saved_params = {}
+        saved_hooks = ydl._progress_hooks
+
+        if 'progress_hooks' in overrides:
+            ydl._progress_hooks = list(overrides.pop('progress_hooks') or [])
+        if 'outtmpl' in overrides:
+            outtmpl = overrides.pop('outtmpl')
+            if not isinstance(outtmpl, dict):
+                outtmpl = {'default': outtmpl}
+            overrides['outtmpl'] = dict(ydl.params['outtmpl'], **outtmpl)
+        for key, value in overrides.items():
+            saved_params[key] = ydl.params.get(key, _MISSING)
+            ydl.params[key] = value
+
+        ydl._download_retcode = 0
+        ydl._playlist_urls.clear()
+        try:
+            yield ydl
+        finally:
+            for key, value in saved_params.items():
+                if value is _MISSING:
+                    ydl.params.pop(key, None)
+                else:
+                    ydl.params[key] = value
+            ydl._progress_hooks = saved_hooks
+            self._return(profile, ydl)
+
+    def stats(self):
+        """Return how many sessions were created, how many times one was reused and how many are open."""
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused, 'open': len(self._instances)}
+
+    def close(self):
+        """Close every session created by the pool (cookies are saved, connections closed)."""
+        with self._lock:
+            instances, self._instances = self._instances, []
+            self._idle = {}
+        for ydl in instances:
+            self._close(ydl)
+
+
+_pool = YoutubeDLPool()
+atexit.register(_pool.close)
+
+
+def get_pool():
+    """Return the process-wide session pool."""
+    return _pool
+
+
+def _playlist_entries(ydl, playlist_url, page_size):
+    from yt_dlp.utils import PagedList
+
+    result = ydl.extract_info(playlist_url, download=False, process=False)
+    while result and result.get('_type') in ('url', 'url_transparent'):
+        result = ydl.extract_info(result['url'], download=False, process=False, ie_key=result.get('ie_key'))
+    if not result:
+        return
+    entries = result.get('entries') or []
+    if isinstance(entries, PagedList):
+        start = 0
+        while True:
+            page = entries.getslice(start, start + page_size)
+            yield from page
+            if len(page) < page_size:
+                return
+            start += page_size
+    else:
+        yield from entries
+
+
+def iter_playlist_entries(ydl, playlist_url, page_size=100, span=None):
+    """
+    Yield the raw entries of a playlist as the extractor pages through it.
+
+    Uses extract_info(process=False), so continuation pages are only
+    requested when the caller keeps consuming entries, and no more than one
+    page of entries is held at a time.
+
+    Args:
+        ydl (yt_dlp.YoutubeDL): Session to list with
+        playlist_url (str): Playlist, channel or channel tab URL
+        page_size (int): Entries requested at a time from paged (PagedList) playlists
+        span (str): Metric recording the time spent listing, without the time the
+            caller spends between entries
+    """
+    entries = _playlist_entries(ydl, playlist_url, page_size)
+    if not span:
+        yield from entries
+        return
+    from metrics import get_metrics
+
+    listing = 0.0
+    try:
+        while True:
+            started = time.monotonic()
+            try:
+                entry = next(entries)
+            except StopIteration:
+                return
+            finally:
+                listing += time.monotonic() - started
+            yield entry
+    finally:
+        entries.close()
+        get_metrics().observe(span, listing)